@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.database import engine, async_engine, pool_stats
+from app.core.security import CurrentUser, require_role
+from app.core.sql_trace import SqlTraceStore
+from app.models.models import UserRole
+
+router = APIRouter()
+
+@router.get("/admin/pool-stats")
+def get_pool_stats(
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can view pool stats"))
+):
+    return {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine.sync_engine),
+    }
+
+@router.get("/admin/sql-traces/{trace_id}")
+def get_sql_trace(
+    trace_id: str,
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can view SQL traces"))
+):
+    trace = SqlTraceStore.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="SQL trace not found or expired")
+    return trace
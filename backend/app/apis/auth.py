@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
 from app.schema.user import UserCreate, UserLogin, Token
 from app.services.auth_services import AuthService
 from app.core.security import create_access_token, create_refresh_token
+from app.core.rate_limit import rate_limit
 
 router = APIRouter()
 
-@router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+@router.post("/register", status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("register", "RATE_LIMIT_REGISTER"))])
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Validate role field is present
     if not hasattr(user, 'role'):
         raise HTTPException(
@@ -21,19 +22,19 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email already exists
-    if AuthService.get_user_by_email(db, user.email):
+    if await AuthService.get_user_by_email(db, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email is already registered."
         )
     
-    db_user = AuthService.register_user(db, user)
+    db_user = await AuthService.register_user(db, user)
     return {"message": "User registered successfully", "user_id": db_user.user_id}
 
 
-@router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = AuthService.authenticate_user(db, user_data.email, user_data.password)
+@router.post("/login", response_model=Token, dependencies=[Depends(rate_limit("login", "RATE_LIMIT_LOGIN"))])
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await AuthService.authenticate_user(db, user_data.email, user_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
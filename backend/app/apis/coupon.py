@@ -1,50 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
-from app.core.database import get_db
-from app.models.models import Coupon, CouponUsage
+from app.core.database import get_async_db
+from app.models.models import Coupon
 from app.schema.coupon import CouponCreate, CouponResponse
-from app.core.security import JWTBearer
-from app.core.config import settings
+from app.services.coupon_cache import CouponCache
+from app.core.security import CurrentUser, require_role
 from app.models.models import UserRole
-import jwt
 
 router = APIRouter()
 
-@router.get("/coupons")
-def get_coupons(db: Session = Depends(get_db)):
-    return db.query(Coupon).all()
+@router.get("/coupons", response_model=List[CouponResponse])
+async def get_coupons(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Coupon))
+    return result.scalars().all()
 
 @router.post("/coupons", response_model=CouponResponse)
-def create_coupon(
+async def create_coupon(
     coupon: CouponCreate,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can create coupons"))
 ):
-    # Verify admin role
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    if payload.get("role") != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Only admins can create coupons")
-    
     db_coupon = Coupon(**coupon.model_dump())
     db.add(db_coupon)
-    db.commit()
-    db.refresh(db_coupon)
+    await db.commit()
+    await db.refresh(db_coupon)
+    CouponCache.invalidate()
     return db_coupon
 
-@router.put("/coupons/{coupon_id}")
-def update_coupon(
+@router.put("/coupons/{coupon_id}", response_model=CouponResponse)
+async def update_coupon(
     coupon_id: UUID,
     coupon: CouponCreate,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can update coupons"))
 ):
-    # Verify admin role
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    if payload.get("role") != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Only admins can update coupons")
-    
-    db_coupon = db.query(Coupon).filter(Coupon.coupon_id == coupon_id).first()
+    result = await db.execute(select(Coupon).filter(Coupon.coupon_id == coupon_id))
+    db_coupon = result.scalars().first()
     if not db_coupon:
         raise HTTPException(status_code=404, detail="Coupon not found")
     db_coupon.code = coupon.code
@@ -56,24 +50,22 @@ def update_coupon(
     db_coupon.min_order_value = coupon.min_order_value
     db_coupon.max_discount = coupon.max_discount
     db_coupon.usage_limit = coupon.usage_limit
-    db.commit()
-    db.refresh(db_coupon)
+    await db.commit()
+    await db.refresh(db_coupon)
+    CouponCache.invalidate()
     return db_coupon
 
 @router.delete("/coupons/{coupon_id}")
-def delete_coupon(
+async def delete_coupon(
     coupon_id: UUID,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can delete coupons"))
 ):
-    # Verify admin role
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    if payload.get("role") != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Only admins can delete coupons")
-    
-    db_coupon = db.query(Coupon).filter(Coupon.coupon_id == coupon_id).first()
+    result = await db.execute(select(Coupon).filter(Coupon.coupon_id == coupon_id))
+    db_coupon = result.scalars().first()
     if not db_coupon:
         raise HTTPException(status_code=404, detail="Coupon not found")
-    db.delete(db_coupon)
-    db.commit()
+    await db.delete(db_coupon)
+    await db.commit()
+    CouponCache.invalidate()
     return {"message": "Coupon deleted successfully"}
\ No newline at end of file
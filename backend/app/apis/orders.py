@@ -1,81 +1,179 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-import jwt
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, WebSocket, status as http_status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import json
+from datetime import datetime
+from typing import List, Optional, Literal
 from uuid import UUID
 import uuid
-from app.core.database import get_db
-from app.schema.order import OrderCreate
+from app.core.database import get_async_db, get_async_session_factory
+from app.schema.order import OrderCreate, OrderHistoryPage, OrderSummaryResponse
 from app.services.order_service import OrderService
 from app.core.config import settings
-from app.core.security import JWTBearer
+from app.core.security import CurrentUser, get_current_user, get_current_user_ws, require_role
+from app.core.rate_limit import rate_limit
 from app.models.models import UserRole, Order, OrderStatus
-from app.services.order_status_service import OrderStatusService
+from app.services.order_export_service import OrderExportService
+from app.services.idempotency import IdempotencyStore
+from app.services.order_events import OrderEvent, OrderEventBus
 
 router = APIRouter()
 
-@router.get("/orders")
-def get_orders(
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+@router.get("/orders", response_model=List[OrderSummaryResponse])
+async def get_orders(
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user)
     ):
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    user_id = uuid.UUID(payload["sub"])
-    return OrderService.get_user_orders(db, user_id)
+    return await OrderService.get_user_orders(db, user.user_id)
 
-@router.get("/orders/history")  # Moved before the parameterized route
-def get_order_history(
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+@router.get("/orders/history", response_model=OrderHistoryPage)  # Moved before the parameterized route
+async def get_order_history(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    status: Optional[OrderStatus] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[UUID] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can get order history"))
 ):
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    if payload.get("role") != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Only admins can get order history")
-    return db.query(Order).all()
+    orders, next_cursor = await OrderService.get_order_history(
+        db,
+        limit=limit,
+        cursor=cursor,
+        status=status,
+        date_from=date_from,
+        date_to=date_to,
+        user_id=user_id
+    )
+    return {"items": orders, "next_cursor": next_cursor}
 
-@router.get("/orders/{order_id}")  # Now comes after /orders/history
-def get_order_by_id(
+@router.get("/orders/export")
+async def export_orders(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    session_factory = Depends(get_async_session_factory),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can export orders"))
+):
+    orders = OrderExportService.stream_orders(session_factory, date_from=date_from, date_to=date_to)
+    if format == "csv":
+        body, media_type = OrderExportService.to_csv(orders), "text/csv"
+    else:
+        body, media_type = OrderExportService.to_ndjson(orders), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'}
+    )
+
+@router.get("/orders/{order_id}", response_model=OrderSummaryResponse)  # Now comes after /orders/history
+async def get_order_by_id(
     order_id: uuid.UUID,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user)
 ):
-    order = db.query(Order).filter(Order.order_id == order_id).first()
+    order = await OrderService.get_order_by_id(db, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
-@router.post("/orders")
-def create_order(
-    order: OrderCreate,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+async def _order_snapshot(session_factory, order_id: uuid.UUID, user: CurrentUser) -> Optional[OrderEvent]:
+    """Current status of an order the user may watch, read once; the session is closed before streaming starts."""
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Order.user_id, Order.status, Order.updated_at).filter(Order.order_id == order_id)
+        )
+        row = result.first()
+    if row is None or (row.user_id != user.user_id and not user.is_admin):
+        return None
+    return OrderEvent(str(order_id), row.status or OrderStatus.RECEIVED, row.updated_at or datetime.utcnow())
+
+@router.websocket("/orders/{order_id}/ws")
+async def watch_order_ws(
+    websocket: WebSocket,
+    order_id: uuid.UUID,
+    token: Optional[str] = None,
+    session_factory = Depends(get_async_session_factory)
 ):
+    # Browsers cannot set headers on a WebSocket, so the access token comes in the query string
+    user = await get_current_user_ws(token)
+    if user is None:
+        await websocket.close(code=http_status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # Subscribe before reading the snapshot so no transition falls in between
+    subscription = OrderEventBus.subscribe(order_id)
     try:
-        decoded_token = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        user_id = UUID(decoded_token["sub"])
-        
-        new_order = Order(
-            user_id=user_id,
-            status=OrderStatus.RECEIVED,
-            total_amount=order.total_amount,
-            delivery_address=order.delivery_address,
-            contact_number=order.contact_number
-        )
-        
-        db.add(new_order)
-        db.commit()
-        db.refresh(new_order)
-        
-        OrderStatusService.start_status_updates(db, new_order.order_id)
-        
-        return new_order
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=str(e)
-        )
\ No newline at end of file
+        snapshot = await _order_snapshot(session_factory, order_id, user)
+        if snapshot is None:
+            await websocket.close(code=http_status.WS_1008_POLICY_VIOLATION)
+            return
+        await websocket.accept()
+        await websocket.send_json(snapshot.to_dict())
+
+        async def forward():
+            async for event in subscription.updates(snapshot.status):
+                await websocket.send_json(event.to_dict())
+
+        async def until_disconnect():
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+
+        forwarder = asyncio.create_task(forward())
+        listener = asyncio.create_task(until_disconnect())
+        try:
+            done, _ = await asyncio.wait({forwarder, listener}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            forwarder.cancel()
+            listener.cancel()
+        if forwarder in done:
+            forwarder.result()
+            await websocket.close()  # delivered
+    finally:
+        OrderEventBus.unsubscribe(subscription)
+
+@router.get("/orders/{order_id}/events")
+async def watch_order_sse(
+    order_id: uuid.UUID,
+    session_factory = Depends(get_async_session_factory),
+    user: CurrentUser = Depends(get_current_user)
+):
+    subscription = OrderEventBus.subscribe(order_id)
+    snapshot = await _order_snapshot(session_factory, order_id, user)
+    if snapshot is None:
+        OrderEventBus.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    async def stream():
+        try:
+            yield f"event: status\ndata: {json.dumps(snapshot.to_dict())}\n\n"
+            async for event in subscription.updates(snapshot.status, settings.ORDER_EVENTS_HEARTBEAT_SECONDS):
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: status\ndata: {json.dumps(event.to_dict())}\n\n"
+        finally:
+            OrderEventBus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/orders", dependencies=[Depends(rate_limit("checkout", "RATE_LIMIT_CHECKOUT", per_user=True))])
+async def create_order(
+    order: OrderCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    return await IdempotencyStore.run(
+        scope=(user.user_id, "POST /orders"),
+        key=idempotency_key,
+        payload=order,
+        execute=lambda: OrderService.create_order(db, order, user.user_id)
+    )
\ No newline at end of file
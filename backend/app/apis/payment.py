@@ -1,16 +1,18 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Depends, Header
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import stripe
 import os
-import jwt
-from uuid import UUID
 from dotenv import load_dotenv
 from app.services.order_service import OrderService
 from app.schema.order import PaymentLinkRequest
-from app.core.security import JWTBearer
+from app.core.security import CurrentUser, get_current_user
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.rate_limit import rate_limit
+from app.services.idempotency import Checkpoint, IdempotencyStore
+from app.services.payment_gateway import PaymentGateway, PaymentGatewayError, get_payment_gateway
+from app.services.payment_events import record_stripe_event
 
 
 load_dotenv()
@@ -19,67 +21,61 @@ FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
 router = APIRouter()
 
-@router.post("/create-payment-link")
-def create_payment_link(
+@router.post("/create-payment-link", dependencies=[Depends(rate_limit("checkout", "RATE_LIMIT_CHECKOUT", per_user=True))])
+async def create_payment_link(
     request: PaymentLinkRequest,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+    gateway: PaymentGateway = Depends(get_payment_gateway),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    try:
-        # Decode JWT token to get user_id
-        decoded_token = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        user_id = UUID(decoded_token["sub"])
-        
+    # A replayed key returns the original link instead of creating another order and checkout session
+    scope = (user.user_id, "POST /create-payment-link")
+    checkpoint = IdempotencyStore.checkpoint(scope, idempotency_key, request)
+    return await IdempotencyStore.run(
+        scope=scope,
+        key=idempotency_key,
+        payload=request,
+        execute=lambda: _create_payment_link(request, db, user, gateway, checkpoint)
+    )
+
+async def _create_payment_link(
+    request: PaymentLinkRequest,
+    db: AsyncSession,
+    user: CurrentUser,
+    gateway: PaymentGateway,
+    checkpoint: Checkpoint
+):
+    # A retry after a failed gateway call pays for the order the first attempt created
+    order = checkpoint.get("order")
+    if order is None:
         # Convert PaymentLinkRequest to OrderCreate
         order_create = request.to_order_create()
-        
+
         # Create order using OrderService
-        order = OrderService.create_order(
+        created = await OrderService.create_order(
             db=db,
             order=order_create,
-            user_id=user_id
+            user_id=user.user_id
         )
+        order = {"order_id": str(created.order_id), "total_amount": created.total_amount}
+        checkpoint.put("order", order)
 
-        # First, create a product
-        product = stripe.Product.create(
-            name=f'Order #{order.order_id}',
-            description='Pizza Bliss Order'
-        )
-
-        # Then create a price for the product
-        price = stripe.Price.create(
-            product=product.id,
-            unit_amount=int(request.amount * 100),
+    # One Checkout Session call with the price inline, instead of Product + Price + PaymentLink.
+    # The gateway keys it on the order, so a retried call cannot open a second session either.
+    try:
+        session = await gateway.create_checkout_session(
+            order_id=order["order_id"],
+            amount=int(round(order["total_amount"] * 100)),
             currency='inr',
+            description=f'Pizza Bliss Order #{order["order_id"]}',
+            success_url=f"{FRONTEND_URL}/order-success?order_id={order['order_id']}",
+            cancel_url=f"{FRONTEND_URL}/cart"
         )
-
-        # Create Stripe Payment Link with the price ID
-        payment_link = stripe.PaymentLink.create(
-            line_items=[{
-                'price': price.id,
-                'quantity': 1
-            }],
-            after_completion={
-                'type': 'redirect',
-                'redirect': {
-                    'url': f"{FRONTEND_URL}/order-success?order_id={order.order_id}"
-                }
-            },
-            payment_method_types=['card'],
-            metadata={
-                'order_id': str(order.order_id)
-            }
-        )
-        return {"url": payment_link.url}
-    except stripe.error.StripeError as e:
-        raise HTTPException(status_code=400, detail=str(e.user_message))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
+    except PaymentGatewayError as e:
+        status_code = 400 if e.status_code and e.status_code < 500 else 502
+        raise HTTPException(status_code=status_code, detail=e.message)
+    return {"url": session.url}
 
 def get_payment_config(payment_type: str) -> Optional[str]:
     """
@@ -95,28 +91,20 @@ def get_payment_config(payment_type: str) -> Optional[str]:
     return config_map.get(payment_type)
 
 @router.post("/webhook")
-async def stripe_webhook(request: Request):
+async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
     payload = await request.body()
     sig_header = request.headers.get('stripe-signature')
     
     try:
         event = stripe.Webhook.construct_event(
-            payload, sig_header, os.getenv('STRIPE_WEBHOOK_SECRET')
+            payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
-        
-        if event['type'] == 'checkout.session.completed':
-            session = event['data']['object']
-            # Extract order ID from metadata or custom fields
-            order_id = session.get('metadata', {}).get('order_id')
-            if order_id:
-                await OrderService.update_order_status(
-                    order_id=order_id,
-                    payment_status="COMPLETED",
-                    transaction_id=session.payment_intent
-                )
-            
-        return {"status": "success"}
     except stripe.error.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid signature")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+    # Only record the event and acknowledge; PaymentEventWorker updates the order.
+    # A redelivered event is already recorded and is acknowledged without doing anything.
+    await record_stripe_event(db, event)
+    return {"status": "success"}
\ No newline at end of file
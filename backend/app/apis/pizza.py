@@ -1,44 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from app.core.config import settings
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Form, File, UploadFile, Request
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import UserRole, PizzaCategory
-from app.core.database import get_db
-from app.schema.pizza import  PizzaUpdate
+from app.core.database import get_async_db, get_async_session_factory
+from app.schema.pizza import PizzaUpdate, PizzaMenuResponse, PizzaCreatedResponse, PizzaUpdatedResponse
 from app.services.pizza_services import PizzaService
-from app.core.security import JWTBearer
-from utils import serialize_response
-import jwt
+from app.services.menu_cache import MenuCache
+from app.services.image_service import ImageService
+from app.core.security import CurrentUser, require_role
+from typing import List
 import uuid
 import json
-import os
 
 router = APIRouter()
 
-@router.get("/pizzas")
-def get_pizzas(db: Session = Depends(get_db)):
-    return PizzaService.get_pizzas(db)
+_menu_adapter = TypeAdapter(List[PizzaMenuResponse])
 
-@router.post("/pizzas")
+@router.get("/pizzas", response_model=List[PizzaMenuResponse])
+async def get_pizzas(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build_menu() -> bytes:
+        pizzas = await PizzaService.get_pizzas(db)
+        return _menu_adapter.dump_json(_menu_adapter.validate_python(pizzas, from_attributes=True))
+
+    return await MenuCache.respond(request, "pizzas", build_menu, db)
+
+@router.post("/pizzas", response_model=PizzaCreatedResponse, status_code=201)
 async def create_pizza(
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     description: str = Form(""),
     base_price: float = Form(...),
     category: str = Form(...),
     sizes: str = Form(...),
     image: UploadFile = File(None),
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    session_factory = Depends(get_async_session_factory),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can create pizzas"))
 ):
     try:
-        # Save the uploaded image file
+        # Stream the upload to disk under its content hash
         image_path = None
         if image:
-            content = await image.read()
-            os.makedirs("static/pizza_images", exist_ok=True)
-            image_path = f"static/pizza_images/{image.filename}"
-            with open(image_path, "wb") as f:
-                f.write(content)
+            image_path = await ImageService.save_upload(image)
 
         # Parse sizes JSON string
         try:
@@ -47,7 +50,7 @@ async def create_pizza(
             raise HTTPException(status_code=400, detail="Invalid sizes data format")
 
         # Create pizza in database using the service method
-        db_pizza = PizzaService.create_pizza(
+        db_pizza = await PizzaService.create_pizza(
             name=name,
             description=description,
             base_price=base_price,
@@ -57,47 +60,45 @@ async def create_pizza(
             db=db
         )
 
-        # Prepare response data with serialization
-        response_data = {
+        # Resized WebP/AVIF copies are built after the response; the menu lists them once they exist
+        if image_path:
+            background_tasks.add_task(ImageService.generate_variants, session_factory, db_pizza.pizza_id, image_path)
+
+        return {
             "message": "Pizza created successfully",
             "data": {
-                "id": str(db_pizza.pizza_id),  # Convert UUID to string
+                "id": db_pizza.pizza_id,
                 "name": db_pizza.name,
                 "description": db_pizza.description,
                 "base_price": db_pizza.base_price,
                 "category": db_pizza.category,
                 "image_path": db_pizza.image_url,
-                "sizes": [
-                    {
-                        "size": size.size.value,
-                        "price": size.price
-                    } 
-                    for size in db_pizza.sizes
-                ]
+                "sizes": db_pizza.sizes
             }
         }
-
-        return JSONResponse(
-            content=serialize_response(response_data),
-            status_code=201
-        )
+    except HTTPException:
+        raise
     except Exception as e:
         print("Error creating pizza:", str(e))
         raise HTTPException(status_code=400, detail=str(e))
 
 # Add a new endpoint to get available categories
 @router.get("/categories")
-async def get_categories():
-    return {
-        "categories": [
-            {
-                "id": category.value,
-                "name": category.name,
-                "icon": get_category_icon(category)  # You can create a mapping function for icons
-            }
-            for category in PizzaCategory
-        ]
-    }
+async def get_categories(request: Request):
+    async def build_categories() -> bytes:
+        categories = {
+            "categories": [
+                {
+                    "id": category.value,
+                    "name": category.name,
+                    "icon": get_category_icon(category)  # You can create a mapping function for icons
+                }
+                for category in PizzaCategory
+            ]
+        }
+        return json.dumps(categories, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    return await MenuCache.respond(request, "categories", build_categories)
 
 def get_category_icon(category: PizzaCategory) -> str:
     icon_mapping = {
@@ -109,45 +110,21 @@ def get_category_icon(category: PizzaCategory) -> str:
     }
     return icon_mapping.get(category, "🍕")
     
-@router.put("/pizzas/{pizza_id}")
-def update_pizza(
+@router.put("/pizzas/{pizza_id}", response_model=PizzaUpdatedResponse)
+async def update_pizza(
     pizza_id: uuid.UUID,
     pizza_update: PizzaUpdate,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can update pizzas"))
 ):
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    if payload.get("role") != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Only admins can update pizzas")
-    
-    updated_pizza = PizzaService.update_pizza(db, pizza_id, pizza_update)
-    # Convert to dict and include all necessary fields
-    return {
-        "message": "Pizza updated successfully",
-        "pizza": {
-            "pizza_id": str(updated_pizza.pizza_id),
-            "name": updated_pizza.name,
-            "description": updated_pizza.description,
-            "base_price": updated_pizza.base_price,
-            "category": updated_pizza.category,
-            "sizes": updated_pizza.sizes,
-            "image_url": updated_pizza.image_url
-        }
-    }
+    updated_pizza = await PizzaService.update_pizza(db, pizza_id, pizza_update)
+    return {"message": "Pizza updated successfully", "pizza": updated_pizza}
 
 @router.delete("/pizzas/{pizza_id}")
-def delete_pizza(
+async def delete_pizza(
     pizza_id: uuid.UUID,  # FastAPI will automatically validate and parse this
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can delete pizzas"))
 ) -> dict:
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        if payload.get("role") != UserRole.ADMIN:
-            raise HTTPException(status_code=403, detail="Only admins can delete pizzas")
-        
-        PizzaService.delete_pizza(db, pizza_id)
-        return {"message": "Pizza deleted successfully"}
-        
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+    await PizzaService.delete_pizza(db, pizza_id)
+    return {"message": "Pizza deleted successfully"}
\ No newline at end of file
@@ -1,53 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-import jwt
+from fastapi import APIRouter, Depends, Request
+from pydantic import TypeAdapter
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
-from app.core.config import settings
 from app.models.models import UserRole
-from app.core.database import get_db
-from app.schema.toppings import ToppingCreate, ToppingUpdate
-from app.core.security import JWTBearer
+from app.core.database import get_async_db
+from app.schema.toppings import ToppingCreate, ToppingUpdate, ToppingResponse
+from app.core.security import CurrentUser, require_role
 from app.services.toppings_services import ToppingService
+from app.services.menu_cache import MenuCache
 
 
 
 router = APIRouter()
 
-@router.get("/toppings")
-def get_toppings(db: Session = Depends(get_db)):
+_toppings_adapter = TypeAdapter(List[ToppingResponse])
 
-    return ToppingService.get_toppings(db)
+@router.get("/toppings", response_model=List[ToppingResponse])
+async def get_toppings(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build_toppings() -> bytes:
+        toppings = await ToppingService.get_toppings(db)
+        return _toppings_adapter.dump_json(_toppings_adapter.validate_python(toppings, from_attributes=True))
 
-@router.post("/toppings")
-def create_topping(
+    return await MenuCache.respond(request, "toppings", build_toppings, db)
+
+@router.post("/toppings", response_model=ToppingResponse)
+async def create_topping(
     topping: ToppingCreate,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can create toppings"))
 ):
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    if payload.get("role") != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Only admins can create toppings")
-    return ToppingService.create_topping(db, topping)
+    return await ToppingService.create_topping(db, topping)
 
-@router.put("/toppings/{topping_id}")
-def update_topping(
+@router.put("/toppings/{topping_id}", response_model=ToppingResponse)
+async def update_topping(
     topping_id: uuid.UUID,
     topping: ToppingUpdate,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can update toppings"))
 ):
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    if payload.get("role") != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Only admins can update toppings")
-    return ToppingService.update_topping(db, topping_id, topping)
+    return await ToppingService.update_topping(db, topping_id, topping)
 
 @router.delete("/toppings/{topping_id}")
-def delete_topping(
+async def delete_topping(
     topping_id: uuid.UUID,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins can delete toppings"))
 ):
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    if payload.get("role") != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Only admins can delete toppings")
-    ToppingService.delete_topping(db, topping_id)
\ No newline at end of file
+    await ToppingService.delete_topping(db, topping_id)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import gzip
+from typing import Optional
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.static_files import is_compressible, parse_accept_encoding
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies at least this large are compressed in a worker thread
+THREAD_MINIMUM_SIZE = 256 * 1024
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts: br when available, then gzip."""
+    accepted = parse_accept_encoding(accept_encoding)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, mode=brotli.MODE_TEXT, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+class CompressionMiddleware:
+    """Brotli or gzip for complete JSON and text responses of at least minimum_size bytes.
+
+    Only responses sent in one piece are compressed. Streams (order exports,
+    server-sent events) pass through untouched so they are never buffered,
+    and so do ranges, bodies that already carry a Content-Encoding (the
+    precompressed static files) and types that are compressed already.
+    The quality levels favour speed, as every response is compressed anew.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+                if (
+                    message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or media_type == "text/event-stream"
+                    or not is_compressible(media_type)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message  # held back until we know whether the body is compressed
+                return
+            if passthrough or start is None:
+                await send(message)
+                return
+            if message["type"] != "http.response.body":  # e.g. pathsend: nothing for us to compress
+                passthrough = True
+                response_start, start = start, None
+                await send(response_start)
+                await send(message)
+                return
+
+            response_start, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=response_start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(response_start)
+                await send(message)
+                return
+
+            if len(body) >= THREAD_MINIMUM_SIZE:
+                body = await anyio.to_thread.run_sync(compress, body, encoding, self.gzip_level, self.brotli_quality)
+            else:
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            # The compressed bytes are a different representation of the same resource
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send(response_start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
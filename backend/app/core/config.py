@@ -1,13 +1,20 @@
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL when unset
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
+    TOKEN_CACHE_SIZE: int = 1024  # verified tokens kept in memory, 0 disables the cache
+    TOKEN_CACHE_TTL_SECONDS: float = 300
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # defaults to the CPU count, 0 hashes in the threadpool
     SMTP_SERVER: str
     SMTP_PORT: int
+    SMTP_USE_TLS: bool = True
     SENDER_EMAIL: str
     SENDER_PASSWORD: str
     TWILIO_ACCOUNT_SID: str
@@ -16,6 +23,54 @@ class Settings(BaseSettings):
     FRONTEND_URL: str
     STRIPE_SECRET_KEY: str
     STRIPE_WEBHOOK_SECRET: str
+    PAYMENT_GATEWAY: str = "stripe"  # "fake" skips Stripe entirely, for tests and local development
+    STRIPE_API_BASE: str = "https://api.stripe.com"
+    STRIPE_TIMEOUT_SECONDS: float = 10
+    STRIPE_MAX_CONNECTIONS: int = 20
+    PAYMENT_EVENT_BATCH_SIZE: int = 500  # Stripe events applied per worker pass
+    PAYMENT_EVENT_POLL_SECONDS: float = 0.5
+    ORDER_STATUS_INTERVAL_SECONDS: int = 15
+    ORDER_STATUS_TICK_SECONDS: float = 1.0
+    ORDER_STATUS_RESYNC_SECONDS: float = 5.0  # how often the scheduling worker picks up orders placed on other workers
+    ORDER_EVENTS_QUEUE_SIZE: int = 16  # pending events per live watcher before the oldest are dropped
+    ORDER_EVENTS_HEARTBEAT_SECONDS: float = 15
+    ORDER_EVENTS_BACKEND: Optional[str] = None  # "postgres" or "memory"; postgres whenever the database is
+    ORDER_EVENTS_CHANNEL: str = "order_events"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 disables recycling
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 disables the server-side timeout
+    MENU_CACHE_SHARED_VERSION: bool = False  # sync menu cache across workers via cache_versions
+    MENU_CACHE_VERSION_CHECK_SECONDS: float = 2.0
+    IMAGE_MAX_BYTES: int = 5 * 1024 * 1024
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640, 1280]
+    IMAGE_VARIANT_FORMATS: List[str] = ["avif", "webp"]  # preferred first; formats Pillow cannot encode are skipped
+    STATIC_CACHE_MAX_AGE_SECONDS: int = 3600  # for static files without a content hash in their name
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # smaller responses are sent as they are
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # used when the brotli package is installed
+    NOTIFICATION_CONCURRENCY: int = 4
+    NOTIFICATION_BATCH_SIZE: int = 50
+    NOTIFICATION_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_RETRY_BASE_SECONDS: float = 5.0
+    NOTIFICATION_POLL_SECONDS: float = 1.0
+    NOTIFICATION_LEASE_SECONDS: float = 300  # how long a claimed batch stays hidden from other workers
+    COUPON_CACHE_TTL_SECONDS: float = 30
+    COUPON_CACHE_NEGATIVE_TTL_SECONDS: float = 60  # how long an unknown code keeps answering 404 from memory
+    COUPON_CACHE_SIZE: int = 10000
+    COUPON_CACHE_USERS: int = 10000
+    IDEMPOTENCY_TTL_SECONDS: float = 86400  # how long a completed response is replayed
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "database" shares the buckets between workers
+    RATE_LIMIT_LOGIN: str = "10/minute"  # per client IP
+    RATE_LIMIT_REGISTER: str = "5/minute"  # per client IP
+    RATE_LIMIT_CHECKOUT: str = "10/minute"  # per user, placing orders and creating payment links
+    SLOW_QUERY_MS: float = 500  # statements at least this slow are logged with their parameters, 0 disables
+    SQL_TRACE_TTL_SECONDS: float = 300  # how long an admin's SQL trace stays readable
+    METRICS_TOKEN: Optional[str] = None  # when set, GET /metrics requires "Authorization: Bearer <token>"
 
 
     class Config:
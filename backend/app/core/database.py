@@ -1,10 +1,154 @@
-from sqlalchemy import create_engine
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import Histogram
 
-engine = create_engine(settings.DATABASE_URL)
+class PoolMetrics:
+    def __init__(self):
+        self.wait_time = Histogram()         # time spent blocked waiting for a free connection
+        self.checkout_latency = Histogram()  # full checkout, including connect and pre-ping
+        self.hold_time = Histogram()         # how long a connection stays checked out
+
+class InstrumentedPoolMixin:
+    """Records wait time and checkout latency for a QueuePool."""
+    metrics: PoolMetrics
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.metrics.checkout_latency.observe(time.perf_counter() - start)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metrics.wait_time.observe(time.perf_counter() - start)
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    metrics = PoolMetrics()
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+def async_database_url(url: str):
+    """Map the sync DATABASE_URL onto the matching asyncio driver."""
+    url = make_url(url)
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    return url.set(drivername=drivers.get(url.get_backend_name(), url.drivername))
+
+def engine_options(url, asynchronous: bool = False) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite uses its own single-connection pools
+        return {}
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        if asynchronous:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+def instrument_pool(engine, metrics: PoolMetrics):
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            metrics.hold_time.observe(time.perf_counter() - checked_out_at)
+
+@dataclass
+class QueryStats:
+    """Statements run on behalf of one request, and the time they took."""
+    count: int = 0
+    seconds: float = 0.0
+    request: str = ""  # "<method> <path>", for the slow-query log
+    statements: Optional[List[Tuple[str, float]]] = None  # (statement, seconds), only while tracing
+
+# Set by the request metrics middleware; statements run outside a request are not counted
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+def instrument_queries(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started_at = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started_at
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+            if stats.statements is not None:
+                stats.statements.append((statement, elapsed))
+        if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            log_slow_query(statement, parameters, elapsed, stats)
+
+def _shorten(value, limit: int = 200) -> str:
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def log_slow_query(statement: str, parameters, elapsed: float, stats: Optional[QueryStats]):
+    source = stats.request if stats is not None and stats.request else "background"
+    print(
+        f"Slow query ({elapsed * 1000:.1f} ms) from {source}: {' '.join(statement.split())} "
+        f"params={_shorten(parameters)}"
+    )
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "timeout": pool.timeout(),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update({
+            "wait_time": metrics.wait_time.snapshot(),
+            "checkout_latency": metrics.checkout_latency.snapshot(),
+            "hold_time": metrics.hold_time.snapshot(),
+        })
+    return stats
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+instrument_pool(engine, InstrumentedQueuePool.metrics)
+instrument_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+_async_url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(_async_url, **engine_options(_async_url, asynchronous=True))
+instrument_pool(async_engine.sync_engine, InstrumentedAsyncQueuePool.metrics)
+instrument_queries(async_engine.sync_engine)
+AsyncSessionLocal = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -12,4 +156,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_async_session_factory():
+    # For responses that outlive the request scope, e.g. streamed exports
+    return AsyncSessionLocal
@@ -0,0 +1,139 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Thread-safe histogram with fixed, Prometheus-style cumulative buckets (seconds)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[str(bound)] = running
+        running += counts[-1]
+        cumulative["+Inf"] = running
+
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+class Counter:
+    """Thread-safe value that only goes up."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+class Gauge(Counter):
+    """Thread-safe value that goes up and down."""
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Family:
+    """A metric with one child per combination of label values, rendered in Prometheus text format."""
+
+    def __init__(self, kind: str, name: str, documentation: str, labelnames: Sequence[str] = (), factory: Callable = None):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._factory = factory or {"counter": Counter, "gauge": Gauge, "histogram": Histogram}[kind]
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, values: Tuple[str, ...], child):
+        """Expose an existing metric as the child for values."""
+        with self._lock:
+            self._children[values] = child
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            pairs = list(zip(self.labelnames, values))
+            if isinstance(child, Histogram):
+                snapshot = child.snapshot()
+                for bound, count in snapshot["buckets"].items():
+                    lines.append(f"{self.name}_bucket{_labels(pairs + [('le', bound)])} {count}")
+                lines.append(f"{self.name}_sum{_labels(pairs)} {_number(snapshot['sum'])}")
+                lines.append(f"{self.name}_count{_labels(pairs)} {snapshot['count']}")
+            else:
+                lines.append(f"{self.name}{_labels(pairs)} {_number(child.value)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._families: Dict[str, Family] = {}
+        self._collectors: List[Callable[[], List[Family]]] = []
+
+    def register(self, family: Family) -> Family:
+        self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Family:
+        return self.register(Family("counter", name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Family:
+        return self.register(Family("gauge", name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Family:
+        return self.register(Family("histogram", name, documentation, labelnames, lambda: Histogram(buckets)))
+
+    def add_collector(self, collect: Callable[[], List[Family]]):
+        """Register a function building families at scrape time, for values owned elsewhere."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        families = list(self._families.values())
+        for collect in self._collectors:
+            families.extend(collect())
+        return "\n".join(line for family in families for line in family.render()) + "\n"
+
+REGISTRY = Registry()
@@ -0,0 +1,64 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# These run inside the worker processes, which build pwd_context from the same settings
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    if not pwd_context.verify(password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(password)
+    return True, None
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool, off the event loop and the request threadpool.
+
+    At most max_workers hashes run at once, one per process, so a burst of
+    logins saturates the hashing cores without starving other requests.
+    With max_workers=0 hashing falls back to the shared threadpool.
+    """
+    _executor: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def max_workers(cls) -> int:
+        if settings.PASSWORD_HASH_WORKERS is not None:
+            return settings.PASSWORD_HASH_WORKERS
+        return os.cpu_count() or 1
+
+    @classmethod
+    def executor(cls) -> Optional[ProcessPoolExecutor]:
+        if cls._executor is None and cls.max_workers() > 0:
+            cls._executor = ProcessPoolExecutor(max_workers=cls.max_workers())
+        return cls._executor
+
+    @classmethod
+    async def _run(cls, fn, *args):
+        executor = cls.executor()
+        if executor is None:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    @classmethod
+    async def hash(cls, password: str) -> str:
+        return await cls._run(_hash, password)
+
+    @classmethod
+    async def verify(cls, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Check a password; on success also return a fresh hash if the stored one is outdated."""
+        return await cls._run(_verify, password, hashed_password)
+
+    @classmethod
+    def shutdown(cls):
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True, cancel_futures=True)
+            cls._executor = None
@@ -0,0 +1,191 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import select, text
+from app.core.config import settings
+from app.core.security import CurrentUser, get_current_user
+from app.models.models import RateLimitBucket
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+@dataclass(frozen=True)
+class Limit:
+    """A token bucket holding up to burst tokens, refilled one token every interval seconds."""
+    burst: int
+    interval: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "Limit":
+        """Parse "10/minute" into a bucket of 10 tokens refilled over a minute."""
+        try:
+            count, _, period = spec.partition("/")
+            count = int(count)
+            return cls(burst=count, interval=_PERIODS[period.strip().lower().rstrip("s")] / count)
+        except (KeyError, ValueError, ZeroDivisionError):
+            raise ValueError(f"Invalid rate limit {spec!r}, expected e.g. '10/minute'")
+
+    @property
+    def window(self) -> float:
+        # How far ahead of now a full bucket's worth of requests may be booked
+        return self.burst * self.interval
+
+def admit(tat: Optional[float], now: float, limit: Limit) -> Optional[float]:
+    """New bucket state if a request is allowed at now, else None.
+
+    The bucket is kept as a single number, the time at which it will be
+    full again (its theoretical arrival time): each request pushes it one
+    interval further, and a request is refused when that would take it
+    more than a full bucket ahead of now.
+    """
+    tat = max(tat or now, now) + limit.interval
+    return tat if tat - limit.window <= now else None
+
+def retry_after(tat: float, now: float, limit: Limit) -> float:
+    return max(0.0, tat + limit.interval - limit.window - now)
+
+class InMemoryBackend:
+    """Buckets for this process only, enough for a single worker.
+
+    Keys are spread over shards so that expiry stays cheap: a shard is
+    swept of buckets that have refilled completely (and so carry no state)
+    when it is next written to after sweep_seconds, one shard at a time,
+    rather than by a background task or a pass over every key.
+    """
+
+    def __init__(self, shards: int = 64, sweep_seconds: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self._shards: List[Dict[str, float]] = [{} for _ in range(shards)]
+        self._swept_at = [0.0] * shards
+        self.sweep_seconds = sweep_seconds
+        self.clock = clock
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        """Take a token from key's bucket; 0 if allowed, otherwise seconds until one is available."""
+        now = self.clock()
+        index = hash(key) % len(self._shards)
+        shard = self._shards[index]
+        if now - self._swept_at[index] >= self.sweep_seconds:
+            self._swept_at[index] = now
+            for expired in [k for k, tat in shard.items() if tat <= now]:
+                del shard[expired]
+
+        tat = shard.get(key)
+        allowed = admit(tat, now, limit)
+        if allowed is None:
+            return retry_after(tat, now, limit)
+        shard[key] = allowed
+        return 0.0
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def clear(self):
+        for shard in self._shards:
+            shard.clear()
+
+class DatabaseBackend:
+    """Buckets in the rate_limit_buckets table, shared by every worker.
+
+    Each request is one upsert that only writes when the request is
+    allowed; a refused request costs one more read for its Retry-After.
+    Rows whose bucket has refilled are deleted by whichever worker next
+    writes after sweep_seconds. Workers use the wall clock, so their
+    clocks need to agree to within a fraction of the shortest interval.
+    """
+
+    _UPSERT = text(
+        "INSERT INTO rate_limit_buckets (key, tat) VALUES (:key, :allowed_tat) "
+        "ON CONFLICT (key) DO UPDATE "
+        "SET tat = (CASE WHEN rate_limit_buckets.tat > :now THEN rate_limit_buckets.tat ELSE :now END) + :interval "
+        "WHERE (CASE WHEN rate_limit_buckets.tat > :now THEN rate_limit_buckets.tat ELSE :now END) "
+        "+ :interval - :window <= :now "
+        "RETURNING tat"
+    )
+
+    def __init__(self, session_factory, sweep_seconds: float = 60.0, clock: Callable[[], float] = time.time):
+        self.session_factory = session_factory
+        self.sweep_seconds = sweep_seconds
+        self.clock = clock
+        self._swept_at = 0.0
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        now = self.clock()
+        async with self.session_factory() as db:
+            result = await db.execute(self._UPSERT, {
+                "key": key,
+                "now": now,
+                "allowed_tat": now + limit.interval,
+                "interval": limit.interval,
+                "window": limit.window,
+            })
+            allowed = result.first() is not None
+            if not allowed:
+                tat = (await db.execute(select(RateLimitBucket.tat).where(RateLimitBucket.key == key))).scalar()
+            if now - self._swept_at >= self.sweep_seconds:
+                self._swept_at = now
+                await db.execute(text("DELETE FROM rate_limit_buckets WHERE tat <= :now"), {"now": now})
+            await db.commit()
+        return 0.0 if allowed else retry_after(tat, now, limit)
+
+def create_backend():
+    if settings.RATE_LIMIT_BACKEND == "database":
+        from app.core.database import AsyncSessionLocal
+        return DatabaseBackend(AsyncSessionLocal)
+    return InMemoryBackend()
+
+class RateLimiter:
+    """Per-route token buckets keyed by client IP or user.
+
+    Limits are read from settings on every request, as "<count>/<period>"
+    strings: count requests may come at once, and the bucket refills at
+    count per period. The in-memory backend limits each worker separately;
+    set RATE_LIMIT_BACKEND=database to share buckets between workers.
+    """
+    _backend = None
+    _limits: Dict[str, Limit] = {}
+
+    @classmethod
+    def backend(cls):
+        if cls._backend is None:
+            cls._backend = create_backend()
+        return cls._backend
+
+    @classmethod
+    def use_backend(cls, backend):
+        cls._backend = backend
+
+    @classmethod
+    def limit(cls, spec: str) -> Limit:
+        limit = cls._limits.get(spec)
+        if limit is None:
+            limit = cls._limits[spec] = Limit.parse(spec)
+        return limit
+
+    @classmethod
+    async def check(cls, scope: str, identity: str, spec: str):
+        """Take a token for identity in scope, or raise 429 with Retry-After."""
+        wait = await cls.backend().hit(f"{scope}:{identity}", cls.limit(spec))
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please try again later.",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the real client
+    return request.client.host if request.client else "unknown"
+
+def rate_limit(scope: str, setting: str, per_user: bool = False):
+    """Dependency that limits a route to the rate in settings.<setting>, per client IP or per user."""
+    if per_user:
+        async def limit_user(user: CurrentUser = Depends(get_current_user)):
+            if settings.RATE_LIMIT_ENABLED:
+                await RateLimiter.check(scope, str(user.user_id), getattr(settings, setting))
+        return limit_user
+
+    async def limit_ip(request: Request):
+        if settings.RATE_LIMIT_ENABLED:
+            await RateLimiter.check(scope, client_ip(request), getattr(settings, setting))
+    return limit_ip
@@ -0,0 +1,97 @@
+import time
+from typing import List
+from sqlalchemy.pool import QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.database import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    QueryStats,
+    async_engine,
+    current_query_stats,
+    engine,
+)
+from app.core.metrics import REGISTRY, Family
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.", ("method", "route", "status")
+)
+LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last of its response.", ("method", "route")
+)
+IN_PROGRESS = REGISTRY.gauge(
+    "http_requests_in_progress", "Requests being handled right now.", ("method",)
+)
+DB_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries", "SQL statements run while handling one request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+DB_TIME = REGISTRY.histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements while handling one request.", ("method", "route")
+)
+
+_POOL_HISTOGRAMS = [
+    ("db_pool_wait_seconds", "Time spent waiting for a free pooled connection.", "wait_time"),
+    ("db_pool_checkout_seconds", "Time to check out a connection, including connecting and pre-ping.", "checkout_latency"),
+    ("db_pool_hold_seconds", "How long connections stay checked out.", "hold_time"),
+]
+for _name, _documentation, _attribute in _POOL_HISTOGRAMS:
+    _family = REGISTRY.histogram(_name, _documentation, ("pool",))
+    _family.attach(("sync",), getattr(InstrumentedQueuePool.metrics, _attribute))
+    _family.attach(("async",), getattr(InstrumentedAsyncQueuePool.metrics, _attribute))
+
+def _collect_pool_usage() -> List[Family]:
+    checked_out = Family("gauge", "db_pool_checked_out", "Connections currently checked out of the pool.", ("pool",))
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        if isinstance(pool, QueuePool):
+            checked_out.labels(name).inc(pool.checkedout())
+    return [checked_out]
+
+REGISTRY.add_collector(_collect_pool_usage)
+
+def route_label(scope: Scope) -> str:
+    # The route template rather than the raw path, so ids do not each become a series
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """Records latency, status codes and SQL work for every HTTP request.
+
+    Statements are attributed to a request through current_query_stats,
+    which the engine hooks in app.core.database update. Streaming responses
+    are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = QueryStats(request=f"{method} {scope['path']}")
+        token = current_query_stats.set(stats)
+        in_progress = IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            current_query_stats.reset(token)
+            route = route_label(scope)
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            LATENCY.labels(method, route).observe(elapsed)
+            DB_QUERIES.labels(method, route).observe(stats.count)
+            DB_TIME.labels(method, route).observe(stats.seconds)
@@ -1,68 +1,126 @@
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+import hashlib
+import threading
+import time
 import jwt
 from .config import settings
 from uuid import UUID
+from app.models.models import UserRole
 
 security = HTTPBearer()
 
-class JWTBearer:
-    def __init__(self, auto_error: bool = True):
-        self.auto_error = auto_error
-        self.security = HTTPBearer(auto_error=auto_error)
-
-    async def __call__(self, auth: HTTPAuthorizationCredentials = Security(security)):
-        if auth:
-            if not auth.scheme == "Bearer":
-                raise HTTPException(status_code=403, detail="Invalid authentication scheme.")
-            if not self.verify_jwt(auth.credentials):
-                raise HTTPException(status_code=403, detail="Invalid token or expired token.")
-            return auth.credentials
-        else:
-            raise HTTPException(status_code=403, detail="Invalid authorization code.")
-
-    def verify_jwt(self, jwt_token: str) -> bool:
-        try:
-            payload = jwt.decode(jwt_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-            return True if payload["expires"] >= datetime.utcnow().timestamp() else False
-        except JWTError:
-            return False
+@dataclass(frozen=True)
+class CurrentUser:
+    user_id: UUID
+    role: UserRole
+    expires: float  # unix timestamp, compared with time.time()
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+class TokenCache:
+    """Bounded LRU of verified tokens, keyed by a hash of the token.
+
+    An entry lives for at most ttl seconds and never past the token's own
+    expiry, so a cached principal is always one that would still verify.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, CurrentUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            valid_until, user = entry
+            if valid_until < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def put(self, token: str, user: CurrentUser):
+        if self.maxsize <= 0:
+            return
+        valid_until = min(time.time() + self.ttl, user.expires)
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (valid_until, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
+
+def decode_token(token: str) -> CurrentUser:
+    """Verify an access token once and return its principal, using the cache when possible."""
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user = CurrentUser(
+            user_id=UUID(payload["sub"]),
+            role=UserRole(payload.get("role", UserRole.USER)),
+            expires=float(payload["expires"])
+        )
+    except (jwt.PyJWTError, KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=403, detail="Invalid token or expired token.")
+    if user.expires < time.time():
+        raise HTTPException(status_code=403, detail="Invalid token or expired token.")
+
+    token_cache.put(token, user)
+    return user
+
+def get_current_user(auth: HTTPAuthorizationCredentials = Security(security)) -> CurrentUser:
+    if not auth:
+        raise HTTPException(status_code=403, detail="Invalid authorization code.")
+    if not auth.scheme == "Bearer":
+        raise HTTPException(status_code=403, detail="Invalid authentication scheme.")
+    return decode_token(auth.credentials)
+
+def require_role(*roles: UserRole, detail: str = "Insufficient permissions"):
+    """Dependency that returns the current user if they hold one of roles, else 403."""
+    def guard(user: CurrentUser = Security(get_current_user)) -> CurrentUser:
+        if user.role not in roles:
+            raise HTTPException(status_code=403, detail=detail)
+        return user
+    return guard
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"expires": expire.timestamp()})
+    to_encode.update({"expires": time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"expires": expire.timestamp()})
+    to_encode.update({"expires": time.time() + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-async def get_current_user_ws(token: str) -> Optional[UUID]:
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        
-        user_id = payload.get("sub")
-        expires = payload.get("expires")
-        current_time = datetime.utcnow().timestamp()
-        
-        if expires and expires < current_time:
-            return None
-            
-        return user_id
-        
-    except jwt.ExpiredSignatureError as e:
+async def get_current_user_ws(token: Optional[str]) -> Optional[CurrentUser]:
+    """Authenticate a WebSocket by the token it passed in the query string; None if it is not valid."""
+    if not token:
         return None
-    except jwt.PyJWTError as e:
-        return None
-    except Exception as e:
+    try:
+        return decode_token(token)
+    except HTTPException:
         return None
\ No newline at end of file
@@ -0,0 +1,104 @@
+import uuid
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.core.database import QueryStats, current_query_stats
+from app.core.security import decode_token
+
+TRACE_HEADER = "X-SQL-Trace"
+TRACE_ID_HEADER = "X-SQL-Trace-Id"
+
+def summarize(statements: List[Tuple[str, float]]) -> dict:
+    """Totals for a trace, with statements that ran more than once (the N+1 suspects) first."""
+    runs: Dict[str, List] = {}  # normalized statement -> [count, seconds]
+    for statement, elapsed in statements:
+        run = runs.setdefault(" ".join(statement.split()), [0, 0.0])
+        run[0] += 1
+        run[1] += elapsed
+    return {
+        "count": len(statements),
+        "duration_ms": round(sum(elapsed for _, elapsed in statements) * 1000, 3),
+        "duplicates": sum(count - 1 for count, _ in runs.values()),
+        "statements": [
+            {"sql": sql, "count": count, "duration_ms": round(seconds * 1000, 3)}
+            for sql, (count, seconds) in sorted(runs.items(), key=lambda item: (-item[1][0], -item[1][1]))
+        ],
+    }
+
+def header_value(summary: dict) -> str:
+    return f"count={summary['count']}, duration_ms={summary['duration_ms']}, duplicates={summary['duplicates']}"
+
+class SqlTraceStore:
+    """Recent admin SQL traces, readable by id from GET /api/admin/sql-traces/{trace_id}."""
+    _traces = TTLCache(256)
+
+    @classmethod
+    def put(cls, trace_id: str, request: str, summary: dict):
+        cls._traces.put(trace_id, {"trace_id": trace_id, "request": request, **summary}, settings.SQL_TRACE_TTL_SECONDS)
+
+    @classmethod
+    def get(cls, trace_id: str) -> Optional[dict]:
+        trace = cls._traces.get(trace_id)
+        return None if trace is MISSING else trace
+
+    @classmethod
+    def clear(cls):
+        cls._traces.clear()
+
+def wants_trace(scope: Scope) -> bool:
+    """Whether an admin asked for a trace, with an X-SQL-Trace: 1 header or ?sql_trace=1."""
+    headers = Headers(scope=scope)
+    flag = headers.get(TRACE_HEADER) or QueryParams(scope.get("query_string", b"")).get("sql_trace")
+    if flag not in ("1", "true"):
+        return False
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return decode_token(token).is_admin
+    except HTTPException:
+        return False
+
+class SqlTraceMiddleware:
+    """Per-request SQL trace for admins who ask for one.
+
+    The response carries an X-SQL-Trace header with the statement count,
+    total time and number of repeated statements so far, and an
+    X-SQL-Trace-Id for the full breakdown, which also includes statements
+    run after the headers went out (streamed bodies, background tasks).
+    Requests from anyone else are passed through untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not wants_trace(scope):
+            await self.app(scope, receive, send)
+            return
+
+        stats = current_query_stats.get()
+        token = None
+        if stats is None:
+            stats = QueryStats(request=f"{scope['method']} {scope['path']}")
+            token = current_query_stats.set(stats)
+        stats.statements = []
+        trace_id = uuid.uuid4().hex
+
+        async def send_with_trace(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers[TRACE_HEADER] = header_value(summarize(stats.statements))
+                headers[TRACE_ID_HEADER] = trace_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            SqlTraceStore.put(trace_id, f"{scope['method']} {scope['path']}", summarize(stats.statements))
+            stats.statements = None
+            if token is not None:
+                current_query_stats.reset(token)
@@ -0,0 +1,116 @@
+import mimetypes
+import os
+import re
+import stat
+from typing import List, Optional, Set, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Names that change whenever the content does: our content hashes (with an
+# optional -<width> for resized variants) and the uuid names of older uploads
+_FINGERPRINTED = re.compile(
+    r"^(?:[0-9a-f]{32}|[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12})(?:-\d+)?\.[A-Za-z0-9]+$"
+)
+
+# Precompressed siblings we look for, best first
+_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+def is_fingerprinted(path: str) -> bool:
+    return bool(_FINGERPRINTED.match(os.path.basename(path)))
+
+def is_compressible(media_type: str) -> bool:
+    # Images, fonts and video are compressed already, so no sibling is worth a stat
+    return media_type.startswith("text/") or media_type in (
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "application/wasm",
+        "image/svg+xml",
+    )
+
+def parse_accept_encoding(value: str) -> Set[str]:
+    """Content codings the client accepts, leaving out those refused with q=0."""
+    accepted = set()
+    for part in value.lower().split(","):
+        coding, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, q = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(q)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip())
+    return accepted
+
+def accepted_encodings(scope: Scope) -> List[Tuple[str, str]]:
+    accepted = parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+    return [(encoding, suffix) for encoding, suffix in _ENCODINGS if encoding in accepted or "*" in accepted]
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with browser caching and precompressed assets.
+
+    Files whose names are fingerprinted never change, so they are sent with
+    a year-long immutable Cache-Control and a repeat visit does not even
+    revalidate them; anything else may be cached for max_age seconds and
+    is then revalidated with its ETag. For compressible types a .br or .gz
+    file next to the original is sent instead when the client accepts it.
+    Range requests and zero-copy sending (where the server offers the
+    pathsend extension) come from FileResponse.
+    """
+
+    def __init__(self, *args, max_age: int = 3600, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_age = max_age
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD"):
+            media_type = mimetypes.guess_type(path)[0] or "text/plain"
+            if is_compressible(media_type):
+                for encoding, suffix in accepted_encodings(scope):
+                    try:
+                        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                    except (OSError, ValueError):
+                        break  # let the plain lookup decide how to fail
+                    if stat_result and stat.S_ISREG(stat_result.st_mode):
+                        return self.file_response(
+                            full_path, stat_result, scope,
+                            media_type=media_type, content_encoding=encoding, cache_path=path
+                        )
+        return await super().get_response(path, scope)
+
+    def cache_control(self, path: str) -> str:
+        if is_fingerprinted(path):
+            return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        return f"public, max-age={self.max_age}"
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+        media_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+        cache_path: Optional[str] = None,
+    ) -> Response:
+        headers = {"Cache-Control": self.cache_control(cache_path or str(full_path))}
+        media_type = media_type or mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        if is_compressible(media_type):
+            headers["Vary"] = "Accept-Encoding"
+        if content_encoding:
+            headers["Content-Encoding"] = content_encoding
+
+        response = FileResponse(
+            full_path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -1,7 +1,7 @@
 from sqlalchemy import Column, String, Enum as SQLAlchemyEnum, Enum as SQLEnum
 from app.core.database import Base
 import enum
-from sqlalchemy import Table, ForeignKey, Column, Integer, Float, DateTime, Boolean, JSON
+from sqlalchemy import Table, ForeignKey, Column, Integer, Float, DateTime, Boolean, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -29,7 +29,10 @@ pizza_toppings = Table(
     'pizza_toppings',
     Base.metadata,
     Column('pizza_id', UUID(as_uuid=True), ForeignKey('pizzas.pizza_id')),
-    Column('topping_id', UUID(as_uuid=True), ForeignKey('toppings.topping_id'))
+    Column('topping_id', UUID(as_uuid=True), ForeignKey('toppings.topping_id')),
+    # Loading a pizza's toppings goes through pizza_id, a topping's pizzas through topping_id
+    Index("ix_pizza_toppings_pizza_id_topping_id", "pizza_id", "topping_id"),
+    Index("ix_pizza_toppings_topping_id_pizza_id", "topping_id", "pizza_id"),
 )
 
 class PizzaSizeEnum(str, enum.Enum):
@@ -41,7 +44,7 @@ class PizzaSize(Base):
     __tablename__ = "s"
 
     size_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    pizza_id = Column(UUID(as_uuid=True), ForeignKey('pizzas.pizza_id'))
+    pizza_id = Column(UUID(as_uuid=True), ForeignKey('pizzas.pizza_id'), index=True)
     size = Column(SQLAlchemyEnum(PizzaSizeEnum), nullable=False)
     price = Column(Float, nullable=False)
     pizza = relationship("Pizza", back_populates="sizes")
@@ -61,11 +64,22 @@ class Pizza(Base):
     description = Column(String)
     base_price = Column(Float, nullable=False)
     image_url = Column(String)
+    image_variants = Column(JSON, nullable=True)  # [{"format", "width", "url"}], filled in after upload
     category = Column(SQLAlchemyEnum(PizzaCategory), nullable=False)
     toppings = relationship("Topping", secondary=pizza_toppings, back_populates="pizzas")
     orders = relationship("OrderItem", back_populates="pizza")
     sizes = relationship("PizzaSize", back_populates="pizza")
 
+    @property
+    def image_srcset(self) -> dict:
+        """srcset strings by MIME type, e.g. {"image/webp": "a-320.webp 320w, a-640.webp 640w"}."""
+        srcset = {}
+        for variant in sorted(self.image_variants or [], key=lambda v: v["width"]):
+            mime_type = f"image/{variant['format']}"
+            entry = f"{variant['url']} {variant['width']}w"
+            srcset[mime_type] = f"{srcset[mime_type]}, {entry}" if mime_type in srcset else entry
+        return srcset
+
 class Topping(Base):
     __tablename__ = "toppings"
     
@@ -82,6 +96,11 @@ class OrderStatus(str, enum.Enum):
     READY = "READY"
     DELIVERED = "DELIVERED"
 
+class PaymentStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
 class Order(Base):
     __tablename__ = "orders"
     
@@ -90,6 +109,10 @@ class Order(Base):
     total_amount = Column(Float, nullable=False)
     order_date = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     status = Column(SQLEnum(OrderStatus), default=OrderStatus.RECEIVED)
+    payment_status = Column(
+        SQLEnum(PaymentStatus), nullable=False, default=PaymentStatus.PENDING, server_default=PaymentStatus.PENDING.value
+    )
+    payment_intent_id = Column(String, nullable=True)
     delivery_address = Column(String, nullable=False)
     contact_number = Column(String, nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc)) 
@@ -101,11 +124,18 @@ class Order(Base):
     # coupon = relationship("Coupon")
     # coupon_usages = relationship("CouponUsage", uselist=False, back_populates="order")
 
+    # Keyset pagination of the admin order history walks (created_at, order_id)
+    __table_args__ = (
+        Index("ix_orders_created_at_order_id", "created_at", "order_id"),
+        Index("ix_orders_status_created_at_order_id", "status", "created_at", "order_id"),
+        Index("ix_orders_user_id_created_at_order_id", "user_id", "created_at", "order_id"),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
     
     item_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    order_id = Column(UUID(as_uuid=True), ForeignKey('orders.order_id'), nullable=False)
+    order_id = Column(UUID(as_uuid=True), ForeignKey('orders.order_id'), nullable=False, index=True)
     pizza_id = Column(UUID(as_uuid=True), ForeignKey('pizzas.pizza_id'), nullable=False)
     quantity = Column(Integer, nullable=False)
     custom_toppings = Column(JSON, default=list)
@@ -144,4 +174,71 @@ class CouponUsage(Base):
     order_id = Column(UUID(as_uuid=True), ForeignKey('orders.order_id'), nullable=False)
     used_at = Column(DateTime, default=datetime.utcnow)
     discount_amount = Column(Float, nullable=False)
-    # order = relationship("Order", back_populates="coupon_usages")
\ No newline at end of file
+    # order = relationship("Order", back_populates="coupon_usages")
+
+    __table_args__ = (
+        # One redemption per user; also what makes concurrent double-redemption fail
+        UniqueConstraint("coupon_id", "user_id", name="uq_coupon_usages_coupon_id_user_id"),
+        # The coupons a user has already redeemed, read without touching the table
+        Index("ix_coupon_usages_user_id_coupon_id", "user_id", "coupon_id"),
+    )
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class RateLimitBucket(Base):
+    """Shared token bucket for one route and client, when RATE_LIMIT_BACKEND=database."""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)  # "<route>:<ip or user id>"
+    tat = Column(Float, nullable=False)  # epoch seconds at which the bucket is full again
+
+class NotificationChannel(str, enum.Enum):
+    EMAIL = "email"
+    SMS = "sms"
+
+class NotificationStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    notification_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    order_id = Column(UUID(as_uuid=True), ForeignKey('orders.order_id'), nullable=True)
+    channel = Column(SQLAlchemyEnum(NotificationChannel), nullable=False)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=True)
+    body = Column(String, nullable=False)
+    status = Column(SQLAlchemyEnum(NotificationStatus), nullable=False, default=NotificationStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    # The worker polls for due, pending rows
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+class ProcessedStripeEvent(Base):
+    __tablename__ = "processed_stripe_events"
+
+    # Stripe's event ID; the primary key makes a redelivered event a no-op
+    event_id = Column(String, primary_key=True)
+    event_type = Column(String, nullable=False)
+    order_id = Column(UUID(as_uuid=True), nullable=True)
+    payment_status = Column(SQLAlchemyEnum(PaymentStatus), nullable=True)
+    payment_intent_id = Column(String, nullable=True)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)  # NULL until the worker has applied it
+
+    # The worker polls for unprocessed rows in arrival order
+    __table_args__ = (
+        Index("ix_processed_stripe_events_processed_at_received_at", "processed_at", "received_at"),
+    )
@@ -21,9 +21,12 @@ class CouponResponse(BaseModel):
     discount_type: DiscountType
     discount_value: float
     description: Optional[str]
+    valid_from: Optional[datetime] = None
     valid_until: datetime
     min_order_value: float
     max_discount: Optional[float]
+    usage_limit: Optional[int] = None
+    current_usage: Optional[int] = None
     is_active: bool
 
     class Config:
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, UUID4
+from uuid import UUID
 from typing import List, Optional
 from datetime import datetime
 from app.models.models import OrderStatus
@@ -28,7 +29,7 @@ class OrderCreate(BaseModel):
     contact_number: str
     delivery_address: str
     total_amount: float
-    # coupon_code: Optional[str]
+    coupon_code: Optional[str] = None
 
 class PaymentLinkRequest(BaseModel):
     amount: float
@@ -36,6 +37,7 @@ class PaymentLinkRequest(BaseModel):
     order_items: List[OrderItemCreate]
     delivery_address: str
     contact_number: str
+    coupon_code: Optional[str] = None
 
     def to_order_create(self) -> OrderCreate:
         """Convert PaymentLinkRequest to OrderCreate"""
@@ -46,11 +48,13 @@ class PaymentLinkRequest(BaseModel):
             total_amount=self.amount,
             delivery_address=self.delivery_address,
             contact_number=self.contact_number,
+            coupon_code=self.coupon_code,
         )
 
 class OrderResponse(BaseModel):
     order_id: UUID4
     status: OrderStatus
+    payment_status: Optional[PaymentStatus] = None
     total_amount: float
     created_at: datetime
     updated_at: datetime
@@ -62,3 +66,21 @@ class OrderResponse(BaseModel):
 
 class OrderStatusUpdate(BaseModel):
     status: OrderStatus
+
+class OrderSummaryResponse(BaseModel):
+    order_id: UUID4
+    user_id: Optional[UUID]
+    status: OrderStatus
+    payment_status: Optional[PaymentStatus] = None
+    total_amount: float
+    delivery_address: str
+    contact_number: str
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class OrderHistoryPage(BaseModel):
+    items: List[OrderSummaryResponse]
+    next_cursor: Optional[str] = None
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from enum import Enum
+from app.models.models import PaymentStatus
 
 
 class PaymentIntentRequest(BaseModel):
@@ -8,8 +9,3 @@ class PaymentIntentRequest(BaseModel):
 class PaymentMethod(str, Enum):
     CASH = "CASH"
     ONLINE = "ONLINE"
-
-class PaymentStatus(str, Enum):
-    PENDING = "PENDING"
-    COMPLETED = "COMPLETED"
-    FAILED = "FAILED"
\ No newline at end of file
@@ -1,7 +1,9 @@
 from pydantic import BaseModel, validator
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
+from uuid import UUID
 from app.models.models import PizzaSizeEnum, PizzaCategory
+from app.schema.toppings import ToppingResponse
 
 class PizzaBase(BaseModel):
     name: str
@@ -46,5 +48,48 @@ class PizzaResponse(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime]
 
+    class Config:
+        from_attributes = True
+
+class PizzaDetails(BaseModel):
+    pizza_id: UUID
+    name: str
+    description: Optional[str]
+    base_price: float
+    category: PizzaCategory
+    image_url: Optional[str]
+    sizes: List[PizzaSizeResponse]
+
+    class Config:
+        from_attributes = True
+
+class PizzaCreatedDetails(BaseModel):
+    id: UUID
+    name: str
+    description: Optional[str]
+    base_price: float
+    category: str
+    image_path: Optional[str]
+    sizes: List[PizzaSizeResponse]
+
+class PizzaCreatedResponse(BaseModel):
+    message: str
+    data: PizzaCreatedDetails
+
+class PizzaUpdatedResponse(BaseModel):
+    message: str
+    pizza: PizzaDetails
+
+class PizzaMenuResponse(BaseModel):
+    pizza_id: UUID
+    name: str
+    description: Optional[str]
+    base_price: float
+    category: PizzaCategory
+    image_url: Optional[str]
+    image_srcset: Dict[str, str] = {}  # MIME type -> srcset of resized variants
+    sizes: List[PizzaSizeResponse]
+    toppings: List[ToppingResponse]
+
     class Config:
         from_attributes = True
\ No newline at end of file
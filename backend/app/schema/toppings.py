@@ -1,4 +1,5 @@
 from pydantic import BaseModel, UUID4
+from typing import Optional
 
 class ToppingBase(BaseModel):
     name: str
@@ -12,6 +13,7 @@ class ToppingUpdate(ToppingBase):
 
 class ToppingResponse(ToppingBase):
     topping_id: UUID4
+    is_vegetarian: Optional[bool] = None
 
     class Config:
         from_attributes = True
\ No newline at end of file
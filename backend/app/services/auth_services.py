@@ -1,12 +1,11 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import datetime
-from passlib.context import CryptContext
 from app.models.models import User
 from app.schema.user import UserCreate
 from app.core.security import create_refresh_token
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.passwords import pwd_context, PasswordHasher
 
 class AuthService:
     @staticmethod
@@ -18,15 +17,15 @@ class AuthService:
         return pwd_context.verify(plain_password, hashed_password)
 
     @staticmethod
-    def register_user(db: Session, user: UserCreate) -> User:
-        db_user = db.query(User).filter(User.email == user.email).first()
+    async def register_user(db: AsyncSession, user: UserCreate) -> User:
+        db_user = await AuthService.get_user_by_email(db, user.email)
         if db_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email is already registered."
             )
         
-        hashed_password = AuthService.get_password_hash(user.password)
+        hashed_password = await PasswordHasher.hash(user.password)
         refresh_token_data = {"email": user.email, "username": user.username}
         refresh_token = create_refresh_token(refresh_token_data)
         db_user = User(
@@ -40,20 +39,28 @@ class AuthService:
             created_at=datetime.datetime.now(datetime.timezone.utc),  # Updated to use timezone-aware datetime
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
 
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> User:
-        user = db.query(User).filter(User.email == email).first()
-        if not user or not AuthService.verify_password(password, user.hashed_password):
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> User:
+        user = await AuthService.get_user_by_email(db, email)
+        verified, new_hash = (False, None)
+        if user:
+            verified, new_hash = await PasswordHasher.verify(password, user.hashed_password)
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,  # Changed from 400 to 401
                 detail="Incorrect email or password."
             )
+        if new_hash:
+            # Stored hash predates the current BCRYPT_ROUNDS; upgrade it now that we know the password
+            user.hashed_password = new_hash
+            await db.commit()
         return user
     
     @staticmethod
-    def get_user_by_email(db: Session, email: str):
-        return db.query(User).filter(User.email == email).first()
\ No newline at end of file
+    async def get_user_by_email(db: AsyncSession, email: str):
+        result = await db.execute(select(User).filter(User.email == email))
+        return result.scalars().first()
\ No newline at end of file
@@ -0,0 +1,95 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import FrozenSet, Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.models.models import Coupon, CouponUsage, DiscountType
+
+@dataclass(frozen=True)
+class CachedCoupon:
+    """Read-only copy of a coupon row, safe to share between requests."""
+    coupon_id: UUID
+    code: str
+    discount_type: DiscountType
+    discount_value: float
+    valid_from: datetime
+    valid_until: datetime
+    min_order_value: float
+    max_discount: Optional[float]
+    is_active: bool
+    usage_limit: Optional[int]
+    current_usage: int
+
+    @classmethod
+    def from_model(cls, coupon: Coupon) -> "CachedCoupon":
+        return cls(**{f.name: getattr(coupon, f.name) for f in fields(cls)})
+
+class CouponCache:
+    """Coupons by code and redeemed coupon IDs by user, so most validations skip the database.
+
+    Unknown codes are cached too (for COUPON_CACHE_NEGATIVE_TTL_SECONDS), so
+    guessing codes costs one query per code rather than one per attempt.
+    The admin coupon handlers invalidate the code entries. Neither cache is
+    authoritative: usage limits and one-use-per-user are enforced again
+    when the coupon is redeemed, so a stale entry can only delay a
+    rejection, never let an extra redemption through.
+    """
+    _coupons = TTLCache(settings.COUPON_CACHE_SIZE)  # code -> CachedCoupon or None
+    _redeemed = TTLCache(settings.COUPON_CACHE_USERS)  # user_id -> frozenset of coupon_ids
+    _codes = TTLCache(settings.COUPON_CACHE_SIZE)  # coupon_id -> code, to drop entries by ID
+
+    @classmethod
+    async def get_coupon(cls, db: AsyncSession, code: str) -> Optional[CachedCoupon]:
+        coupon = cls._coupons.get(code)
+        if coupon is not MISSING:
+            return coupon
+
+        result = await db.execute(select(Coupon).filter(Coupon.code == code))
+        row = result.scalars().first()
+        if row is None:
+            cls._coupons.put(code, None, settings.COUPON_CACHE_NEGATIVE_TTL_SECONDS)
+            return None
+
+        coupon = CachedCoupon.from_model(row)
+        cls._coupons.put(code, coupon, settings.COUPON_CACHE_TTL_SECONDS)
+        cls._codes.put(coupon.coupon_id, code, settings.COUPON_CACHE_TTL_SECONDS)
+        return coupon
+
+    @classmethod
+    async def get_redeemed(cls, db: AsyncSession, user_id: UUID) -> FrozenSet[UUID]:
+        redeemed = cls._redeemed.get(user_id)
+        if redeemed is not MISSING:
+            return redeemed
+
+        result = await db.execute(select(CouponUsage.coupon_id).filter(CouponUsage.user_id == user_id))
+        redeemed = frozenset(result.scalars().all())
+        cls._redeemed.put(user_id, redeemed, settings.COUPON_CACHE_TTL_SECONDS)
+        return redeemed
+
+    @classmethod
+    def mark_redeemed(cls, user_id: UUID, coupon_id: UUID):
+        """Record a committed redemption, so the user's next attempt is rejected from memory."""
+        redeemed = cls._redeemed.get(user_id)
+        if redeemed is not MISSING:
+            cls._redeemed.put(user_id, redeemed | {coupon_id}, settings.COUPON_CACHE_TTL_SECONDS)
+
+    @classmethod
+    def forget(cls, coupon_id: UUID):
+        """Drop a cached coupon that is known to be stale."""
+        code = cls._codes.get(coupon_id)
+        if code is not MISSING:
+            cls._codes.pop(coupon_id)
+            cls._coupons.pop(code)
+
+    @classmethod
+    def invalidate(cls):
+        cls._coupons.clear()
+        cls._codes.clear()
+
+    @classmethod
+    def clear(cls):
+        cls.invalidate()
+        cls._redeemed.clear()
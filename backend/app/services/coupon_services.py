@@ -1,37 +1,31 @@
 from datetime import datetime
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from typing import Optional
 from app.models.models import Coupon, CouponUsage
 from app.schema.coupon import DiscountType, CouponCreate
+from app.services.coupon_cache import CouponCache, CachedCoupon
 
 class CouponService:
     
     @staticmethod
-    def validate_and_apply_coupon(
-        db: Session,
+    async def validate_and_apply_coupon(
+        db: AsyncSession,
         coupon_code: str,
         user_id: UUID,
         order_amount: float
-    ) -> tuple[Optional[Coupon], Optional[float]]:
-        coupon = db.query(Coupon).filter(
-            Coupon.code == coupon_code,
-            Coupon.is_active == True,
-            Coupon.valid_from <= datetime.utcnow(),
-            Coupon.valid_until >= datetime.utcnow()
-        ).first()
-
-        if not coupon:
+    ) -> tuple[Optional[CachedCoupon], Optional[float]]:
+        # Both lookups are served from CouponCache when warm; redeem_coupon re-checks against the database
+        coupon = await CouponCache.get_coupon(db, coupon_code)
+        now = datetime.utcnow()
+        if not coupon or not coupon.is_active or not (coupon.valid_from <= now <= coupon.valid_until):
             raise HTTPException(status_code=404, detail="Invalid or expired coupon")
 
         # Check if user has already used this coupon
-        usage = db.query(CouponUsage).filter(
-            CouponUsage.coupon_id == coupon.coupon_id,
-            CouponUsage.user_id == user_id
-        ).first()
-        
-        if usage:
+        if coupon.coupon_id in await CouponCache.get_redeemed(db, user_id):
             raise HTTPException(status_code=400, detail="Coupon already used")
 
         # Check usage limit
@@ -56,26 +50,79 @@ class CouponService:
         return coupon, discount
 
     @staticmethod
-    def record_coupon_usage(
-        db: Session,
-        coupon: Coupon,
+    async def redeem_coupon(
+        db: AsyncSession,
+        coupon_id: UUID,
         user_id: UUID,
         order_id: UUID,
         discount_amount: float
-    ):
-        # Create coupon usage record
+    ) -> CouponUsage:
+        """Claim one use of a coupon inside the caller's transaction.
+
+        The usage counter is bumped with a single conditional UPDATE, which
+        only matches a coupon that is active, inside its validity window and
+        under usage_limit at that moment, so a cached validation can never
+        redeem a coupon that has since been disabled, expired or used up.
+        The unique (coupon_id, user_id) constraint stops a user redeeming
+        twice. The caller commits, or rolls back if this raises.
+        """
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(Coupon)
+            .where(
+                Coupon.coupon_id == coupon_id,
+                Coupon.is_active.is_(True),
+                Coupon.valid_from <= now,
+                Coupon.valid_until >= now,
+                or_(Coupon.usage_limit.is_(None), Coupon.current_usage < Coupon.usage_limit)
+            )
+            .values(current_usage=Coupon.current_usage + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            # The cached coupon was behind; reload it on the next validation
+            CouponCache.forget(coupon_id)
+            redeemable = await db.execute(
+                select(Coupon.coupon_id).filter(
+                    Coupon.coupon_id == coupon_id,
+                    Coupon.is_active.is_(True),
+                    Coupon.valid_from <= now,
+                    Coupon.valid_until >= now
+                )
+            )
+            if redeemable.scalar() is None:
+                raise HTTPException(status_code=404, detail="Invalid or expired coupon")
+            raise HTTPException(status_code=400, detail="Coupon usage limit reached")
+
         usage = CouponUsage(
-            coupon_id=coupon.coupon_id,
+            coupon_id=coupon_id,
             user_id=user_id,
             order_id=order_id,
             discount_amount=discount_amount
         )
         db.add(usage)
+        try:
+            await db.flush()
+        except IntegrityError:
+            CouponCache.mark_redeemed(user_id, coupon_id)
+            raise HTTPException(status_code=400, detail="Coupon already used")
+        return usage
 
-        # Update coupon usage count
-        coupon.current_usage += 1
-        
-        db.commit()
+    @staticmethod
+    async def record_coupon_usage(
+        db: AsyncSession,
+        coupon: CachedCoupon,
+        user_id: UUID,
+        order_id: UUID,
+        discount_amount: float
+    ):
+        try:
+            await CouponService.redeem_coupon(db, coupon.coupon_id, user_id, order_id, discount_amount)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        CouponCache.mark_redeemed(user_id, coupon.coupon_id)
 
     # @staticmethod
     # def create_coupon(db: Session, coupon: CouponCreate) -> Coupon:
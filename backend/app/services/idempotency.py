@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+class Checkpoint:
+    """Values a request saved before a step that can fail, such as a payment provider call.
+
+    A retry with the same Idempotency-Key and body gets them back and can
+    resume from there instead of redoing the steps before it. Without a key
+    nothing is kept.
+    """
+
+    def __init__(self, scope: Optional[Hashable]):
+        self.scope = scope
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if self.scope is None:
+            return default
+        values = IdempotencyStore._checkpoints.get(self.scope)
+        return default if values is MISSING else values.get(name, default)
+
+    def put(self, name: str, value: Any):
+        if self.scope is None:
+            return
+        values = IdempotencyStore._checkpoints.get(self.scope)
+        values = {} if values is MISSING else values
+        values[name] = value
+        IdempotencyStore._checkpoints.put(self.scope, values, settings.IDEMPOTENCY_TTL_SECONDS)
+
+class IdempotencyStore:
+    """Replays the first response for a repeated Idempotency-Key.
+
+    Keys are scoped to the caller and endpoint. A completed response is kept
+    for IDEMPOTENCY_TTL_SECONDS; a duplicate that arrives while the first
+    request is still running waits for it and gets the same response, so
+    the work runs once. Failures are not stored, so the client can retry
+    with the same key; steps that completed before the failure can be
+    recorded in a Checkpoint so the retry does not repeat them. The store lives in process memory: with several
+    workers, each worker deduplicates the requests it receives.
+    """
+    _responses = TTLCache(settings.IDEMPOTENCY_CACHE_SIZE)  # scope -> (fingerprint, status, body)
+    _in_flight: Dict[Hashable, Tuple[str, asyncio.Future]] = {}
+    _checkpoints = TTLCache(settings.IDEMPOTENCY_CACHE_SIZE)  # (scope, fingerprint) -> {name: value}
+
+    @staticmethod
+    def fingerprint(payload: Any) -> str:
+        return hashlib.sha256(str(jsonable_encoder(payload)).encode()).hexdigest()
+
+    @classmethod
+    def checkpoint(cls, scope: Hashable, key: Optional[str], payload: Any) -> Checkpoint:
+        """The checkpoint of the request run() executes for the same scope, key and payload."""
+        if not key:
+            return Checkpoint(None)
+        return Checkpoint(((scope, key), cls.fingerprint(payload)))
+
+    @classmethod
+    async def run(
+        cls,
+        scope: Hashable,
+        key: Optional[str],
+        payload: Any,
+        execute: Callable[[], Awaitable[Any]],
+        status_code: int = 200
+    ) -> JSONResponse:
+        if not key:
+            return JSONResponse(jsonable_encoder(await execute()), status_code=status_code)
+        if len(key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+
+        scope = (scope, key)
+        fingerprint = cls.fingerprint(payload)
+
+        stored = cls._responses.get(scope)
+        if stored is not MISSING:
+            return cls._replay(stored, fingerprint)
+
+        in_flight = cls._in_flight.get(scope)
+        if in_flight is not None:
+            return cls._replay((in_flight[0], *await asyncio.shield(in_flight[1])), fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        cls._in_flight[scope] = (fingerprint, future)
+        try:
+            body = jsonable_encoder(await execute())
+        except BaseException as e:
+            # Waiting duplicates fail the same way; nothing is stored so a retry runs again
+            if isinstance(e, HTTPException):
+                future.set_exception(e)
+            else:
+                future.set_exception(HTTPException(
+                    status_code=409,
+                    detail="The original request for this Idempotency-Key did not complete; retry it"
+                ))
+            future.exception()  # mark retrieved when nobody is waiting
+            raise
+        else:
+            future.set_result((status_code, body))
+            cls._responses.put(scope, (fingerprint, status_code, body), settings.IDEMPOTENCY_TTL_SECONDS)
+            cls._checkpoints.pop((scope, fingerprint))
+            return JSONResponse(body, status_code=status_code)
+        finally:
+            cls._in_flight.pop(scope, None)
+
+    @staticmethod
+    def _replay(stored: Tuple[str, int, Any], fingerprint: str) -> JSONResponse:
+        stored_fingerprint, status_code, body = stored
+        if stored_fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request body"
+            )
+        return JSONResponse(body, status_code=status_code, headers={REPLAY_HEADER: "true"})
+
+    @classmethod
+    def clear(cls):
+        cls._responses.clear()
+        cls._in_flight.clear()
+        cls._checkpoints.clear()
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import uuid
+from typing import BinaryIO, Callable, Dict, List, Optional
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import update
+from app.core.config import settings
+from app.models.models import Pizza
+from app.services.menu_cache import MenuCache
+
+IMAGE_DIR = "static/pizza_images"
+CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of the formats we accept, and the extension each is stored under
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+
+_SAVE_OPTIONS: Dict[str, dict] = {
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 55},
+}
+
+def sniff_extension(head: bytes) -> Optional[str]:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+def _store(source: BinaryIO, directory: str, max_bytes: int) -> str:
+    """Copy an upload into directory under its content hash and return the file name."""
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    extension = None
+    size = 0
+    fd, partial_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if extension is None:
+                    extension = sniff_extension(chunk[:16])
+                    if extension is None:
+                        raise HTTPException(status_code=415, detail="Image must be a PNG, JPEG, GIF or WebP file")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Image must be at most {max_bytes // 1024} KB"
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+        if extension is None:
+            raise HTTPException(status_code=400, detail="Image file is empty")
+
+        name = f"{digest.hexdigest()[:32]}.{extension}"
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(partial_path)  # the same image was uploaded before
+        else:
+            os.replace(partial_path, path)
+        return name
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+def build_variants(image_url: str, widths: List[int], formats: List[str]) -> List[dict]:
+    """Write resized copies of an image next to it and describe the ones that exist.
+
+    Widths larger than the original are clamped to it rather than upscaled.
+    A format this Pillow build cannot encode (AVIF needs libavif) is skipped.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        print("Pillow is not installed, skipping responsive image variants")
+        return []
+
+    stem = os.path.splitext(image_url)[0]
+    variants = []
+    unsupported = set()
+    with Image.open(image_url) as original:
+        original.load()
+        image = original.convert("RGBA" if original.mode in ("RGBA", "LA", "P") else "RGB")
+
+    for width in sorted({min(w, image.width) for w in widths}):
+        resized = None
+        for fmt in formats:
+            if fmt in unsupported:
+                continue
+            url = f"{stem}-{width}.{fmt}"
+            if not os.path.exists(url):
+                if resized is None:
+                    height = max(1, round(image.height * width / image.width))
+                    resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                try:
+                    resized.save(f"{url}.part", format=fmt.upper(), **_SAVE_OPTIONS.get(fmt, {}))
+                except (KeyError, OSError, ValueError) as e:
+                    print(f"Cannot encode {fmt} images, skipping: {str(e)}")
+                    unsupported.add(fmt)
+                    if os.path.exists(f"{url}.part"):
+                        os.remove(f"{url}.part")
+                    continue
+                os.replace(f"{url}.part", url)
+            variants.append({"format": fmt, "width": width, "url": url})
+    return variants
+
+class ImageService:
+    @staticmethod
+    async def save_upload(upload: UploadFile, directory: Optional[str] = None) -> str:
+        """Stream an upload to disk under a content-hashed name and return its URL path.
+
+        The copy runs in a worker thread, one chunk at a time, so neither the
+        event loop nor memory is tied up by large files. Identical uploads
+        share one file, and since a name never changes content the file can
+        be cached forever.
+        """
+        directory = directory or IMAGE_DIR
+        await upload.seek(0)
+        name = await asyncio.to_thread(_store, upload.file, directory, settings.IMAGE_MAX_BYTES)
+        return f"{directory}/{name}"
+
+    @staticmethod
+    async def generate_variants(session_factory: Callable, pizza_id: uuid.UUID, image_url: str):
+        """Build a pizza's responsive variants and record them; run after the response is sent."""
+        try:
+            variants = await asyncio.to_thread(
+                build_variants, image_url, settings.IMAGE_VARIANT_WIDTHS, settings.IMAGE_VARIANT_FORMATS
+            )
+        except Exception as e:
+            print(f"Error building variants for {image_url}: {str(e)}")
+            return
+        if not variants:
+            return
+
+        async with session_factory() as db:
+            await db.execute(
+                update(Pizza)
+                .where(Pizza.pizza_id == pizza_id)
+                .values(image_variants=variants)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            await MenuCache.invalidate(db)
@@ -0,0 +1,100 @@
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.models import CacheVersion
+
+MENU_VERSION_KEY = "menu"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+class MenuCache:
+    """Serialized menu responses, rebuilt lazily after every menu write.
+
+    Each worker keeps its own copy. When MENU_CACHE_SHARED_VERSION is on,
+    writers also bump a row in cache_versions and readers compare against it
+    at most once every MENU_CACHE_VERSION_CHECK_SECONDS, so other workers
+    drop their copy without querying the database on every read.
+    """
+    _entries: Dict[str, Tuple[int, bytes, str]] = {}  # key -> (version, body, etag)
+    _version = 0
+    _shared_version: Optional[int] = None
+    _shared_checked_at = 0.0
+
+    @classmethod
+    async def invalidate(cls, db: Optional[AsyncSession] = None):
+        cls._version += 1
+        cls._entries.clear()
+
+        if settings.MENU_CACHE_SHARED_VERSION and db is not None:
+            result = await db.execute(
+                update(CacheVersion)
+                .where(CacheVersion.name == MENU_VERSION_KEY)
+                .values(version=CacheVersion.version + 1)
+            )
+            if result.rowcount == 0:
+                db.add(CacheVersion(name=MENU_VERSION_KEY, version=1))
+            await db.commit()
+
+    @classmethod
+    async def _check_shared_version(cls, db: AsyncSession):
+        now = time.monotonic()
+        if now - cls._shared_checked_at < settings.MENU_CACHE_VERSION_CHECK_SECONDS:
+            return
+        cls._shared_checked_at = now
+
+        result = await db.execute(
+            select(CacheVersion.version).where(CacheVersion.name == MENU_VERSION_KEY)
+        )
+        shared_version = result.scalar() or 0
+        if shared_version != cls._shared_version:
+            cls._shared_version = shared_version
+            cls._version += 1
+            cls._entries.clear()
+
+    @classmethod
+    async def get(
+        cls,
+        key: str,
+        build: Callable[[], Awaitable[bytes]],
+        db: Optional[AsyncSession] = None
+    ) -> Tuple[bytes, str]:
+        if settings.MENU_CACHE_SHARED_VERSION and db is not None:
+            await cls._check_shared_version(db)
+
+        entry = cls._entries.get(key)
+        if entry and entry[0] == cls._version:
+            return entry[1], entry[2]
+
+        # Remember the version we started from; a write that lands while we
+        # build must not be hidden behind a stale entry
+        version = cls._version
+        body = await build()
+        etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        if version == cls._version:
+            cls._entries[key] = (version, body, etag)
+        return body, etag
+
+    @classmethod
+    async def respond(
+        cls,
+        request: Request,
+        key: str,
+        build: Callable[[], Awaitable[bytes]],
+        db: Optional[AsyncSession] = None
+    ) -> Response:
+        body, etag = await cls.get(key, build, db)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -1,23 +1,19 @@
+import asyncio
 import smtplib
+import threading
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-import os
-from dotenv import load_dotenv
 import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from twilio.rest import Client
+from app.core.config import settings
+from app.models.models import NotificationOutbox, NotificationChannel, NotificationStatus
 
-load_dotenv()
 
-SMTP_SERVER = os.getenv('SMTP_SERVER')
-SMTP_PORT = os.getenv('SMTP_PORT')
-SENDER_EMAIL = os.getenv('SENDER_EMAIL')
-SENDER_PASSWORD = os.getenv('SENDER_PASSWORD')
-TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
-TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
-
-
-def send_order_confirmation_email(recipient_email: str, order_id: uuid.UUID):
+def order_confirmation_email(order_id: uuid.UUID):
     subject = "🍕 Order Confirmation from PizzaBliss"
     body = (
         f"Hi there,\n\n"
@@ -29,46 +25,287 @@ def send_order_confirmation_email(recipient_email: str, order_id: uuid.UUID):
         f"Best regards,\n"
         f"The PizzaBliss Team!"
     )
+    return subject, body
+
+ORDER_CONFIRMATION_SMS = "Thank you for your order! Your order has been successfully placed."
+
+def enqueue_order_confirmation(db: AsyncSession, email: str, phone_number: Optional[str], order_id: uuid.UUID):
+    """Add confirmation messages to the outbox; they are sent once the caller commits."""
+    subject, body = order_confirmation_email(order_id)
+    db.add(NotificationOutbox(
+        order_id=order_id,
+        channel=NotificationChannel.EMAIL,
+        recipient=email,
+        subject=subject,
+        body=body
+    ))
+    if phone_number:
+        db.add(NotificationOutbox(
+            order_id=order_id,
+            channel=NotificationChannel.SMS,
+            recipient=phone_number,
+            body=ORDER_CONFIRMATION_SMS
+        ))
+
 
-    msg = MIMEMultipart()
-    msg['From'] = SENDER_EMAIL
-    msg['To'] = recipient_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
+class SmtpEmailSender:
+    """Sends mail over SMTP connections that stay open between messages.
 
-    try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
+    Idle connections are kept on a stack and handed out one per send, so
+    concurrent deliveries each get their own connection and no send pays
+    for connect, STARTTLS and login more than once.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        timeout: float = 30
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._idle: List[smtplib.SMTP] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
             server.starttls()
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.sendmail(SENDER_EMAIL, recipient_email, msg.as_string())
-            print(f"Confirmation email sent to {recipient_email}")
-    except Exception as e:
-        print(f"Failed to send confirmation email to {recipient_email}: {e}")
-
-def send_order_confirmation_sms(to_number: str, message: str):
-    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-    try:
-        message = client.messages.create(
-            body=message,
-            from_=TWILIO_PHONE_NUMBER,
-            to=to_number
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def _acquire(self) -> smtplib.SMTP:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _release(self, server: smtplib.SMTP):
+        with self._lock:
+            self._idle.append(server)
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def send(self, recipient: str, subject: Optional[str], body: str):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = recipient
+        msg['Subject'] = subject or ""
+        msg.attach(MIMEText(body, 'plain'))
+
+        server = self._acquire()
+        try:
+            try:
+                server.sendmail(self.sender, recipient, msg.as_string())
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped an idle connection; close it and reconnect once
+                stale, server = server, None
+                self._discard(stale)
+                server = self._connect()
+                server.sendmail(self.sender, recipient, msg.as_string())
+        except Exception:
+            if server is not None:
+                self._discard(server)
+            raise
+        self._release(server)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server in idle:
+            self._discard(server)
+
+
+class TwilioSmsSender:
+    """Sends SMS through a single, lazily created Twilio client."""
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self._client: Optional[Client] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> Client:
+        with self._lock:
+            if self._client is None:
+                self._client = Client(self.account_sid, self.auth_token)
+            return self._client
+
+    def send(self, to_number: str, body: str):
+        self.client.messages.create(body=body, from_=self.from_number, to=to_number)
+
+    def close(self):
+        pass
+
+
+class NotificationWorker:
+    """Drains the notification outbox in the background.
+
+    Each pass claims a batch of due rows in a short transaction (SKIP LOCKED
+    on Postgres, so several workers can share the table) by pushing their
+    next_attempt_at out by lease_seconds, delivers them with bounded
+    concurrency outside any transaction, then records the outcomes in a
+    second short transaction. Rows whose worker dies mid-batch become due
+    again once the lease runs out. Failed deliveries are retried with
+    exponential backoff until max_attempts is reached.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        email_sender,
+        sms_sender,
+        concurrency: int = 4,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 5.0,
+        poll_seconds: float = 1.0,
+        lease_seconds: float = 300.0
+    ):
+        self.session_factory = session_factory
+        self.senders = {
+            NotificationChannel.EMAIL: lambda n: email_sender.send(n.recipient, n.subject, n.body),
+            NotificationChannel.SMS: lambda n: sms_sender.send(n.recipient, n.body),
+        }
+        self._closables = [email_sender, sms_sender]
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls) -> "NotificationWorker":
+        from app.core.database import AsyncSessionLocal
+        return cls(
+            session_factory=AsyncSessionLocal,
+            email_sender=SmtpEmailSender(
+                settings.SMTP_SERVER,
+                settings.SMTP_PORT,
+                sender=settings.SENDER_EMAIL,
+                username=settings.SENDER_EMAIL,
+                password=settings.SENDER_PASSWORD,
+                use_tls=settings.SMTP_USE_TLS
+            ),
+            sms_sender=TwilioSmsSender(
+                settings.TWILIO_ACCOUNT_SID,
+                settings.TWILIO_AUTH_TOKEN,
+                settings.TWILIO_PHONE_NUMBER
+            ),
+            concurrency=settings.NOTIFICATION_CONCURRENCY,
+            batch_size=settings.NOTIFICATION_BATCH_SIZE,
+            max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
+            retry_base_seconds=settings.NOTIFICATION_RETRY_BASE_SECONDS,
+            poll_seconds=settings.NOTIFICATION_POLL_SECONDS,
+            lease_seconds=settings.NOTIFICATION_LEASE_SECONDS
         )
-        print(f"SMS sent successfully: {message.sid}")
-    except Exception as e:
-        print(f"Failed to send SMS: {e}")
 
-def notify_user(email: str, phone_number: str, order_id: uuid.UUID):
-    email_subject = "🍕 Order Confirmation from PizzaBliss"
-    email_body =( f"Hi there,\n\n"
-        f"Thank you for ordering with PizzaBliss! Your order ID is {order_id}.\n"
-        f"Your order will be ready in approximately 30 minutes.\n\n"
-        f"If you have any questions or need to make changes to your order, feel free to contact us at [Contact Number] "
-        f"or reply to this email.\n\n"
-        f"Thank you for choosing PizzaBliss, where every slice is a delight! 🍕\n\n"
-        f"Best regards,\n"
-        f"The PizzaBliss Team!")
-    
-    send_order_confirmation_email(recipient_email=email, order_id=uuid.uuid4())
-    
-    sms_message = "Thank you for your order! Your order has been successfully placed."
-    send_order_confirmation_sms(to_number=phone_number, message=sms_message)
\ No newline at end of file
+    async def _deliver(self, notification: NotificationOutbox, semaphore: asyncio.Semaphore) -> Optional[Exception]:
+        """Send one notification and return the error it failed with, if any."""
+        async with semaphore:
+            try:
+                await asyncio.to_thread(self.senders[notification.channel], notification)
+            except Exception as e:
+                print(f"Failed to send {notification.channel.value} to {notification.recipient}: {e}")
+                return e
+            return None
+
+    def _record(self, notification: NotificationOutbox, error: Optional[Exception]):
+        notification.attempts += 1
+        if error is None:
+            notification.status = NotificationStatus.SENT
+            notification.sent_at = datetime.utcnow()
+            return
+        notification.last_error = str(error)[:500]
+        if notification.attempts >= self.max_attempts:
+            notification.status = NotificationStatus.FAILED
+        else:
+            delay = self.retry_base_seconds * 2 ** (notification.attempts - 1)
+            notification.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+    async def run_once(self) -> int:
+        """Deliver one batch of due notifications and return how many were attempted."""
+        lease_until = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(NotificationOutbox)
+                .filter(
+                    NotificationOutbox.status == NotificationStatus.PENDING,
+                    NotificationOutbox.next_attempt_at <= datetime.utcnow()
+                )
+                .order_by(NotificationOutbox.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            notifications = result.scalars().all()
+            if not notifications:
+                return 0
+            for notification in notifications:
+                notification.next_attempt_at = lease_until
+            await db.commit()
+
+        # No transaction or connection is held while the messages go out
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors = await asyncio.gather(*(self._deliver(n, semaphore) for n in notifications))
+
+        async with self.session_factory() as db:
+            # A row whose lease ran out may have been claimed again; leave it to that worker
+            result = await db.execute(
+                select(NotificationOutbox)
+                .filter(
+                    NotificationOutbox.notification_id.in_([n.notification_id for n in notifications]),
+                    NotificationOutbox.next_attempt_at == lease_until
+                )
+                .with_for_update()
+            )
+            claimed = {row.notification_id: row for row in result.scalars().all()}
+            for notification, error in zip(notifications, errors):
+                row = claimed.get(notification.notification_id)
+                if row is not None:
+                    self._record(row, error)
+            await db.commit()
+        return len(notifications)
+
+    async def run(self):
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                print(f"Error draining notification outbox: {str(e)}")
+                processed = 0
+            if processed < self.batch_size:
+                await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for sender in self._closables:
+            await asyncio.to_thread(sender.close)
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import OrderStatus
+
+_STATUS_RANK = {status: rank for rank, status in enumerate(OrderStatus)}
+_PENDING_EVENTS = "pending_order_events"  # Session.info key for events waiting on a commit
+
+@dataclass(frozen=True)
+class OrderEvent:
+    order_id: str
+    status: OrderStatus
+    updated_at: datetime
+
+    def to_dict(self) -> dict:
+        return {"order_id": self.order_id, "status": self.status.value, "updated_at": self.updated_at.isoformat()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OrderEvent":
+        return cls(data["order_id"], OrderStatus(data["status"]), datetime.fromisoformat(data["updated_at"]))
+
+class Subscription:
+    """One watcher's queue of events for a single order.
+
+    The queue is bounded: a watcher that cannot keep up loses its oldest
+    events rather than holding memory for them. Statuses only move
+    forward, so the newest event is all a slow client needs.
+    """
+
+    def __init__(self, order_id: str, max_queue: int):
+        self.order_id = order_id
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._loop = asyncio.get_running_loop()
+
+    def _put(self, order_event: OrderEvent):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(order_event)
+
+    def deliver(self, order_event: OrderEvent):
+        """Queue an event for this watcher. Safe to call from any thread or event loop."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(order_event)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._put, order_event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[OrderEvent]:
+        """Wait for the next event; None if timeout passes first."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def updates(self, status: OrderStatus, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[OrderEvent]]:
+        """Yield events that move the order past status until it is delivered.
+
+        Yields None whenever heartbeat seconds pass without one, so the
+        caller can keep the connection alive. Events already covered by the
+        snapshot the watcher started from are skipped.
+        """
+        while status != OrderStatus.DELIVERED:
+            order_event = await self.get(heartbeat)
+            if order_event is None:
+                yield None
+            elif _STATUS_RANK[order_event.status] > _STATUS_RANK[status]:
+                status = order_event.status
+                yield order_event
+
+class InMemoryBackend:
+    """Delivers events to watchers in this process only.
+
+    Events wait in the session until its transaction commits and are
+    dropped on rollback. Enough for a single worker and for tests.
+    """
+
+    async def send(self, db: AsyncSession, events: List[OrderEvent]):
+        db.sync_session.info.setdefault(_PENDING_EVENTS, []).extend(events)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_committed_events(session: Session):
+    for order_event in session.info.pop(_PENDING_EVENTS, ()):
+        OrderEventBus.dispatch(order_event)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_events(session: Session):
+    session.info.pop(_PENDING_EVENTS, None)
+
+class PostgresBackend:
+    """Fans events out to every worker through Postgres LISTEN/NOTIFY.
+
+    Writers call pg_notify inside the transaction that changed the orders,
+    so Postgres sends the notifications on commit and discards them on
+    rollback. Each worker holds one dedicated LISTEN connection and
+    dispatches what arrives to its local watchers, its own events included.
+    Notifications sent while the connection is being re-established are
+    missed; clients pick up the current status when they reconnect.
+    """
+
+    def __init__(self, dsn: str, channel: str = "order_events", reconnect_seconds: float = 1.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_url(cls, url, channel: str) -> "PostgresBackend":
+        # asyncpg takes a plain postgresql:// DSN without the SQLAlchemy driver suffix
+        dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        return cls(dsn, channel)
+
+    async def send(self, db: AsyncSession, events: List[OrderEvent]):
+        # One round trip for the whole batch
+        await db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": self.channel, "payloads": [json.dumps(e.to_dict()) for e in events]}
+        )
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str):
+        try:
+            OrderEventBus.dispatch(OrderEvent.from_dict(json.loads(payload)))
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring malformed order event {payload!r}: {str(e)}")
+
+    async def _listen(self):
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._on_notify)
+                await lost.wait()
+                print("Order event listener lost its connection, reconnecting")
+            except asyncio.CancelledError:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+                raise
+            except Exception as e:
+                print(f"Error listening for order events: {str(e)}")
+            await asyncio.sleep(self.reconnect_seconds)
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+def create_backend():
+    from app.core.database import async_engine
+
+    url = async_engine.url
+    kind = settings.ORDER_EVENTS_BACKEND or ("postgres" if url.get_backend_name() == "postgresql" else "memory")
+    if kind == "postgres":
+        return PostgresBackend.from_url(url, settings.ORDER_EVENTS_CHANNEL)
+    return InMemoryBackend()
+
+class OrderEventBus:
+    """Fan-out of order status changes to live watchers.
+
+    The status engine publishes each transition once, with the transaction
+    that writes it; the backend gets the committed events to every worker
+    and each worker hands them to the WebSocket or SSE connections watching
+    that order, one queue per connection. Watching an order therefore costs
+    no queries after the initial snapshot, however many tabs are open.
+    """
+    _subscribers: Dict[str, Set[Subscription]] = {}
+    _lock = threading.Lock()
+    _backend = None
+
+    @classmethod
+    def backend(cls):
+        if cls._backend is None:
+            cls._backend = create_backend()
+        return cls._backend
+
+    @classmethod
+    def use_backend(cls, backend):
+        cls._backend = backend
+
+    @classmethod
+    async def start(cls):
+        await cls.backend().start()
+
+    @classmethod
+    async def stop(cls):
+        if cls._backend is not None:
+            await cls._backend.stop()
+
+    @classmethod
+    def subscribe(cls, order_id, max_queue: Optional[int] = None) -> Subscription:
+        subscription = Subscription(str(order_id), max_queue or settings.ORDER_EVENTS_QUEUE_SIZE)
+        with cls._lock:
+            cls._subscribers.setdefault(subscription.order_id, set()).add(subscription)
+        return subscription
+
+    @classmethod
+    def unsubscribe(cls, subscription: Subscription):
+        with cls._lock:
+            watchers = cls._subscribers.get(subscription.order_id)
+            if watchers is not None:
+                watchers.discard(subscription)
+                if not watchers:
+                    del cls._subscribers[subscription.order_id]
+
+    @classmethod
+    async def publish(cls, db: AsyncSession, events: List[OrderEvent]):
+        """Send events to every worker once db's transaction commits; call before committing."""
+        if events:
+            await cls.backend().send(db, events)
+
+    @classmethod
+    def dispatch(cls, order_event: OrderEvent) -> int:
+        """Hand an event to this worker's watchers of the order and return how many got it."""
+        with cls._lock:
+            watchers = list(cls._subscribers.get(order_event.order_id, ()))
+        for subscription in watchers:
+            subscription.deliver(order_event)
+        return len(watchers)
+
+    @classmethod
+    def watcher_count(cls, order_id=None) -> int:
+        with cls._lock:
+            if order_id is not None:
+                return len(cls._subscribers.get(str(order_id), ()))
+            return sum(len(watchers) for watchers in cls._subscribers.values())
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._subscribers.clear()
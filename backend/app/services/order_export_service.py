@@ -0,0 +1,109 @@
+import csv
+import datetime
+import io
+import json
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from sqlalchemy import select
+from app.models.models import Order, OrderItem
+
+ORDER_COLUMNS = [
+    "order_id", "user_id", "status", "total_amount",
+    "delivery_address", "contact_number", "created_at", "updated_at",
+]
+ITEM_COLUMNS = ["item_id", "pizza_id", "quantity", "size", "custom_toppings"]
+# Customer-entered text; spreadsheets evaluate cells starting with these as formulas
+CSV_FREE_TEXT_COLUMNS = {"delivery_address", "contact_number"}
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def _value(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if hasattr(value, "value"):  # enums
+        return value.value
+    if isinstance(value, (int, float, str, list)):
+        return value
+    return str(value)
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+class OrderExportService:
+    """Streams orders with their items without materializing ORM objects."""
+
+    @staticmethod
+    async def stream_orders(
+        session_factory: Callable,
+        date_from: Optional[datetime.datetime] = None,
+        date_to: Optional[datetime.datetime] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict]]:
+        """Yield batches of orders, each with its items nested, oldest first."""
+        query = (
+            select(
+                *[getattr(Order, column) for column in ORDER_COLUMNS],
+                *[getattr(OrderItem, column) for column in ITEM_COLUMNS],
+            )
+            .select_from(Order)
+            .outerjoin(OrderItem, OrderItem.order_id == Order.order_id)
+            .order_by(Order.created_at, Order.order_id)
+        )
+        if date_from:
+            query = query.filter(Order.created_at >= date_from)
+        if date_to:
+            query = query.filter(Order.created_at < date_to)
+
+        # The session lives inside the generator because the response body is
+        # produced after the endpoint has returned
+        async with session_factory() as db:
+            result = await db.stream(query.execution_options(stream_results=True))
+            current = None
+            batch = []
+            async for rows in result.partitions(batch_size):
+                for row in rows:
+                    order_id = str(row.order_id)
+                    if current is None or current["order_id"] != order_id:
+                        if current is not None:
+                            batch.append(current)
+                        current = {column: _value(getattr(row, column)) for column in ORDER_COLUMNS}
+                        current["items"] = []
+                    if row.item_id is not None:
+                        current["items"].append({column: _value(getattr(row, column)) for column in ITEM_COLUMNS})
+                if batch:
+                    yield batch
+                    batch = []
+            if current is not None:
+                yield [current]
+
+    @staticmethod
+    async def to_ndjson(orders: AsyncIterator[List[Dict]]) -> AsyncIterator[str]:
+        async for batch in orders:
+            yield "".join(json.dumps(order, separators=(",", ":")) + "\n" for order in batch)
+
+    @staticmethod
+    async def to_csv(orders: AsyncIterator[List[Dict]]) -> AsyncIterator[str]:
+        """One line per order item; orders without items get a single line."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ORDER_COLUMNS + ITEM_COLUMNS)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+        async for batch in orders:
+            for order in batch:
+                order_values = [
+                    _csv_cell(order[column]) if column in CSV_FREE_TEXT_COLUMNS else order[column]
+                    for column in ORDER_COLUMNS
+                ]
+                for item in order["items"] or [dict.fromkeys(ITEM_COLUMNS)]:
+                    item_values = [item[column] for column in ITEM_COLUMNS]
+                    if item_values[-1] is not None:
+                        item_values[-1] = ";".join(str(t) for t in item_values[-1])
+                    writer.writerow(order_values + item_values)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
@@ -1,35 +1,103 @@
 from fastapi import HTTPException
-from typing import List
+from typing import List, Optional, Tuple
+import base64
+import json
 import uuid
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, tuple_, literal
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import User, Order, OrderItem, OrderStatus
 from app.services.order_status_service import OrderStatusService
+from app.services.pricing_service import PricingService
+from app.services.coupon_services import CouponService
+from app.services.coupon_cache import CouponCache
 from app.schema.order import OrderCreate
-from app.services.notification_service import notify_user
-from app.core.database import get_db
+from app.services.notification_service import enqueue_order_confirmation
 import datetime
 
+def encode_cursor(order: Order) -> str:
+    raw = json.dumps([order.created_at.isoformat(), str(order.order_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, uuid.UUID]:
+    try:
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(created_at), uuid.UUID(order_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 class OrderService:
     @staticmethod
-    def get_user_orders(db: Session, user_id: uuid.UUID) -> List[Order]:
-        return db.query(Order).filter(Order.user_id == user_id).all()
+    async def get_user_orders(db: AsyncSession, user_id: uuid.UUID) -> List[Order]:
+        result = await db.execute(select(Order).filter(Order.user_id == user_id))
+        return result.scalars().all()
     
     @staticmethod
-    def get_user_order_by_id(db: Session, user_id: uuid.UUID, order_id: uuid.UUID) -> Order:
-        return db.query(Order).filter(Order.user_id == user_id, Order.order_id == order_id).first()
+    async def get_user_order_by_id(db: AsyncSession, user_id: uuid.UUID, order_id: uuid.UUID) -> Order:
+        result = await db.execute(select(Order).filter(Order.user_id == user_id, Order.order_id == order_id))
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_order_history(
+        db: AsyncSession,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status: Optional[OrderStatus] = None,
+        date_from: Optional[datetime.datetime] = None,
+        date_to: Optional[datetime.datetime] = None,
+        user_id: Optional[uuid.UUID] = None
+    ) -> Tuple[List[Order], Optional[str]]:
+        """Newest-first page of orders, continuing after the order encoded in cursor."""
+        query = select(Order)
+        if status:
+            query = query.filter(Order.status == status)
+        if date_from:
+            query = query.filter(Order.created_at >= date_from)
+        if date_to:
+            query = query.filter(Order.created_at < date_to)
+        if user_id:
+            query = query.filter(Order.user_id == user_id)
+        if cursor:
+            created_at, order_id = decode_cursor(cursor)
+            query = query.filter(
+                tuple_(Order.created_at, Order.order_id)
+                < tuple_(literal(created_at, Order.created_at.type), literal(order_id, Order.order_id.type))
+            )
 
+        query = query.order_by(Order.created_at.desc(), Order.order_id.desc()).limit(limit + 1)
+        result = await db.execute(query)
+        orders = result.scalars().all()
+
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = encode_cursor(orders[-1])
+        return orders, next_cursor
+
+    @staticmethod
+    async def get_order_by_id(db: AsyncSession, order_id: uuid.UUID) -> Order:
+        result = await db.execute(select(Order).filter(Order.order_id == order_id))
+        return result.scalars().first()
 
     @staticmethod
-    def create_order(
-        db: Session,
+    async def create_order(
+        db: AsyncSession,
         order: OrderCreate,
         user_id: uuid.UUID
     ) -> Order:
         try:
+            # Price the order from the menu; the client-supplied total is ignored
+            total_amount, item_rows = await PricingService.price_order_items(db, order.order_items)
+
+            coupon, discount = None, 0.0
+            if order.coupon_code:
+                coupon, discount = await CouponService.validate_and_apply_coupon(
+                    db, order.coupon_code, user_id, total_amount
+                )
+
             # Create main order
             db_order = Order(
                 user_id=user_id,
-                total_amount=order.total_amount,
+                total_amount=round(total_amount - discount, 2),
                 delivery_address=order.delivery_address,
                 contact_number=order.contact_number,
                 status=OrderStatus.RECEIVED,
@@ -37,50 +105,39 @@ class OrderService:
                 updated_at=datetime.datetime.now(datetime.timezone.utc)
             )
             db.add(db_order)
-            db.flush()  # Flush to get the order_id
-
-            # Create order items
-            for item in order.order_items:
-                if item.pizza_id:  # Only create item if pizza_id exists
-                    db_item = OrderItem(
-                        order_id=db_order.order_id,
-                        pizza_id=item.pizza_id,
-                        quantity=item.quantity,
-                        size=item.size,
-                        custom_toppings=[t for t in item.custom_toppings if t is not None]
-                    )
-                    db.add(db_item)
-
-            db.commit()
-            db.refresh(db_order)
-
-            # Notify user if email exists
-            user = db.query(User).filter(User.user_id == user_id).first()
+            await db.flush()  # Flush to get the order_id
+
+            # Create order items with a single bulk insert
+            await db.execute(
+                insert(OrderItem),
+                [dict(row, order_id=db_order.order_id) for row in item_rows]
+            )
+
+            if coupon:
+                await CouponService.redeem_coupon(db, coupon.coupon_id, user_id, db_order.order_id, discount)
+
+            # Notify user if email exists; the outbox worker sends it after commit
+            result = await db.execute(select(User).filter(User.user_id == user_id))
+            user = result.scalars().first()
             if user and user.email:
-                notify_user(email=user.email, phone_number=user.phone_number, order_id=db_order.order_id)
+                enqueue_order_confirmation(db, email=user.email, phone_number=user.phone_number, order_id=db_order.order_id)
 
-            OrderStatusService.start_status_updates(db, db_order.order_id)
+            await db.commit()
+            await db.refresh(db_order)
+            if coupon:
+                CouponCache.mark_redeemed(user_id, coupon.coupon_id)
+
+            OrderStatusService.start_status_updates(db_order.order_id)
 
             return db_order
 
+        except HTTPException:
+            await db.rollback()
+            raise
         except ValueError as ve:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=422, detail="Invalid UUID format")
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             print(f"Error creating order: {str(e)}")  # Log the error
             raise HTTPException(status_code=500, detail=str(e))  
-
-    def handle_successful_payment(payment_intent, db: Session):
-    # Update order status in database
-        db = next(get_db())
-        try:
-            order = db.query(Order).filter(
-                Order.order_id == payment_intent.metadata.get('order_id')
-            ).first()
-            if order:
-                order.payment_status = 'COMPLETED'
-                db.commit()
-        except Exception as e:
-            db.rollback()
-            raise e
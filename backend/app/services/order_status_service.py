@@ -1,13 +1,80 @@
-from threading import Thread
+import asyncio
+import heapq
+import threading
 import time
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from uuid import UUID
-from sqlalchemy import update
-from datetime import datetime
-from typing import Dict
+from sqlalchemy import and_, or_, select, text, update, case
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
 from app.models.models import Order, OrderStatus
+from app.services.order_events import OrderEvent, OrderEventBus
+
+SCHEDULER_LOCK_KEY = 7_461_002_001  # pg advisory lock held by the worker that runs the scheduler
+
+class SchedulerLock:
+    """Session-level Postgres advisory lock marking the one worker that schedules.
+
+    The lock lives on a dedicated connection, so it is released as soon as
+    that worker stops or its connection drops, and another worker takes
+    over on its next tick. Other databases have no other workers to
+    coordinate with, and always hold it.
+    """
+
+    def __init__(self, engine: AsyncEngine, key: int = SCHEDULER_LOCK_KEY):
+        self.engine = engine
+        self.key = key
+        self._connection = None
+
+    @property
+    def shared(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    async def hold(self) -> bool:
+        """Take the lock, or confirm it is still held; False while another worker has it."""
+        if not self.shared:
+            return True
+        try:
+            if self._connection is None:
+                self._connection = await self.engine.connect()
+                result = await self._connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})
+                held = bool(result.scalar())
+            else:
+                await self._connection.execute(text("SELECT 1"))
+                held = True
+            # The lock outlives the transaction; don't sit idle in one
+            await self._connection.commit()
+        except Exception:
+            await self.release()
+            raise
+        if not held:
+            await self.release()
+        return held
+
+    async def release(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            try:
+                await connection.close()
+            except Exception:
+                pass
 
 class OrderStatusService:
+    """Moves orders through the kitchen workflow from a single scheduler.
+
+    Orders waiting for their next transition live in a heap keyed by due time.
+    One asyncio task wakes up every tick, advances every due order with a
+    single UPDATE and re-schedules the ones that are not delivered yet.
+    Transitions are published on the OrderEventBus with the same commit,
+    for live tracking.
+
+    With several workers only the holder of the SchedulerLock advances
+    orders. It reloads in-flight orders from the database every
+    ORDER_STATUS_RESYNC_SECONDS to pick up those placed on other workers,
+    which drop their own schedule. The UPDATE only moves rows still in the
+    status the scheduler expected, and only rows it moved are published.
+    """
     _status_sequence = [
         OrderStatus.RECEIVED,
         OrderStatus.PREPARING,
@@ -15,51 +82,199 @@ class OrderStatusService:
         OrderStatus.READY,
         OrderStatus.DELIVERED
     ]
-    _active_orders: Dict[str, Thread] = {}
+    _next_status = dict(zip(_status_sequence[:-1], _status_sequence[1:]))
+
+    _queue: List[Tuple[float, str]] = []  # heap of (due_at, order_id); entries not matching _active_orders are stale
+    _active_orders: Dict[str, Tuple[OrderStatus, float]] = {}  # order_id -> (current status, due_at)
+    _lock = threading.Lock()
+    _task: Optional[asyncio.Task] = None
+    _scheduler_lock: Optional[SchedulerLock] = None
+
+    @classmethod
+    def start_status_updates(
+        cls,
+        order_id: UUID,
+        status: OrderStatus = OrderStatus.RECEIVED,
+        delay: Optional[float] = None
+    ):
+        """Schedule the next transition of an order, replacing any earlier schedule. Safe to call from any thread."""
+        if status == OrderStatus.DELIVERED:
+            return
+        if delay is None:
+            delay = settings.ORDER_STATUS_INTERVAL_SECONDS
+
+        due_at = time.monotonic() + delay
+        with cls._lock:
+            cls._active_orders[str(order_id)] = (status, due_at)
+            heapq.heappush(cls._queue, (due_at, str(order_id)))
+
+    @classmethod
+    def forget_all(cls):
+        with cls._lock:
+            cls._queue.clear()
+            cls._active_orders.clear()
+
+    @classmethod
+    async def advance_due_orders(cls, db: AsyncSession, now: Optional[float] = None) -> List[Tuple[str, OrderStatus]]:
+        """Advance every order whose transition is due and return the new statuses."""
+        if now is None:
+            now = time.monotonic()
+
+        due: Dict[str, OrderStatus] = {}
+        with cls._lock:
+            while cls._queue and cls._queue[0][0] <= now:
+                due_at, order_id = heapq.heappop(cls._queue)
+                entry = cls._active_orders.get(order_id)
+                if entry is not None and entry[1] == due_at:
+                    due[order_id] = entry[0]
+
+        if not due:
+            return []
+
+        by_status: Dict[OrderStatus, List[UUID]] = {}
+        for order_id, status in due.items():
+            by_status.setdefault(status, []).append(UUID(order_id))
+
+        updated_at = datetime.utcnow()
+        try:
+            # Each row only moves on from the status this schedule expects it in
+            result = await db.execute(
+                update(Order)
+                .where(or_(*[
+                    and_(Order.status == status, Order.order_id.in_(order_ids))
+                    for status, order_ids in by_status.items()
+                ]))
+                .values(
+                    status=case(cls._next_status, value=Order.status, else_=Order.status),
+                    updated_at=updated_at
+                )
+                .execution_options(synchronize_session=False)
+            )
+            moved = set(due)
+            if result.rowcount != len(due):
+                # Some rows were changed elsewhere; find the ones this UPDATE moved
+                result = await db.execute(
+                    select(Order.order_id).filter(
+                        Order.order_id.in_([UUID(order_id) for order_id in due]),
+                        Order.updated_at == updated_at
+                    )
+                )
+                moved = {str(order_id) for order_id in result.scalars().all()}
+            events = [OrderEvent(order_id, cls._next_status[status], updated_at) for order_id, status in due.items() if order_id in moved]
+            await OrderEventBus.publish(db, events)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            # Put the batch back so the next tick retries it
+            with cls._lock:
+                for order_id, status in due.items():
+                    cls._active_orders[order_id] = (status, now)
+                    heapq.heappush(cls._queue, (now, order_id))
+            raise
+
+        transitions = []
+        for order_id, status in due.items():
+            new_status = cls._next_status[status]
+            if order_id in moved:
+                transitions.append((order_id, new_status))
+            if order_id not in moved or new_status == OrderStatus.DELIVERED:
+                # Unmoved rows are rescheduled from their real status on the next resync
+                with cls._lock:
+                    entry = cls._active_orders.get(order_id)
+                    if entry is not None and entry[0] == status:
+                        del cls._active_orders[order_id]
+            else:
+                cls.start_status_updates(UUID(order_id), new_status)
+
+        return transitions
+
+    @classmethod
+    async def resume_in_flight_orders(cls, db: AsyncSession) -> int:
+        """Schedule in-progress orders from their stored status and last update; return how many were scheduled.
+
+        Orders already scheduled from the status they are stored in keep their
+        schedule, so repeated resyncs don't pile stale entries onto the heap.
+        """
+        interval = settings.ORDER_STATUS_INTERVAL_SECONDS
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(Order.order_id, Order.status, Order.updated_at).filter(
+                Order.status.in_(list(cls._next_status))
+            )
+        )
+        rows = result.all()
+        with cls._lock:
+            scheduled = {order_id: entry[0] for order_id, entry in cls._active_orders.items()}
+
+        resumed = 0
+        for order_id, status, updated_at in rows:
+            if scheduled.get(str(order_id)) == status:
+                continue
+            delay = 0.0
+            if updated_at:
+                if updated_at.tzinfo is not None:
+                    updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+                delay = max(0.0, interval - (now - updated_at).total_seconds())
+            cls.start_status_updates(order_id, status, delay)
+            resumed += 1
+
+        return resumed
 
     @classmethod
-    def start_status_updates(cls, db: Session, order_id: UUID):
-        def update_status():
+    async def tick(cls, session_factory, scheduler_lock: SchedulerLock, resync_due: bool) -> Optional[List[Tuple[str, OrderStatus]]]:
+        """One scheduler pass; None when another worker holds the scheduler lock."""
+        if not await scheduler_lock.hold():
+            # The scheduling worker picks these up from the database
+            cls.forget_all()
+            return None
+
+        if resync_due:
+            async with session_factory() as db:
+                await cls.resume_in_flight_orders(db)
+        async with session_factory() as db:
+            return await cls.advance_due_orders(db)
+
+    @classmethod
+    async def run(cls):
+        from app.core.database import AsyncSessionLocal, async_engine
+
+        cls._scheduler_lock = SchedulerLock(async_engine)
+        leading = False
+        last_resync = 0.0
+        while True:
             try:
-                current_status_idx = 0
-                
-                while current_status_idx < len(cls._status_sequence):
-                    from app.core.database import SessionLocal
-                    thread_db = SessionLocal()
-                    
-                    try:
-                        order = thread_db.query(Order).filter(Order.order_id == order_id).first()
-                        if not order:
-                            break
-                        
-                        new_status = cls._status_sequence[current_status_idx]
-                        
-                        # Update the order directly instead of using raw SQL
-                        order.status = new_status
-                        order.updated_at = datetime.utcnow()
-                        thread_db.commit()
-                        
-                        print(f"Updated order {order_id} status to: {new_status}")
-                        
-                        if new_status == OrderStatus.DELIVERED:
-                            break
-                        
-                        current_status_idx += 1
-                        time.sleep(15)
-                        
-                    except Exception as e:
-                        print(f"Error updating status: {str(e)}")
-                        thread_db.rollback()
-                    finally:
-                        thread_db.close()
-                        
+                now = time.monotonic()
+                resync_due = not leading or now - last_resync >= settings.ORDER_STATUS_RESYNC_SECONDS
+                transitions = await cls.tick(AsyncSessionLocal, cls._scheduler_lock, resync_due)
+                if transitions is None:
+                    leading = False
+                else:
+                    if not leading:
+                        print(f"Scheduling status updates for {len(cls._active_orders)} in-flight orders")
+                    leading = True
+                    if resync_due:
+                        last_resync = now
+                    for order_id, status in transitions:
+                        print(f"Updated order {order_id} status to: {status}")
             except Exception as e:
-                print(f"Error in status update thread: {str(e)}")
-            finally:
-                if str(order_id) in cls._active_orders:
-                    del cls._active_orders[str(order_id)]
-        
-        thread = Thread(target=update_status, daemon=True)
-        cls._active_orders[str(order_id)] = thread
-        thread.start()
-        print(f"Started status update thread for order: {order_id}")
\ No newline at end of file
+                leading = False
+                print(f"Error updating status: {str(e)}")
+            await asyncio.sleep(settings.ORDER_STATUS_TICK_SECONDS)
+
+    @classmethod
+    def start(cls):
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls.run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+        if cls._scheduler_lock is not None:
+            await cls._scheduler_lock.release()
+            cls._scheduler_lock = None
@@ -0,0 +1,150 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.models import Order, PaymentStatus, ProcessedStripeEvent
+
+# Checkout Session events that move an order's payment status
+PAYMENT_STATUS_BY_EVENT = {
+    "checkout.session.async_payment_succeeded": PaymentStatus.COMPLETED,
+    "checkout.session.async_payment_failed": PaymentStatus.FAILED,
+    "checkout.session.expired": PaymentStatus.FAILED,
+}
+
+def payment_update(event) -> Tuple[Optional[uuid.UUID], Optional[PaymentStatus], Optional[str]]:
+    """Return (order_id, payment_status, payment_intent_id) for an event, or Nones if it changes nothing."""
+    event_type = event["type"]
+    session = event["data"]["object"]
+    if event_type == "checkout.session.completed":
+        # Delayed methods complete the session before the money arrives; async_payment_succeeded follows
+        status = PaymentStatus.COMPLETED if session.get("payment_status") in ("paid", "no_payment_required") else None
+    else:
+        status = PAYMENT_STATUS_BY_EVENT.get(event_type)
+    if status is None:
+        return None, None, None
+
+    metadata = session.get("metadata") or {}
+    try:
+        order_id = uuid.UUID(str(metadata.get("order_id")))
+    except ValueError:
+        return None, None, None
+    return order_id, status, session.get("payment_intent")
+
+async def record_stripe_event(db: AsyncSession, event) -> bool:
+    """Store a verified event for the worker; False if Stripe already delivered it."""
+    order_id, status, payment_intent_id = payment_update(event)
+    db.add(ProcessedStripeEvent(
+        event_id=event["id"],
+        event_type=event["type"],
+        order_id=order_id,
+        payment_status=status,
+        payment_intent_id=payment_intent_id,
+        # Events that change nothing are done as soon as they are recorded
+        processed_at=None if status else datetime.utcnow()
+    ))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    return True
+
+
+class PaymentEventWorker:
+    """Applies recorded Stripe events to orders in the background.
+
+    Each pass locks a batch of unprocessed events (SKIP LOCKED on Postgres,
+    so several workers can share the table), keeps the latest event per
+    order and writes every order's payment status in one executemany
+    UPDATE. A completed payment is final: a late expired or failed event
+    for the same order does not overwrite it.
+    """
+
+    def __init__(self, session_factory: Callable, batch_size: int = 500, poll_seconds: float = 0.5):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls) -> "PaymentEventWorker":
+        from app.core.database import AsyncSessionLocal
+        return cls(
+            session_factory=AsyncSessionLocal,
+            batch_size=settings.PAYMENT_EVENT_BATCH_SIZE,
+            poll_seconds=settings.PAYMENT_EVENT_POLL_SECONDS
+        )
+
+    async def run_once(self) -> int:
+        """Apply one batch of recorded events and return how many were processed."""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(ProcessedStripeEvent)
+                .filter(ProcessedStripeEvent.processed_at.is_(None))
+                .order_by(ProcessedStripeEvent.received_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+            if not events:
+                return 0
+
+            latest: Dict[uuid.UUID, ProcessedStripeEvent] = {}
+            for event in events:
+                previous = latest.get(event.order_id)
+                if previous is None or previous.payment_status != PaymentStatus.COMPLETED:
+                    latest[event.order_id] = event
+
+            orders = Order.__table__
+            await db.execute(
+                update(orders)
+                .where(
+                    orders.c.order_id == bindparam("b_order_id"),
+                    # != alone would skip rows written before payment_status had a default
+                    or_(orders.c.payment_status.is_(None), orders.c.payment_status != PaymentStatus.COMPLETED)
+                )
+                .values(payment_status=bindparam("b_status"), payment_intent_id=bindparam("b_payment_intent_id")),
+                [
+                    {
+                        "b_order_id": order_id,
+                        "b_status": event.payment_status,
+                        "b_payment_intent_id": event.payment_intent_id,
+                    }
+                    for order_id, event in latest.items()
+                ]
+            )
+            await db.execute(
+                update(ProcessedStripeEvent)
+                .where(ProcessedStripeEvent.event_id.in_([event.event_id for event in events]))
+                .values(processed_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            return len(events)
+
+    async def run(self):
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                print(f"Error applying payment events: {str(e)}")
+                processed = 0
+            if processed < self.batch_size:
+                await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
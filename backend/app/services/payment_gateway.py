@@ -0,0 +1,155 @@
+import itertools
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import httpx
+from app.core.config import settings
+
+@dataclass(frozen=True)
+class CheckoutSession:
+    session_id: str
+    url: str
+
+class PaymentGatewayError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+class PaymentGateway(ABC):
+    """Creates a hosted checkout page for an order in a single call."""
+
+    @abstractmethod
+    async def create_checkout_session(
+        self,
+        order_id: str,
+        amount: int,  # in the currency's minor unit
+        currency: str,
+        description: str,
+        success_url: str,
+        cancel_url: str
+    ) -> CheckoutSession:
+        ...
+
+    async def close(self):
+        pass
+
+class StripeGateway(PaymentGateway):
+    """Stripe Checkout over a pooled, keep-alive HTTP client.
+
+    The price is sent inline as price_data, so no Product or Price objects
+    are created and checkout costs one round-trip. The order ID doubles as
+    Stripe's Idempotency-Key, so a retried request cannot open a second
+    session for the same order.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.stripe.com",
+        timeout: float = 10,
+        max_connections: int = 20,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        self.client = client or httpx.AsyncClient(
+            base_url=base_url,
+            auth=(api_key, ""),
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5)),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def create_checkout_session(
+        self,
+        order_id: str,
+        amount: int,
+        currency: str,
+        description: str,
+        success_url: str,
+        cancel_url: str
+    ) -> CheckoutSession:
+        form = {
+            "mode": "payment",
+            "success_url": success_url,
+            "cancel_url": cancel_url,
+            "client_reference_id": order_id,
+            "payment_method_types[0]": "card",
+            "line_items[0][quantity]": "1",
+            "line_items[0][price_data][currency]": currency,
+            "line_items[0][price_data][unit_amount]": str(amount),
+            "line_items[0][price_data][product_data][name]": description,
+            "metadata[order_id]": order_id,
+        }
+        try:
+            response = await self.client.post(
+                "/v1/checkout/sessions",
+                data=form,
+                headers={"Idempotency-Key": f"checkout-{order_id}"}
+            )
+        except httpx.HTTPError as e:
+            raise PaymentGatewayError(f"Payment provider unreachable: {e}")
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code >= 400:
+            error = body.get("error", {}) if isinstance(body, dict) else {}
+            raise PaymentGatewayError(
+                error.get("message") or "Payment provider rejected the request",
+                status_code=response.status_code
+            )
+        return CheckoutSession(session_id=body["id"], url=body["url"])
+
+    async def close(self):
+        await self.client.aclose()
+
+class FakeGateway(PaymentGateway):
+    """In-memory gateway for tests and local development; no network calls."""
+
+    def __init__(self, base_url: str = "https://checkout.test"):
+        self.base_url = base_url
+        self.sessions: List[Dict] = []
+        self._ids = itertools.count(1)
+
+    async def create_checkout_session(
+        self,
+        order_id: str,
+        amount: int,
+        currency: str,
+        description: str,
+        success_url: str,
+        cancel_url: str
+    ) -> CheckoutSession:
+        session_id = f"cs_test_{next(self._ids)}"
+        self.sessions.append({
+            "session_id": session_id,
+            "order_id": order_id,
+            "amount": amount,
+            "currency": currency,
+            "description": description,
+            "success_url": success_url,
+            "cancel_url": cancel_url,
+        })
+        return CheckoutSession(session_id=session_id, url=f"{self.base_url}/{session_id}")
+
+_gateway: Optional[PaymentGateway] = None
+
+def get_payment_gateway() -> PaymentGateway:
+    global _gateway
+    if _gateway is None:
+        if settings.PAYMENT_GATEWAY == "fake":
+            _gateway = FakeGateway()
+        else:
+            _gateway = StripeGateway(
+                settings.STRIPE_SECRET_KEY,
+                base_url=settings.STRIPE_API_BASE,
+                timeout=settings.STRIPE_TIMEOUT_SECONDS,
+                max_connections=settings.STRIPE_MAX_CONNECTIONS
+            )
+    return _gateway
+
+async def close_payment_gateway():
+    global _gateway
+    if _gateway is not None:
+        await _gateway.close()
+        _gateway = None
@@ -1,7 +1,10 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.models.models import Pizza, PizzaSize, PizzaSizeEnum
 from app.schema.pizza import PizzaUpdate
+from app.services.menu_cache import MenuCache
 from typing import List
 import uuid
 import json
@@ -11,11 +14,30 @@ import os
 
 class PizzaService:
     @staticmethod
-    def get_pizzas(db: Session) -> List[Pizza]:
-        return db.query(Pizza).all()
+    async def get_pizzas(db: AsyncSession) -> List[Pizza]:
+        # Sizes and toppings are fetched with one IN query each, so the menu
+        # costs three statements no matter how many pizzas it has
+        result = await db.execute(
+            select(Pizza)
+            .options(selectinload(Pizza.sizes), selectinload(Pizza.toppings))
+            .order_by(Pizza.name)
+        )
+        return result.scalars().all()
 
     @staticmethod
-    def create_pizza(name: str, description: str, base_price: float, category: str, sizes: str, image: str, db: Session):
+    async def get_pizza(db: AsyncSession, pizza_id: uuid.UUID) -> Pizza:
+        result = await db.execute(
+            select(Pizza)
+            .options(selectinload(Pizza.sizes), selectinload(Pizza.toppings))
+            .filter(Pizza.pizza_id == pizza_id)
+        )
+        pizza = result.scalars().first()
+        if not pizza:
+            raise HTTPException(status_code=404, detail="Pizza not found")
+        return pizza
+
+    @staticmethod
+    async def create_pizza(name: str, description: str, base_price: float, category: str, sizes: str, image: str, db: AsyncSession):
     # Parse sizes
         try:
             sizes_data = json.loads(sizes)
@@ -47,30 +69,27 @@ class PizzaService:
 
         # Add to database
         db.add(db_pizza)
-        db.commit()
-        db.refresh(db_pizza)
+        await db.commit()
+        await MenuCache.invalidate(db)
 
-        return db_pizza
+        return await PizzaService.get_pizza(db, db_pizza.pizza_id)
     
     @staticmethod
-    def update_pizza(db: Session, pizza_id: uuid.UUID, pizza_update: PizzaUpdate) -> Pizza:
-        pizza = db.query(Pizza).filter(Pizza.pizza_id == pizza_id).first()
-        if not pizza:
-            raise HTTPException(status_code=404, detail="Pizza not found")
+    async def update_pizza(db: AsyncSession, pizza_id: uuid.UUID, pizza_update: PizzaUpdate) -> Pizza:
+        pizza = await PizzaService.get_pizza(db, pizza_id)
         
         pizza.name = pizza_update.name
         pizza.description = pizza_update.description
         pizza.base_price = pizza_update.base_price
         
-        db.commit()
-        db.refresh(pizza)
+        await db.commit()
+        await MenuCache.invalidate(db)
         return pizza
     
     @staticmethod
-    def delete_pizza(db: Session, pizza_id: uuid.UUID) -> None:
-        pizza = db.query(Pizza).filter(Pizza.pizza_id == pizza_id).first()
-        if not pizza:
-            raise HTTPException(status_code=404, detail="Pizza not found")
+    async def delete_pizza(db: AsyncSession, pizza_id: uuid.UUID) -> None:
+        pizza = await PizzaService.get_pizza(db, pizza_id)
         
-        db.delete(pizza)
-        db.commit()
\ No newline at end of file
+        await db.delete(pizza)
+        await db.commit()
+        await MenuCache.invalidate(db)
\ No newline at end of file
@@ -0,0 +1,99 @@
+from fastapi import HTTPException
+from typing import Dict, List, Optional, Tuple
+import uuid
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import PizzaSize, PizzaSizeEnum, Topping
+from app.schema.order import OrderItemCreate
+
+def parse_size(size: str) -> PizzaSizeEnum:
+    # The storefront sends enum names ("LARGE"), the API documents values ("large")
+    try:
+        return PizzaSizeEnum[size.upper()]
+    except KeyError:
+        raise HTTPException(status_code=422, detail=f"Unknown pizza size: {size}")
+
+def parse_uuid(value: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+def topping_key(reference: str) -> str:
+    topping_id = parse_uuid(reference)
+    return str(topping_id) if topping_id else reference
+
+class PricingService:
+    @staticmethod
+    async def price_order_items(
+        db: AsyncSession,
+        items: List[OrderItemCreate]
+    ) -> Tuple[float, List[dict]]:
+        """Price every line from the menu with one size lookup and one topping lookup.
+
+        Returns the order total and one row per line, ready for a bulk insert
+        into order_items.
+        """
+        lines = []
+        for item in items:
+            if not item.pizza_id:  # Only price items that reference a pizza
+                continue
+            pizza_id = parse_uuid(item.pizza_id)
+            if pizza_id is None:
+                raise HTTPException(status_code=422, detail="Invalid UUID format")
+            if item.quantity < 1:
+                raise HTTPException(status_code=422, detail="Quantity must be at least 1")
+            toppings = [t for t in item.custom_toppings if t is not None]
+            lines.append((pizza_id, parse_size(item.size), item.quantity, toppings))
+
+        if not lines:
+            raise HTTPException(status_code=422, detail="Order has no items")
+
+        pizza_ids = {pizza_id for pizza_id, _, _, _ in lines}
+        result = await db.execute(
+            select(PizzaSize.pizza_id, PizzaSize.size, PizzaSize.price)
+            .filter(PizzaSize.pizza_id.in_(pizza_ids))
+        )
+        size_prices: Dict[Tuple[uuid.UUID, PizzaSizeEnum], float] = {
+            (pizza_id, size): price for pizza_id, size, price in result.all()
+        }
+
+        # Toppings arrive by name from the storefront, by ID from other clients
+        references = {t for _, _, _, toppings in lines for t in toppings}
+        toppings_by_ref: Dict[str, Tuple[str, float]] = {}
+        if references:
+            topping_ids = {parse_uuid(ref) for ref in references} - {None}
+            criteria = [Topping.name.in_(references)]
+            if topping_ids:
+                criteria.append(Topping.topping_id.in_(topping_ids))
+            result = await db.execute(
+                select(Topping.topping_id, Topping.name, Topping.price).filter(or_(*criteria))
+            )
+            for topping_id, name, price in result.all():
+                toppings_by_ref[name] = (name, price)
+                toppings_by_ref[str(topping_id)] = (name, price)
+
+        total = 0.0
+        rows = []
+        for pizza_id, size, quantity, toppings in lines:
+            size_price = size_prices.get((pizza_id, size))
+            if size_price is None:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Pizza {pizza_id} is not available in size {size.value}"
+                )
+            unknown = [t for t in toppings if topping_key(t) not in toppings_by_ref]
+            if unknown:
+                raise HTTPException(status_code=422, detail=f"Unknown toppings: {', '.join(unknown)}")
+
+            resolved = [toppings_by_ref[topping_key(t)] for t in toppings]
+            unit_price = size_price + sum(price for _, price in resolved)
+            total += unit_price * quantity
+            rows.append({
+                "pizza_id": pizza_id,
+                "size": size,
+                "quantity": quantity,
+                "custom_toppings": [name for name, _ in resolved],
+            })
+
+        return round(total, 2), rows
@@ -1,40 +1,53 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 from app.models.models import Topping
 from app.schema.toppings import ToppingCreate, ToppingUpdate
+from app.services.menu_cache import MenuCache
 import uuid
 
 class ToppingService:
     @staticmethod
-    def get_toppings(db: Session) -> List[Topping]:
-        return db.query(Topping).all()
+    async def get_toppings(db: AsyncSession) -> List[Topping]:
+        result = await db.execute(select(Topping))
+        return result.scalars().all()
 
     @staticmethod
-    def create_topping(db: Session, topping: ToppingCreate) -> Topping:
+    async def create_topping(db: AsyncSession, topping: ToppingCreate) -> Topping:
         db_topping = Topping(**topping.dict())
         db.add(db_topping)
-        db.commit()
-        db.refresh(db_topping)
+        await db.commit()
+        await db.refresh(db_topping)
+        await MenuCache.invalidate(db)
         return db_topping
     
     @staticmethod
-    def update_topping(db: Session, topping_id: uuid.UUID, topping: ToppingUpdate) -> Topping:
-        db_topping = db.query(Topping).filter(Topping.topping_id == topping_id).first()
+    async def update_topping(db: AsyncSession, topping_id: uuid.UUID, topping: ToppingUpdate) -> Topping:
+        result = await db.execute(select(Topping).filter(Topping.topping_id == topping_id))
+        db_topping = result.scalars().first()
         if not db_topping:
             raise HTTPException(status_code=404, detail="Topping not found")
         
         db_topping.name = topping.name
         db_topping.price = topping.price
-        db.commit()
-        db.refresh(db_topping)
+        await db.commit()
+        await db.refresh(db_topping)
+        await MenuCache.invalidate(db)
         return db_topping
     
     @staticmethod
-    def delete_topping(db: Session, topping_id: uuid.UUID) -> None:
-        db_topping = db.query(Topping).filter(Topping.topping_id == topping_id).first()
+    async def delete_topping(db: AsyncSession, topping_id: uuid.UUID) -> None:
+        result = await db.execute(
+            select(Topping)
+            .options(selectinload(Topping.pizzas))
+            .filter(Topping.topping_id == topping_id)
+        )
+        db_topping = result.scalars().first()
         if not db_topping:
             raise HTTPException(status_code=404, detail="Topping not found")
         
-        db.delete(db_topping)
-        db.commit()
\ No newline at end of file
+        await db.delete(db_topping)
+        await db.commit()
+        await MenuCache.invalidate(db)
\ No newline at end of file
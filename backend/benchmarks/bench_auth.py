@@ -0,0 +1,44 @@
+"""Per-request JWT auth cost: double decode vs. CurrentUser with the token cache.
+
+Run from the backend directory with the usual environment (.env or exported
+variables):
+
+    python benchmarks/bench_auth.py [iterations]
+"""
+import os
+import sys
+import timeit
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from app.core import security
+from app.core.config import settings
+from app.core.security import create_access_token, decode_token
+
+def double_decode(token: str):
+    # What every protected handler used to do: JWTBearer.verify_jwt, then jwt.decode again
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    assert payload["expires"]
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    return uuid.UUID(payload["sub"]), payload.get("role")
+
+def uncached_decode(token: str):
+    security.token_cache.clear()
+    return decode_token(token)
+
+def main(iterations: int = 20000):
+    token = create_access_token({"sub": str(uuid.uuid4()), "role": "admin"})
+    decode_token(token)  # warm the cache
+
+    for name, fn in (
+        ("double jwt.decode (before)", double_decode),
+        ("decode_token, cache miss", uncached_decode),
+        ("decode_token, cache hit", decode_token),
+    ):
+        seconds = min(timeit.repeat(lambda: fn(token), number=iterations, repeat=3))
+        print(f"{name:<30} {seconds / iterations * 1e6:8.2f} us/request")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,96 @@
+"""Login throughput with bcrypt in the threadpool vs. the dedicated process pool.
+
+Fires concurrent logins at the auth router while timing a trivial endpoint,
+so the numbers show both logins/s and how much a login storm slows
+everything else down. Uses the database from DATABASE_URL and registers a
+throwaway user there. Run from the backend directory with the usual
+environment (.env or exported variables):
+
+    python benchmarks/bench_login.py [logins] [concurrency]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from app.apis import auth
+from app.core.config import settings
+from app.core.database import Base, async_engine
+from app.core.passwords import PasswordHasher
+
+_suffix = uuid.uuid4().hex[:8]
+USER = {
+    "email": f"bench-{_suffix}@example.com",
+    "username": f"bench-{_suffix}",
+    "password": "BenchPassword123!",
+    "phone_number": "+1234567890",
+    "address": "1 Bench St",
+    "role": "user",
+}
+
+def create_app():
+    app = FastAPI()
+    app.include_router(auth.router)
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    return app
+
+async def run(app, logins: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        credentials = {"email": USER["email"], "password": USER["password"]}
+
+        async def login():
+            async with semaphore:
+                response = await client.post("/login", json=credentials)
+                assert response.status_code == 200, response.text
+
+        ping_latencies = []
+        storm = asyncio.gather(*(login() for _ in range(logins)))
+
+        async def probe():
+            while not storm.done():
+                start = time.perf_counter()
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        start = time.perf_counter()
+        await asyncio.gather(storm, probe())
+        elapsed = time.perf_counter() - start
+
+    return logins / elapsed, statistics.median(ping_latencies), max(ping_latencies)
+
+async def main(logins: int, concurrency: int):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    app = create_app()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/register", json=USER)
+        assert response.status_code == 201, response.text
+
+    print(f"bcrypt rounds={settings.BCRYPT_ROUNDS}, {logins} logins, concurrency {concurrency}, {os.cpu_count()} CPUs")
+    for label, workers in (("threadpool", 0), ("process pool", os.cpu_count() or 1)):
+        settings.PASSWORD_HASH_WORKERS = workers
+        PasswordHasher.shutdown()
+        rate, ping_p50, ping_max = await run(app, logins, concurrency)
+        print(f"{label:<14} {rate:8.1f} logins/s   /ping p50 {ping_p50 * 1000:7.1f} ms   max {ping_max * 1000:7.1f} ms")
+    PasswordHasher.shutdown()
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    asyncio.run(main(logins, concurrency))
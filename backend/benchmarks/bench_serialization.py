@@ -0,0 +1,112 @@
+"""JSON encode time for menu and order list responses, and their compressed sizes.
+
+Builds ORM objects in memory (no database needed), validates them into
+the response model and times three ways of turning that into a body:
+
+    json      dump to Python + json.dumps, FastAPI's JSONResponse path
+              before it serialized response models straight to bytes
+    orjson    dump to Python + orjson.dumps, a custom orjson response class
+    model     TypeAdapter dump_json, what FastAPI now does for an endpoint
+              with a response model (and what MenuCache stores)
+
+then prints the body size raw, gzipped and brotli-compressed at the levels
+CompressionMiddleware uses. Run from the backend directory:
+
+    python benchmarks/bench_serialization.py [repeat]
+"""
+import datetime
+import json
+import os
+import sys
+import time
+import uuid
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from app.core.compression import compress
+from app.core.config import settings
+from app.models.models import Order, OrderStatus, PaymentStatus, Pizza, PizzaCategory, PizzaSize, PizzaSizeEnum, Topping
+from app.schema.order import OrderSummaryResponse
+from app.schema.pizza import PizzaMenuResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def make_menu(count: int) -> List[Pizza]:
+    toppings = [Topping(topping_id=uuid.uuid4(), name=f"Topping {i}", price=20 + i, is_vegetarian=i % 2 == 0) for i in range(8)]
+    return [
+        Pizza(
+            pizza_id=uuid.uuid4(),
+            name=f"Pizza {i}",
+            description="San Marzano tomato, fior di latte, basil and a drizzle of olive oil",
+            base_price=199 + i,
+            category=list(PizzaCategory)[i % len(PizzaCategory)],
+            image_url=f"static/pizza_images/{uuid.uuid4().hex}.png",
+            sizes=[PizzaSize(size=size, price=199 + 100 * n) for n, size in enumerate(PizzaSizeEnum)],
+            toppings=toppings[: i % len(toppings)],
+        )
+        for i in range(count)
+    ]
+
+def make_orders(count: int) -> List[Order]:
+    now = datetime.datetime(2024, 1, 1, 12, 0)
+    return [
+        Order(
+            order_id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            status=list(OrderStatus)[i % len(OrderStatus)],
+            payment_status=PaymentStatus.COMPLETED,
+            total_amount=299.5 + i,
+            delivery_address=f"{i} Margherita Street, Naples",
+            contact_number="+1234567890",
+            created_at=now - datetime.timedelta(minutes=i),
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def report(label: str, objects, adapter: TypeAdapter, repeat: int):
+    def validated():
+        return adapter.validate_python(objects, from_attributes=True)
+
+    encoders = {
+        "json": lambda: json.dumps(adapter.dump_python(validated(), mode="json")).encode(),
+        "model": lambda: adapter.dump_json(validated()),
+    }
+    if orjson is not None:
+        encoders["orjson"] = lambda: orjson.dumps(adapter.dump_python(validated(), mode="json"))
+
+    timings = "  ".join(f"{name} {best_of(repeat, fn) * 1000:8.2f} ms" for name, fn in encoders.items())
+    body = encoders["model"]()
+    sizes = f"raw {len(body) / 1024:7.1f} KB  gzip {len(compress(body, 'gzip', settings.COMPRESSION_GZIP_LEVEL)) / 1024:6.1f} KB"
+    if brotli is not None:
+        sizes += f"  br {len(compress(body, 'br', brotli_quality=settings.COMPRESSION_BROTLI_QUALITY)) / 1024:6.1f} KB"
+    print(f"{label:<12} {timings}   {sizes}")
+
+def main(repeat: int):
+    menu_adapter = TypeAdapter(List[PizzaMenuResponse])
+    order_adapter = TypeAdapter(List[OrderSummaryResponse])
+    for count in (10, 100, 500):
+        report(f"menu {count}", make_menu(count), menu_adapter, repeat)
+    for count in (50, 200, 1000):
+        report(f"orders {count}", make_orders(count), order_adapter, repeat)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
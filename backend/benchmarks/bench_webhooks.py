@@ -0,0 +1,120 @@
+"""Sustained Stripe webhook throughput, including redeliveries.
+
+Signs checkout.session.completed payloads with STRIPE_WEBHOOK_SECRET,
+fires them at the webhook endpoint with a share of them sent twice (as
+Stripe does when an acknowledgement is lost), then lets the
+PaymentEventWorker drain what was recorded. Prints events/s for
+acknowledging and for applying. Uses the database from DATABASE_URL and
+inserts throwaway orders there. Run from the backend directory with the
+usual environment (.env or exported variables):
+
+    python benchmarks/bench_webhooks.py [events] [concurrency] [replay_ratio]
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import func, insert, select
+from app.apis import payment
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, Base, async_engine
+from app.models.models import Order, PaymentStatus
+from app.services.payment_events import PaymentEventWorker
+
+def signed(event):
+    payload = json.dumps(event)
+    timestamp = int(time.time())
+    signature = hmac.new(
+        settings.STRIPE_WEBHOOK_SECRET.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return payload, {"Content-Type": "application/json", "Stripe-Signature": f"t={timestamp},v1={signature}"}
+
+def completed_event(order_id):
+    return {
+        "id": f"evt_{uuid.uuid4().hex}",
+        "object": "event",
+        "type": "checkout.session.completed",
+        "data": {"object": {
+            "object": "checkout.session",
+            "payment_status": "paid",
+            "payment_intent": f"pi_{uuid.uuid4().hex[:24]}",
+            "metadata": {"order_id": str(order_id)},
+        }},
+    }
+
+async def create_orders(count: int):
+    order_ids = [uuid.uuid4() for _ in range(count)]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Order), [
+            {
+                "order_id": order_id,
+                "total_amount": 299.5,
+                "delivery_address": "1 Bench St",
+                "contact_number": "+1234567890",
+            }
+            for order_id in order_ids
+        ])
+        await db.commit()
+    return order_ids
+
+async def main(events: int, concurrency: int, replay_ratio: float):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    order_ids = await create_orders(events)
+
+    deliveries = [signed(completed_event(order_id)) for order_id in order_ids]
+    deliveries += random.sample(deliveries, int(events * replay_ratio))
+    random.shuffle(deliveries)
+
+    app = FastAPI()
+    app.include_router(payment.router)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def deliver(payload, headers):
+            async with semaphore:
+                response = await client.post("/webhook", content=payload, headers=headers)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(deliver(payload, headers) for payload, headers in deliveries))
+        ack_elapsed = time.perf_counter() - start
+
+    worker = PaymentEventWorker(AsyncSessionLocal, batch_size=settings.PAYMENT_EVENT_BATCH_SIZE)
+    applied = 0
+    start = time.perf_counter()
+    while True:
+        processed = await worker.run_once()
+        if not processed:
+            break
+        applied += processed
+    apply_elapsed = time.perf_counter() - start
+
+    async with AsyncSessionLocal() as db:
+        completed = (await db.execute(
+            select(func.count()).select_from(Order)
+            .filter(Order.order_id.in_(order_ids), Order.payment_status == PaymentStatus.COMPLETED)
+        )).scalar_one()
+
+    print(f"{events} events + {len(deliveries) - events} redeliveries, concurrency {concurrency}")
+    print(f"acknowledged {len(deliveries) / ack_elapsed:8.1f} deliveries/s")
+    print(f"applied      {applied / apply_elapsed:8.1f} events/s   (batch size {worker.batch_size}, {applied} applied)")
+    assert applied == events and completed == events, (applied, completed)
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    replay_ratio = float(sys.argv[3]) if len(sys.argv) > 3 else 0.25
+    asyncio.run(main(events, concurrency, replay_ratio))
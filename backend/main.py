@@ -1,10 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from app.core.database import engine, Base
-from app.apis import auth, pizza, orders, coupon, toppings, payment
+from app.core.config import settings
+from app.core.static_files import CachedStaticFiles
+from app.core.compression import CompressionMiddleware
+from app.core.request_metrics import MetricsMiddleware
+from app.core.sql_trace import SqlTraceMiddleware
+from app.apis import auth, pizza, orders, coupon, toppings, payment, admin, metrics
+from app.services.order_status_service import OrderStatusService
+from app.services.notification_service import NotificationWorker
+from app.core.passwords import PasswordHasher
+from app.services.payment_gateway import close_payment_gateway
+from app.services.payment_events import PaymentEventWorker
+from app.services.order_events import OrderEventBus
 
-app = FastAPI(title="Pizza Ordering System")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Status changes reach live watchers on every worker
+    await OrderEventBus.start()
+    # One scheduler drives the status of every in-flight order
+    OrderStatusService.start()
+    notification_worker = NotificationWorker.from_settings()
+    notification_worker.start()
+    payment_event_worker = PaymentEventWorker.from_settings()
+    payment_event_worker.start()
+    yield
+    await payment_event_worker.stop()
+    await notification_worker.stop()
+    await OrderStatusService.stop()
+    await OrderEventBus.stop()
+    PasswordHasher.shutdown()
+    await close_payment_gateway()
+
+app = FastAPI(title="Pizza Ordering System", lifespan=lifespan)
+
+# Brotli or gzip for JSON and text bodies large enough to be worth it
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
 
 # Expanded CORS configuration
 app.add_middleware(
@@ -18,15 +54,20 @@ app.add_middleware(
         "Accept",
         "Origin",
         "X-Requested-With",
+        "Idempotency-Key",
+        "X-SQL-Trace",
     ],
     expose_headers=["*"],
     max_age=600,  # Cache preflight requests for 10 minutes
 )
 
-# Rest of your configurations
-Base.metadata.create_all(bind=engine)
+# Admins can ask for a request's SQL trace with X-SQL-Trace: 1
+app.add_middleware(SqlTraceMiddleware)
+
+# Outermost, so latency covers compression and CORS too
+app.add_middleware(MetricsMiddleware)
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="static", max_age=settings.STATIC_CACHE_MAX_AGE_SECONDS), name="static")
 
 app.include_router(auth.router, prefix="/api", tags=["authentication"])
 app.include_router(pizza.router, prefix="/api", tags=["pizzas"])
@@ -34,6 +75,8 @@ app.include_router(orders.router, prefix="/api", tags=["orders"])
 app.include_router(coupon.router, prefix="/api", tags=["coupons"])
 app.include_router(toppings.router, prefix="/api", tags=["toppings"])
 app.include_router(payment.router, prefix="/api", tags=["payment"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
+app.include_router(metrics.router, tags=["metrics"])
 
 if __name__ == "__main__":
     import uvicorn
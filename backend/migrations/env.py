@@ -0,0 +1,54 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+from app.core.database import Base
+import app.models.models  # noqa: F401  registers every table on Base.metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+def database_url() -> str:
+    # Tests and tools can point a run at another database through the Alembic config
+    return config.get_main_option("sqlalchemy.url") or settings.DATABASE_URL
+
+def configure(**options):
+    url = make_url(database_url())
+    context.configure(
+        target_metadata=target_metadata,
+        compare_type=True,
+        # SQLite can only ALTER a table by copying it
+        render_as_batch=url.get_backend_name() == "sqlite",
+        **options
+    )
+
+def run_migrations_offline():
+    """Print the SQL for a DBA to apply, without connecting: alembic upgrade head --sql"""
+    configure(url=database_url(), literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Handed over by a caller that already holds a connection
+        configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(database_url(), poolclass=NullPool)
+    with engine.connect() as connection:
+        configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
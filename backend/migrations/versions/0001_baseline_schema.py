@@ -0,0 +1,144 @@
+"""Baseline schema
+
+The tables as Base.metadata.create_all built them at startup, before the
+schema was managed with Alembic. A database created that way already
+matches this revision; mark it as such with `alembic stamp 0001` before
+running `alembic upgrade head`. Everything added since is in 0002 onwards.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 19:53:01.454647
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ENUM_TYPES = ('discounttype', 'pizzacategory', 'userrole', 'orderstatus', 'pizzasizeenum')
+
+
+def upgrade() -> None:
+    op.create_table('coupons',
+    sa.Column('coupon_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.Column('discount_type', sa.Enum('PERCENTAGE', 'FIXED', name='discounttype'), nullable=False),
+    sa.Column('discount_value', sa.Float(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('valid_from', sa.DateTime(), nullable=False),
+    sa.Column('valid_until', sa.DateTime(), nullable=False),
+    sa.Column('min_order_value', sa.Float(), nullable=True),
+    sa.Column('max_discount', sa.Float(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('usage_limit', sa.Integer(), nullable=True),
+    sa.Column('current_usage', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('coupon_id')
+    )
+    op.create_index('ix_coupons_code', 'coupons', ['code'], unique=True)
+    op.create_table('pizzas',
+    sa.Column('pizza_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('base_price', sa.Float(), nullable=False),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('category', sa.Enum('BUY1GET4', 'VEG_PIZZA', 'NON_VEG', 'CLASSIC_MANIA', 'DRINKS', name='pizzacategory'), nullable=False),
+    sa.PrimaryKeyConstraint('pizza_id')
+    )
+    op.create_table('toppings',
+    sa.Column('topping_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('is_vegetarian', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('topping_id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('users',
+    sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=True),
+    sa.Column('role', sa.Enum('ADMIN', 'USER', name='userrole'), nullable=True),
+    sa.Column('refresh_token', sa.String(), nullable=True),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('address', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+    op.create_table('orders',
+    sa.Column('order_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('order_date', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.Enum('RECEIVED', 'PREPARING', 'BAKING', 'READY', 'DELIVERED', name='orderstatus'), nullable=True),
+    sa.Column('delivery_address', sa.String(), nullable=False),
+    sa.Column('contact_number', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('order_id')
+    )
+    op.create_table('pizza_toppings',
+    sa.Column('pizza_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('topping_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.ForeignKeyConstraint(['pizza_id'], ['pizzas.pizza_id'], ),
+    sa.ForeignKeyConstraint(['topping_id'], ['toppings.topping_id'], )
+    )
+    op.create_table('s',
+    sa.Column('size_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('pizza_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('size', sa.Enum('SMALL', 'MEDIUM', 'LARGE', name='pizzasizeenum'), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['pizza_id'], ['pizzas.pizza_id'], ),
+    sa.PrimaryKeyConstraint('size_id')
+    )
+    op.create_table('coupon_usages',
+    sa.Column('usage_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('coupon_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('order_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('used_at', sa.DateTime(), nullable=True),
+    sa.Column('discount_amount', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['coupon_id'], ['coupons.coupon_id'], ),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.order_id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('usage_id')
+    )
+    op.create_table('order_items',
+    sa.Column('item_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('order_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('pizza_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('custom_toppings', sa.JSON(), nullable=True),
+    sa.Column('size', postgresql.ENUM('SMALL', 'MEDIUM', 'LARGE', name='pizzasizeenum', create_type=False), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.order_id'], ),
+    sa.ForeignKeyConstraint(['pizza_id'], ['pizzas.pizza_id'], ),
+    sa.PrimaryKeyConstraint('item_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('order_items')
+    op.drop_table('coupon_usages')
+    op.drop_table('s')
+    op.drop_table('pizza_toppings')
+    op.drop_table('orders')
+    op.drop_index('ix_users_username', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
+    op.drop_table('toppings')
+    op.drop_table('pizzas')
+    op.drop_index('ix_coupons_code', table_name='coupons')
+    op.drop_table('coupons')
+    # Postgres keeps enum types after their tables are gone
+    for name in ENUM_TYPES:
+        sa.Enum(name=name).drop(op.get_bind(), checkfirst=True)
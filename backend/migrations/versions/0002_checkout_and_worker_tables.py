@@ -0,0 +1,127 @@
+"""Columns and tables added on top of the baseline
+
+- pizzas.image_variants: resized copies of the uploaded image
+- orders.payment_status and orders.payment_intent_id, set from Stripe webhooks
+- processed_stripe_events: webhook events waiting for PaymentEventWorker
+- notification_outbox: order confirmations waiting for NotificationWorker
+- rate_limit_buckets and cache_versions: state shared between workers
+- a unique (coupon_id, user_id) constraint on coupon_usages
+
+Existing orders get payment_status PENDING, the column's server default,
+before it is made NOT NULL. Before the unique constraint is added, repeat
+redemptions of a coupon by the same user are deleted, keeping the first;
+coupons.current_usage is left alone, as those redemptions did happen.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 21:12:40.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Created explicitly below: add_column does not create enum types on its own
+payment_status = postgresql.ENUM('PENDING', 'COMPLETED', 'FAILED', name='paymentstatus', create_type=False)
+
+ENUM_TYPES = ('paymentstatus', 'notificationchannel', 'notificationstatus')
+
+
+def upgrade() -> None:
+    op.add_column('pizzas', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+    payment_status.create(op.get_bind(), checkfirst=True)
+    op.add_column('orders', sa.Column('payment_status', payment_status, server_default='PENDING', nullable=True))
+    op.add_column('orders', sa.Column('payment_intent_id', sa.String(), nullable=True))
+    op.execute("UPDATE orders SET payment_status = 'PENDING' WHERE payment_status IS NULL")
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.alter_column(
+            'payment_status',
+            existing_type=payment_status,
+            existing_server_default='PENDING',
+            nullable=False
+        )
+
+    op.create_table('processed_stripe_events',
+    sa.Column('event_id', sa.String(), nullable=False),
+    sa.Column('event_type', sa.String(), nullable=False),
+    sa.Column('order_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('payment_status', payment_status, nullable=True),
+    sa.Column('payment_intent_id', sa.String(), nullable=True),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_index('ix_processed_stripe_events_processed_at_received_at', 'processed_stripe_events', ['processed_at', 'received_at'], unique=False)
+    op.create_table('notification_outbox',
+    sa.Column('notification_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('order_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('channel', sa.Enum('EMAIL', 'SMS', name='notificationchannel'), nullable=False),
+    sa.Column('recipient', sa.String(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=True),
+    sa.Column('body', sa.String(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'SENT', 'FAILED', name='notificationstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.order_id'], ),
+    sa.PrimaryKeyConstraint('notification_id')
+    )
+    op.create_index('ix_notification_outbox_status_next_attempt_at', 'notification_outbox', ['status', 'next_attempt_at'], unique=False)
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('tat', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_table('cache_versions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Keep the first redemption of each (coupon, user): earliest used_at, then lowest usage_id,
+    # with rows missing used_at last
+    op.execute("""
+        DELETE FROM coupon_usages
+        WHERE EXISTS (
+            SELECT 1 FROM coupon_usages AS earlier
+            WHERE earlier.coupon_id = coupon_usages.coupon_id
+              AND earlier.user_id = coupon_usages.user_id
+              AND (
+                  earlier.used_at < coupon_usages.used_at
+                  OR (earlier.used_at = coupon_usages.used_at AND earlier.usage_id < coupon_usages.usage_id)
+                  OR (coupon_usages.used_at IS NULL AND earlier.used_at IS NOT NULL)
+                  OR (coupon_usages.used_at IS NULL AND earlier.used_at IS NULL AND earlier.usage_id < coupon_usages.usage_id)
+              )
+        )
+    """)
+    with op.batch_alter_table('coupon_usages') as batch_op:
+        batch_op.create_unique_constraint('uq_coupon_usages_coupon_id_user_id', ['coupon_id', 'user_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('coupon_usages') as batch_op:
+        batch_op.drop_constraint('uq_coupon_usages_coupon_id_user_id', type_='unique')
+    op.drop_table('cache_versions')
+    op.drop_table('rate_limit_buckets')
+    op.drop_index('ix_notification_outbox_status_next_attempt_at', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
+    op.drop_index('ix_processed_stripe_events_processed_at_received_at', table_name='processed_stripe_events')
+    op.drop_table('processed_stripe_events')
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('payment_intent_id')
+        batch_op.drop_column('payment_status')
+    with op.batch_alter_table('pizzas') as batch_op:
+        batch_op.drop_column('image_variants')
+    for name in ENUM_TYPES:
+        sa.Enum(name=name).drop(op.get_bind(), checkfirst=True)
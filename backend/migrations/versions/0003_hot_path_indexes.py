@@ -0,0 +1,51 @@
+"""Indexes for the hot query paths
+
+- orders, three composite indexes ending in (created_at, order_id): a user's
+  orders, and the admin order history walked newest first, unfiltered or by status
+- order_items (order_id): an order's items, and the outer join in the order export
+- s (pizza_id): a pizza's sizes, and the price lookup at checkout
+- coupon_usages (user_id, coupon_id): the coupons a user has already redeemed
+  (the unique constraint only covers lookups that start from coupon_id)
+- pizza_toppings, both ways round: a pizza's toppings and a topping's pizzas
+
+On Postgres the indexes are built CONCURRENTLY, so orders keep flowing
+while they build.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 19:53:35.334050
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_orders_user_id_created_at_order_id', 'orders', ['user_id', 'created_at', 'order_id']),
+    ('ix_orders_status_created_at_order_id', 'orders', ['status', 'created_at', 'order_id']),
+    ('ix_orders_created_at_order_id', 'orders', ['created_at', 'order_id']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_s_pizza_id', 's', ['pizza_id']),
+    ('ix_coupon_usages_user_id_coupon_id', 'coupon_usages', ['user_id', 'coupon_id']),
+    ('ix_pizza_toppings_pizza_id_topping_id', 'pizza_toppings', ['pizza_id', 'topping_id']),
+    ('ix_pizza_toppings_topping_id_pizza_id', 'pizza_toppings', ['topping_id', 'pizza_id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
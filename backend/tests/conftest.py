@@ -0,0 +1,110 @@
+import asyncio
+import os
+import sys
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Test settings
+test_settings = {
+    "DATABASE_URL": "sqlite:///:memory:",
+    "SECRET_KEY": "test_secret_key",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7",
+    "SMTP_SERVER": "test_smtp_server",
+    "SMTP_PORT": "587",
+    "SENDER_EMAIL": "test@example.com",
+    "SENDER_PASSWORD": "test_password",
+    "TWILIO_ACCOUNT_SID": "test_sid",
+    "TWILIO_AUTH_TOKEN": "test_token",
+    "TWILIO_PHONE_NUMBER": "+1234567890",
+    "FRONTEND_URL": "http://localhost:3000",
+    "STRIPE_SECRET_KEY": "test_stripe_key",
+    "STRIPE_WEBHOOK_SECRET": "test_webhook_secret",
+    "BCRYPT_ROUNDS": "4",
+    "PASSWORD_HASH_WORKERS": "2"
+}
+
+for key, value in test_settings.items():
+    os.environ.setdefault(key, str(value))
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@compiles(UUID, "sqlite")
+def compile_uuid_for_sqlite(type_, compiler, **kw):
+    # The models use the Postgres UUID type; SQLite stores it as text
+    return "CHAR(36)"
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    # Every test starts with full buckets
+    from app.core.rate_limit import InMemoryBackend, RateLimiter
+    RateLimiter.use_backend(InMemoryBackend())
+
+# One in-memory database for the whole run; StaticPool keeps it on a single connection
+engine = create_async_engine(
+    "sqlite+aiosqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def _instrument_test_engine():
+    # Counted and traced like the app's own engines; imported here, once the settings above are in place
+    from app.core.database import instrument_queries
+    instrument_queries(engine.sync_engine)
+
+_instrument_test_engine()
+
+async def reset_schema():
+    from app.core.database import Base
+    import app.models.models  # noqa: F401  registers every table on Base.metadata
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+@pytest.fixture(scope="session")
+def reset_db():
+    """Drop and recreate every table; for tests that need a clean database more than once."""
+    return lambda: asyncio.run(reset_schema())
+
+@pytest.fixture(scope="session")
+def database():
+    """Sessions on the shared in-memory database, as they are."""
+    return TestingSessionLocal
+
+@pytest.fixture
+def session_factory(database, reset_db):
+    """Sessions on the shared in-memory database, starting from empty tables."""
+    reset_db()
+    return database
+
+@pytest.fixture
+def db_overrides(session_factory):
+    """Dependency overrides pointing an app's database dependencies at session_factory."""
+    from app.core.database import get_async_db, get_async_session_factory
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    return {get_async_db: override_get_async_db, get_async_session_factory: lambda: session_factory}
+
+@pytest.fixture
+def sql_statements(session_factory):
+    """Every statement sent to the database while the test runs."""
+    sync_engine = session_factory.kw["bind"].sync_engine
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(sync_engine, "before_cursor_execute", record)
@@ -1,68 +1,29 @@
-import os
-import sys
+import asyncio
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-
-# Test settings
-test_settings = {
-    "DATABASE_URL": "sqlite:///:memory:",
-    "SECRET_KEY": "test_secret_key",
-    "ALGORITHM": "HS256",
-    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
-    "REFRESH_TOKEN_EXPIRE_DAYS": "7",
-    "SMTP_SERVER": "test_smtp_server",
-    "SMTP_PORT": "587",
-    "SENDER_EMAIL": "test@example.com",
-    "SENDER_PASSWORD": "test_password",
-    "TWILIO_ACCOUNT_SID": "test_sid",
-    "TWILIO_AUTH_TOKEN": "test_token",
-    "TWILIO_PHONE_NUMBER": "+1234567890",
-    "FRONTEND_URL": "http://localhost:3000",
-    "STRIPE_SECRET_KEY": "test_stripe_key",
-    "STRIPE_WEBHOOK_SECRET": "test_webhook_secret"
-}
-
-for key, value in test_settings.items():
-    os.environ[key] = str(value)
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from app.core.database import Base, get_db
+from passlib.context import CryptContext
+from sqlalchemy import select
+
 from app.apis import auth
+from app.core.config import settings
+from app.models.models import User
 
 def create_test_app():
     app = FastAPI()
     app.include_router(auth.router)
     return app
 
-engine = create_engine(
-    "sqlite:///:memory:",
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@pytest.fixture(scope="session", autouse=True)
-def setup_test_database():
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
+@pytest.fixture(scope="module")
+def session_factory(database, reset_db):
+    # One database for the module; users registered by one test are still there in the next
+    reset_db()
+    return database
 
 @pytest.fixture(scope="function")
-def test_app():
+def test_app(db_overrides):
     app = create_test_app()
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides.update(db_overrides)
     return TestClient(app)
 
 @pytest.fixture
@@ -159,4 +120,25 @@ def test_login_missing_fields(test_app):
     }
     
     response = test_app.post("/login", json=incomplete_login)
-    assert response.status_code == 422  # FastAPI validation error
\ No newline at end of file
+    assert response.status_code == 422  # FastAPI validation error
+
+
+def test_login_rehashes_outdated_password_hash(test_app, session_factory, user_data):
+    test_app.post("/register", json=user_data)
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=settings.BCRYPT_ROUNDS + 1).hash(user_data["password"])
+
+    async def stored_hash(new_hash=None):
+        async with session_factory() as db:
+            user = (await db.execute(select(User).filter(User.email == user_data["email"]))).scalars().first()
+            if new_hash:
+                user.hashed_password = new_hash
+                await db.commit()
+            return user.hashed_password
+
+    asyncio.run(stored_hash(old_hash))
+    response = test_app.post("/login", json={"email": user_data["email"], "password": user_data["password"]})
+    assert response.status_code == 200
+
+    upgraded = asyncio.run(stored_hash())
+    assert upgraded != old_hash
+    assert upgraded.split("$")[2] == f"{settings.BCRYPT_ROUNDS:02d}"
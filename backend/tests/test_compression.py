@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, negotiate
+
+MENU = [{"name": f"Pizza {i}", "description": "Tomato, mozzarella and basil", "base_price": 100 + i} for i in range(50)]
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/menu")
+    def menu():
+        return MENU
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/tagged")
+    def tagged():
+        return Response(content=b'{"pizzas": []}' * 100, media_type="application/json", headers={"ETag": '"abc"'})
+
+    @app.get("/image")
+    def image():
+        return Response(content=b"\x89PNG" + b"\x00" * 4096, media_type="image/png")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((b"x" * 2048 for _ in range(3)), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+def test_large_json_is_gzipped(client):
+    response = client.get("/menu", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == MENU
+
+def test_brotli_is_preferred_when_available(client):
+    brotli = pytest.importorskip("brotli")
+    response = client.get("/menu", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    # httpx only decodes br when it has a decoder of its own, so read the raw bytes
+    with client.stream("GET", "/menu", headers={"Accept-Encoding": "br"}) as raw:
+        body = b"".join(raw.iter_raw())
+    assert brotli.decompress(body) == client.get("/menu", headers={"Accept-Encoding": "identity"}).content
+
+def test_small_and_refused_responses_are_sent_as_they_are(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+    response = client.get("/menu", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == MENU
+
+def test_compressed_bodies_get_a_weak_etag(client):
+    response = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"abc"'
+
+def test_images_and_streams_pass_through(client):
+    response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert "content-encoding" not in response.headers
+        assert b"".join(response.iter_raw()) == b"x" * 6144
+
+def test_negotiate():
+    assert negotiate("") is None
+    assert negotiate("deflate") is None
+    assert negotiate("GZIP") == "gzip"
+    assert negotiate("gzip;q=0.5, br;q=0") == "gzip"
@@ -0,0 +1,218 @@
+import asyncio
+import datetime
+import uuid
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.apis import coupon as coupon_api
+from app.core.cache import MISSING, TTLCache
+from app.core.database import Base
+from app.core.security import create_access_token
+from app.models.models import Coupon, CouponUsage, DiscountType
+from app.services.coupon_cache import CouponCache
+from app.services.coupon_services import CouponService
+
+@pytest.fixture(autouse=True)
+def clear_coupon_cache():
+    CouponCache.clear()
+    yield
+    CouponCache.clear()
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file database with a connection per session, so redemptions really run concurrently
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'coupons.db'}",
+        connect_args={"timeout": 30},
+        poolclass=NullPool,
+    )
+
+    async def create_schema():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+async def create_coupon(session_factory, usage_limit):
+    async with session_factory() as db:
+        coupon = Coupon(
+            code="FLASH50",
+            discount_type=DiscountType.FIXED,
+            discount_value=50,
+            valid_from=datetime.datetime.utcnow() - datetime.timedelta(days=1),
+            valid_until=datetime.datetime.utcnow() + datetime.timedelta(days=1),
+            usage_limit=usage_limit,
+            current_usage=0,
+        )
+        db.add(coupon)
+        await db.commit()
+        return coupon
+
+async def redeem_concurrently(session_factory, coupon, user_ids):
+    async def redeem(user_id):
+        async with session_factory() as db:
+            try:
+                await CouponService.record_coupon_usage(db, coupon, user_id, uuid.uuid4(), 50)
+                return "ok"
+            except HTTPException as e:
+                return e.detail
+
+    return await asyncio.gather(*(redeem(user_id) for user_id in user_ids))
+
+async def usage_counts(session_factory, coupon):
+    async with session_factory() as db:
+        current_usage = (await db.execute(
+            select(Coupon.current_usage).filter(Coupon.coupon_id == coupon.coupon_id)
+        )).scalar_one()
+        usages = (await db.execute(
+            select(func.count()).select_from(CouponUsage).filter(CouponUsage.coupon_id == coupon.coupon_id)
+        )).scalar_one()
+        return current_usage, usages
+
+def test_concurrent_redemptions_never_exceed_usage_limit(session_factory):
+    async def scenario():
+        coupon = await create_coupon(session_factory, usage_limit=10)
+        results = await redeem_concurrently(session_factory, coupon, [uuid.uuid4() for _ in range(40)])
+        return results, await usage_counts(session_factory, coupon)
+
+    results, (current_usage, usages) = asyncio.run(scenario())
+    assert results.count("ok") == 10
+    assert results.count("Coupon usage limit reached") == 30
+    assert current_usage == usages == 10
+
+def test_concurrent_redemptions_by_one_user_count_once(session_factory):
+    async def scenario():
+        coupon = await create_coupon(session_factory, usage_limit=None)
+        user_id = uuid.uuid4()
+        results = await redeem_concurrently(session_factory, coupon, [user_id] * 8)
+        return results, await usage_counts(session_factory, coupon)
+
+    results, (current_usage, usages) = asyncio.run(scenario())
+    assert results.count("ok") == 1
+    assert results.count("Coupon already used") == 7
+    # The losing redemptions rolled back their increment along with the usage row
+    assert current_usage == usages == 1
+
+@pytest.mark.parametrize("change", [
+    {"is_active": False},
+    {"valid_until": datetime.datetime.utcnow() - datetime.timedelta(minutes=1)},
+    {"valid_from": datetime.datetime.utcnow() + datetime.timedelta(days=1)},
+])
+def test_redemption_rechecks_active_and_validity_window(session_factory, change):
+    async def scenario():
+        coupon = await create_coupon(session_factory, usage_limit=None)
+        # Validated while still good, so the cached copy says it is redeemable
+        async with session_factory() as db:
+            cached, _ = await CouponService.validate_and_apply_coupon(db, "FLASH50", uuid.uuid4(), 500)
+            await db.execute(update(Coupon).filter(Coupon.coupon_id == coupon.coupon_id).values(**change))
+            await db.commit()
+        results = await redeem_concurrently(session_factory, cached, [uuid.uuid4()])
+        return results, await usage_counts(session_factory, coupon)
+
+    results, (current_usage, usages) = asyncio.run(scenario())
+    assert results == ["Invalid or expired coupon"]
+    assert current_usage == usages == 0
+
+def test_validation_is_served_from_cache(session_factory, sql_statements):
+    async def scenario():
+        coupon = await create_coupon(session_factory, usage_limit=None)
+        user_id = uuid.uuid4()
+        async with session_factory() as db:
+            sql_statements.clear()
+            first = await CouponService.validate_and_apply_coupon(db, "FLASH50", user_id, 500)
+            cold = len(sql_statements)
+            for _ in range(5):
+                assert await CouponService.validate_and_apply_coupon(db, "FLASH50", user_id, 500) == first
+            warm = len(sql_statements) - cold
+
+        async with session_factory() as db:
+            await CouponService.record_coupon_usage(db, coupon, user_id, uuid.uuid4(), 50)
+        sql_statements.clear()
+        async with session_factory() as db:
+            with pytest.raises(HTTPException) as exc:
+                await CouponService.validate_and_apply_coupon(db, "FLASH50", user_id, 500)
+        return first, cold, warm, exc.value.detail
+
+    (coupon, discount), cold, warm, detail = asyncio.run(scenario())
+    assert coupon.code == "FLASH50" and discount == 50
+    assert cold == 2 and warm == 0
+    # The redemption itself was remembered, so the rejection needs no query
+    assert detail == "Coupon already used"
+    assert not any(s.lstrip().upper().startswith("SELECT") for s in sql_statements)
+
+def test_unknown_codes_are_negatively_cached(session_factory, sql_statements):
+    async def attempt():
+        async with session_factory() as db:
+            with pytest.raises(HTTPException) as exc:
+                await CouponService.validate_and_apply_coupon(db, "NOSUCHCODE", uuid.uuid4(), 500)
+            return exc.value.status_code
+
+    assert asyncio.run(attempt()) == 404
+    queries = len(sql_statements)
+    assert [asyncio.run(attempt()) for _ in range(5)] == [404] * 5
+    assert len(sql_statements) == queries
+
+def test_the_code_index_is_bounded_like_the_coupon_cache(session_factory, monkeypatch):
+    monkeypatch.setattr(CouponCache, "_coupons", TTLCache(2))
+    monkeypatch.setattr(CouponCache, "_codes", TTLCache(2))
+
+    async def scenario():
+        async with session_factory() as db:
+            coupons = [
+                Coupon(code=f"CODE{i}", discount_type=DiscountType.FIXED, discount_value=10,
+                       valid_from=datetime.datetime.utcnow(), valid_until=datetime.datetime.utcnow())
+                for i in range(5)
+            ]
+            db.add_all(coupons)
+            await db.commit()
+            for coupon in coupons:
+                await CouponCache.get_coupon(db, coupon.code)
+        return coupons
+
+    coupons = asyncio.run(scenario())
+    assert len(CouponCache._codes) == 2
+    CouponCache.forget(coupons[-1].coupon_id)
+    assert CouponCache._coupons.get("CODE4") is MISSING
+    assert CouponCache._coupons.get("CODE3") is not MISSING
+
+def test_admin_writes_invalidate_cached_codes(session_factory, db_overrides):
+    app = FastAPI()
+    app.include_router(coupon_api.router)
+    app.dependency_overrides.update(db_overrides)
+    client = TestClient(app)
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': str(uuid.uuid4()), 'role': 'admin'})}"}
+
+    async def validate():
+        async with session_factory() as db:
+            try:
+                _, discount = await CouponService.validate_and_apply_coupon(db, "WELCOME", uuid.uuid4(), 500)
+                return discount
+            except HTTPException as e:
+                return e.status_code
+
+    assert asyncio.run(validate()) == 404  # now negatively cached
+    now = datetime.datetime.utcnow()
+    payload = {
+        "code": "WELCOME",
+        "discount_type": "fixed",
+        "discount_value": 75,
+        "valid_from": (now - datetime.timedelta(days=1)).isoformat(),
+        "valid_until": (now + datetime.timedelta(days=1)).isoformat(),
+    }
+    response = client.post("/coupons", json=payload, headers=admin)
+    assert response.status_code == 200
+    assert asyncio.run(validate()) == 75
+
+    response = client.put(f"/coupons/{response.json()['coupon_id']}", json=dict(payload, discount_value=100), headers=admin)
+    assert response.status_code == 200
+    assert asyncio.run(validate()) == 100
+
+    assert client.delete(f"/coupons/{response.json()['coupon_id']}", headers=admin).status_code == 200
+    assert asyncio.run(validate()) == 404
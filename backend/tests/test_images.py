@@ -0,0 +1,138 @@
+import asyncio
+import io
+import json
+import os
+import struct
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.apis import pizza
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.models import Pizza, PizzaCategory
+from app.services.image_service import ImageService
+from app.services.menu_cache import MenuCache
+
+def png(width: int, height: int) -> bytes:
+    """A valid, solid-colour PNG, so the tests need no image library to make one."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + b"\xd0\x40\x20" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, db_overrides):
+    # Uploads land under ./static, so give each test its own working directory
+    monkeypatch.chdir(tmp_path)
+    asyncio.run(MenuCache.invalidate())
+    app = FastAPI()
+    app.include_router(pizza.router)
+    app.dependency_overrides.update(db_overrides)
+    return TestClient(app)
+
+@pytest.fixture
+def admin_headers():
+    return {"Authorization": f"Bearer {create_access_token({'sub': '00000000-0000-0000-0000-000000000001', 'role': 'admin'})}"}
+
+def create_pizza(client, headers, name, image: bytes, filename="pizza.png"):
+    return client.post(
+        "/pizzas",
+        data={
+            "name": name,
+            "base_price": "100",
+            "category": PizzaCategory.VEG_PIZZA.value,
+            "sizes": json.dumps([{"size": "small", "price": 100}]),
+        },
+        files={"image": (filename, io.BytesIO(image), "image/png")},
+        headers=headers,
+    )
+
+def stored_files(directory="static/pizza_images"):
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+def test_uploads_are_stored_under_their_content_hash(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_VARIANT_FORMATS", [])
+    image = png(4, 4)
+    first = create_pizza(client, admin_headers, "Margherita", image, filename="../../etc/evil.png")
+    second = create_pizza(client, admin_headers, "Marinara", image, filename="another-name.png")
+    assert first.status_code == second.status_code == 201
+
+    first_path = first.json()["data"]["image_path"]
+    assert first_path == second.json()["data"]["image_path"]
+    assert first_path.startswith("static/pizza_images/") and first_path.endswith(".png")
+    assert "evil" not in first_path
+    # One file for both pizzas, no partial files left behind
+    assert stored_files() == [os.path.basename(first_path)]
+    with open(first_path, "rb") as f:
+        assert f.read() == image
+
+def test_oversized_and_non_image_uploads_are_rejected(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_MAX_BYTES", 1024)
+    response = create_pizza(client, admin_headers, "Huge", png(200, 200) + b"\x00" * 4096)
+    assert response.status_code == 413
+
+    response = create_pizza(client, admin_headers, "Script", b"<script>alert(1)</script>", filename="x.png")
+    assert response.status_code == 415
+
+    assert stored_files() == []
+    assert client.get("/pizzas").json() == []
+
+def test_menu_lists_variants_as_srcset(client, session_factory):
+    async def seed():
+        async with session_factory() as db:
+            db.add(Pizza(
+                name="Margherita",
+                base_price=100,
+                category=PizzaCategory.VEG_PIZZA,
+                image_url="static/pizza_images/abc.png",
+                image_variants=[
+                    {"format": "webp", "width": 640, "url": "static/pizza_images/abc-640.webp"},
+                    {"format": "webp", "width": 320, "url": "static/pizza_images/abc-320.webp"},
+                    {"format": "avif", "width": 320, "url": "static/pizza_images/abc-320.avif"},
+                ],
+            ))
+            await db.commit()
+
+    asyncio.run(seed())
+    menu = client.get("/pizzas").json()
+    assert menu[0]["image_srcset"] == {
+        "image/webp": "static/pizza_images/abc-320.webp 320w, static/pizza_images/abc-640.webp 640w",
+        "image/avif": "static/pizza_images/abc-320.avif 320w",
+    }
+
+def test_variants_are_generated_after_the_response(client, session_factory, admin_headers, monkeypatch):
+    pytest.importorskip("PIL")
+    monkeypatch.setattr(settings, "IMAGE_VARIANT_WIDTHS", [32, 64, 1280])
+    monkeypatch.setattr(settings, "IMAGE_VARIANT_FORMATS", ["webp"])
+
+    response = create_pizza(client, admin_headers, "Margherita", png(100, 50))
+    assert response.status_code == 201
+    stem = os.path.splitext(response.json()["data"]["image_path"])[0]
+
+    async def variants():
+        async with session_factory() as db:
+            return (await db.execute(select(Pizza.image_variants))).scalar_one()
+
+    # Widths above the original are clamped rather than upscaled
+    assert asyncio.run(variants()) == [
+        {"format": "webp", "width": width, "url": f"{stem}-{width}.webp"} for width in (32, 64, 100)
+    ]
+    assert all(os.path.exists(f"{stem}-{width}.webp") for width in (32, 64, 100))
+    srcset = client.get("/pizzas").json()[0]["image_srcset"]
+    assert srcset == {"image/webp": f"{stem}-32.webp 32w, {stem}-64.webp 64w, {stem}-100.webp 100w"}
+
+def test_variants_are_skipped_without_an_encoder(tmp_path, monkeypatch, session_factory):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("static/pizza_images")
+    with open("static/pizza_images/a.png", "wb") as f:
+        f.write(png(8, 8))
+    # Without Pillow, or for formats it cannot encode, there is nothing to record and nothing fails
+    assert asyncio.run(ImageService.generate_variants(session_factory, None, "static/pizza_images/a.png")) is None
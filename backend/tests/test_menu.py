@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.models import Pizza, PizzaSize, PizzaSizeEnum, PizzaCategory, Topping
+from app.apis import pizza
+from app.services.menu_cache import MenuCache
+from app.services.pizza_services import PizzaService
+
+def create_test_app():
+    app = FastAPI()
+    app.include_router(pizza.router)
+    return app
+
+async def seed_menu(session_factory, pizza_count: int):
+    async with session_factory() as db:
+        toppings = [Topping(name=f"Topping {i}", price=10 + i) for i in range(5)]
+        for i in range(pizza_count):
+            db.add(Pizza(
+                name=f"Pizza {i:03d}",
+                description="Test pizza",
+                base_price=100,
+                category=PizzaCategory.VEG_PIZZA,
+                image_url=f"static/pizza_images/{i}.png",
+                sizes=[
+                    PizzaSize(size=PizzaSizeEnum.SMALL, price=100),
+                    PizzaSize(size=PizzaSizeEnum.LARGE, price=200),
+                ],
+                toppings=toppings[:i % 5 + 1],
+            ))
+        await db.commit()
+
+@pytest.fixture(scope="function")
+def test_app(db_overrides):
+    app = create_test_app()
+    app.dependency_overrides.update(db_overrides)
+    return TestClient(app)
+
+@pytest.fixture
+def fetch_menu(test_app, reset_db, session_factory, sql_statements):
+    def fetch(pizza_count: int):
+        reset_db()
+        asyncio.run(seed_menu(session_factory, pizza_count))
+        asyncio.run(MenuCache.invalidate())
+        sql_statements.clear()
+        response = test_app.get("/pizzas")
+        assert response.status_code == 200
+        return response.json(), len(sql_statements)
+    return fetch
+
+def test_menu_nests_sizes_and_toppings(fetch_menu):
+    menu, _ = fetch_menu(3)
+
+    assert [p["name"] for p in menu] == ["Pizza 000", "Pizza 001", "Pizza 002"]
+    assert [s["size"] for s in menu[0]["sizes"]] == ["small", "large"]
+    assert len(menu[2]["toppings"]) == 3
+    assert {"topping_id", "name", "price"} <= set(menu[2]["toppings"][0])
+
+def test_menu_query_count_does_not_grow_with_menu_size(fetch_menu):
+    _, small_menu_queries = fetch_menu(2)
+    _, large_menu_queries = fetch_menu(60)
+
+    assert small_menu_queries == large_menu_queries
+    assert large_menu_queries <= 3
+
+def test_menu_is_served_from_cache_with_etag(test_app, fetch_menu, sql_statements):
+    menu, _ = fetch_menu(3)
+
+    sql_statements.clear()
+    response = test_app.get("/pizzas")
+    etag = response.headers["etag"]
+    assert response.json() == menu
+    assert sql_statements == []
+
+    response = test_app.get("/pizzas", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+def test_menu_write_invalidates_cache(test_app, fetch_menu, session_factory):
+    menu, _ = fetch_menu(3)
+    etag = test_app.get("/pizzas").headers["etag"]
+
+    async def delete_first_pizza():
+        async with session_factory() as db:
+            await PizzaService.delete_pizza(db, menu[0]["pizza_id"])
+    asyncio.run(delete_first_pizza())
+
+    response = test_app.get("/pizzas", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()) == 2
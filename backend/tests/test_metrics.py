@@ -0,0 +1,90 @@
+import uuid
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.apis import metrics
+from app.core.config import settings
+from app.core.metrics import Family, Histogram, Registry
+from app.core.request_metrics import MetricsMiddleware
+
+@pytest.fixture
+def client(session_factory):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
+
+    @app.get("/things/{thing_id}")
+    async def get_thing(thing_id: uuid.UUID):
+        async with session_factory() as db:
+            for _ in range(3):
+                await db.execute(text("SELECT 1"))
+        return {"thing_id": str(thing_id)}
+
+    @app.get("/broken")
+    async def broken():
+        raise HTTPException(status_code=503, detail="Down for maintenance")
+
+    return TestClient(app)
+
+def sample(body: str, name: str, **labels) -> float:
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    for line in body.splitlines():
+        series, _, value = line.rpartition(" ")
+        if series == (f"{name}{{{wanted}}}" if labels else name):
+            return float(value)
+    return 0.0
+
+def test_requests_are_recorded_per_route_template(client):
+    before = client.get("/metrics").text
+    for _ in range(2):
+        assert client.get(f"/things/{uuid.uuid4()}").status_code == 200
+    assert client.get("/broken").status_code == 503
+    assert client.get("/nowhere").status_code == 404
+    body = client.get("/metrics").text
+
+    def grew(name, **labels):
+        return sample(body, name, **labels) - sample(before, name, **labels)
+
+    route = {"method": "GET", "route": "/things/{thing_id}"}
+    assert grew("http_requests_total", **route, status="200") == 2
+    assert grew("http_requests_total", method="GET", route="/broken", status="503") == 1
+    assert grew("http_requests_total", method="GET", route="unmatched", status="404") == 1
+    assert grew("http_request_duration_seconds_count", **route) == 2
+    assert grew("http_request_db_queries_sum", **route) == 6
+    assert grew("http_request_db_queries_bucket", **route, le="3") == 2
+    assert grew("http_request_db_queries_bucket", **route, le="2") == 0
+    assert grew("http_request_db_duration_seconds_sum", **route) > 0
+    assert grew("http_request_db_queries_sum", method="GET", route="/broken") == 0
+    # Only the scrape that rendered this body was still running
+    assert sample(body, "http_requests_in_progress", method="GET") == 1
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert "# TYPE db_pool_wait_seconds histogram" in body
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-me")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-me"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+def test_text_format():
+    registry = Registry()
+    registry.counter("jobs_total", "Jobs run.", ("queue",)).labels('say "hi"\n').inc(3)
+    latency = Histogram(buckets=(0.1, 1))
+    latency.observe(0.5)
+    registry.register(Family("histogram", "job_seconds", "Job time.")).attach((), latency)
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs run.",
+        "# TYPE jobs_total counter",
+        'jobs_total{queue="say \\"hi\\"\\n"} 3',
+        "# HELP job_seconds Job time.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{le="0.1"} 0',
+        'job_seconds_bucket{le="1"} 1',
+        'job_seconds_bucket{le="+Inf"} 1',
+        "job_seconds_sum 0.5",
+        "job_seconds_count 1",
+    ]
@@ -0,0 +1,222 @@
+import asyncio
+import datetime
+import os
+import random
+import re
+import uuid
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, event, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from app.core.database import Base
+from app.models.models import (
+    CouponUsage, Order, OrderItem, OrderStatus, PaymentStatus, Pizza, PizzaCategory, PizzaSize,
+    PizzaSizeEnum, Topping, User, pizza_toppings
+)
+from app.schema.order import OrderItemCreate
+from app.services.coupon_cache import CouponCache
+from app.services.order_export_service import OrderExportService
+from app.services.order_service import OrderService
+from app.services.pizza_services import PizzaService
+from app.services.pricing_service import PricingService
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+def alembic_config(path) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    return config
+
+def test_migrations_match_models(tmp_path):
+    config = alembic_config(tmp_path / "schema.db")
+    command.upgrade(config, "head")
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+        indexes = {index["name"] for index in inspect(conn).get_indexes("pizza_toppings")}
+    assert indexes == {"ix_pizza_toppings_pizza_id_topping_id", "ix_pizza_toppings_topping_id_pizza_id"}
+
+    command.downgrade(config, "base")
+    with engine.connect() as conn:
+        assert inspect(conn).get_table_names() == ["alembic_version"]
+    engine.dispose()
+
+def test_upgrade_from_baseline_backfills_payments_and_dedupes_coupon_usages(tmp_path):
+    config = alembic_config(tmp_path / "baseline.db")
+    command.upgrade(config, "0001")
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    user, other_user, coupon, order = (str(uuid.uuid4()) for _ in range(4))
+    first, repeat, later, others = (str(uuid.uuid4()) for _ in range(4))
+    with engine.begin() as conn:
+        # Rows as the pre-Alembic backend wrote them, with a user redeeming the same coupon three times
+        conn.exec_driver_sql("INSERT INTO users (user_id, email) VALUES (?, 'a@example.com'), (?, 'b@example.com')", (user, other_user))
+        conn.exec_driver_sql(
+            "INSERT INTO coupons (coupon_id, code, discount_type, discount_value, valid_from, valid_until, current_usage) "
+            "VALUES (?, 'FLASH50', 'FIXED', 50, '2024-01-01', '2025-01-01', 4)", (coupon,)
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO orders (order_id, user_id, total_amount, delivery_address, contact_number) VALUES (?, ?, 450, 'x', '1')",
+            (order, user)
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO coupon_usages (usage_id, coupon_id, user_id, order_id, used_at, discount_amount) VALUES "
+            "(?, ?, ?, ?, '2024-01-02 10:00:00', 50), (?, ?, ?, ?, '2024-01-02 10:00:00', 50), "
+            "(?, ?, ?, ?, '2024-01-03 10:00:00', 50), (?, ?, ?, ?, '2024-01-04 10:00:00', 50)",
+            (min(first, repeat), coupon, user, order, max(first, repeat), coupon, user, order,
+             later, coupon, user, order, others, coupon, other_user, order)
+        )
+
+    command.upgrade(config, "head")
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT payment_status FROM orders").scalars().all() == ["PENDING"]
+        kept = conn.exec_driver_sql("SELECT usage_id FROM coupon_usages ORDER BY used_at").scalars().all()
+        assert kept == [min(first, repeat), others]
+        assert conn.exec_driver_sql("SELECT current_usage FROM coupons").scalar() == 4
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    engine.dispose()
+
+USERS = [uuid.uuid4() for _ in range(50)]
+PIZZAS = [uuid.uuid4() for _ in range(30)]
+TOPPINGS = [uuid.uuid4() for _ in range(20)]
+COUPONS = [uuid.uuid4() for _ in range(10)]
+
+def seed_rows(conn):
+    rng = random.Random(7)
+    start = datetime.datetime(2024, 1, 1)
+    conn.execute(insert(User), [{"user_id": user_id, "email": f"{user_id}@example.com", "username": str(user_id)} for user_id in USERS])
+    conn.execute(insert(Pizza), [
+        {"pizza_id": pizza_id, "name": f"Pizza {i}", "base_price": 200, "category": PizzaCategory.VEG_PIZZA}
+        for i, pizza_id in enumerate(PIZZAS)
+    ])
+    conn.execute(insert(PizzaSize), [
+        {"size_id": uuid.uuid4(), "pizza_id": pizza_id, "size": size, "price": 200 + 100 * i}
+        for pizza_id in PIZZAS for i, size in enumerate(PizzaSizeEnum)
+    ])
+    conn.execute(insert(Topping), [{"topping_id": topping_id, "name": f"Topping {i}", "price": 30} for i, topping_id in enumerate(TOPPINGS)])
+    conn.execute(insert(pizza_toppings), [
+        {"pizza_id": pizza_id, "topping_id": topping_id}
+        for pizza_id in PIZZAS for topping_id in rng.sample(TOPPINGS, 4)
+    ])
+
+    orders = [
+        {
+            "order_id": uuid.uuid4(),
+            "user_id": rng.choice(USERS),
+            "total_amount": 450,
+            "status": rng.choice(list(OrderStatus)),
+            "payment_status": PaymentStatus.COMPLETED,
+            "delivery_address": "x",
+            "contact_number": "1",
+            "created_at": start + datetime.timedelta(minutes=i),
+        }
+        for i in range(3000)
+    ]
+    conn.execute(insert(Order), orders)
+    conn.execute(insert(OrderItem), [
+        {"item_id": uuid.uuid4(), "order_id": order["order_id"], "pizza_id": rng.choice(PIZZAS), "quantity": 1, "size": PizzaSizeEnum.MEDIUM}
+        for order in orders for _ in range(2)
+    ])
+    conn.execute(insert(CouponUsage), [
+        {"usage_id": uuid.uuid4(), "coupon_id": coupon_id, "user_id": user_id, "order_id": orders[i]["order_id"], "discount_amount": 10}
+        for i, (user_id, coupon_id) in enumerate((u, c) for u in USERS for c in COUPONS)
+    ])
+    conn.exec_driver_sql("ANALYZE")
+
+@pytest.fixture(scope="module")
+def seeded_db(tmp_path_factory):
+    path = tmp_path_factory.mktemp("explain") / "orders.db"
+    command.upgrade(alembic_config(path), "head")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    asyncio.run(seed(engine))
+    yield engine
+    asyncio.run(engine.dispose())
+
+async def seed(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(seed_rows)
+
+async def query_plans(engine, run) -> str:
+    """EXPLAIN QUERY PLAN for every SELECT that run(session_factory) issues."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await run(sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    lines = []
+    async with engine.connect() as conn:
+        for statement, parameters in captured:
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            lines.extend(row[-1] for row in result.all())
+    assert lines, "nothing was queried"
+    return "\n".join(lines)
+
+def assert_uses_index(plan: str, table: str, index: str):
+    assert index in plan, plan
+    # A bare SCAN reads every row (of the table or an alias of it); SCAN ... USING INDEX walks an index in order
+    assert not re.search(rf"^SCAN (TABLE )?{table}(_\d+)?\b(?! USING)", plan, re.MULTILINE), plan
+
+def explain(seeded_db, run) -> str:
+    return asyncio.run(query_plans(seeded_db, run))
+
+def in_session(call):
+    async def run(session_factory):
+        async with session_factory() as db:
+            await call(db)
+    return run
+
+def test_user_orders_use_user_index(seeded_db):
+    plan = explain(seeded_db, in_session(lambda db: OrderService.get_user_orders(db, USERS[0])))
+    assert_uses_index(plan, "orders", "ix_orders_user_id_created_at_order_id")
+
+@pytest.mark.parametrize("filters, index", [
+    ({}, "ix_orders_created_at_order_id"),
+    ({"status": OrderStatus.PREPARING}, "ix_orders_status_created_at_order_id"),
+    ({"user_id": USERS[1]}, "ix_orders_user_id_created_at_order_id"),
+])
+def test_order_history_uses_matching_index(seeded_db, filters, index):
+    plan = explain(seeded_db, in_session(lambda db: OrderService.get_order_history(db, limit=20, **filters)))
+    assert_uses_index(plan, "orders", index)
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan
+
+def test_pizza_loads_sizes_and_toppings_by_index(seeded_db):
+    # The full menu reads every size anyway; one pizza should not
+    plan = explain(seeded_db, in_session(lambda db: PizzaService.get_pizza(db, PIZZAS[0])))
+    assert_uses_index(plan, "s", "ix_s_pizza_id")
+    assert_uses_index(plan, "pizza_toppings", "ix_pizza_toppings_pizza_id_topping_id")
+
+def test_topping_pizzas_use_reverse_index(seeded_db):
+    async def load(db):
+        await db.execute(select(Topping).options(selectinload(Topping.pizzas)).filter(Topping.topping_id == TOPPINGS[0]))
+    plan = explain(seeded_db, in_session(load))
+    assert_uses_index(plan, "pizza_toppings", "ix_pizza_toppings_topping_id_pizza_id")
+
+def test_checkout_price_lookup_uses_size_index(seeded_db):
+    items = [OrderItemCreate(pizza_id=str(PIZZAS[0]), quantity=1, size="medium")]
+    plan = explain(seeded_db, in_session(lambda db: PricingService.price_order_items(db, items)))
+    assert_uses_index(plan, "s", "ix_s_pizza_id")
+
+def test_redeemed_coupons_use_covering_index(seeded_db):
+    CouponCache.clear()
+    plan = explain(seeded_db, in_session(lambda db: CouponCache.get_redeemed(db, USERS[2])))
+    assert_uses_index(plan, "coupon_usages", "COVERING INDEX ix_coupon_usages_user_id_coupon_id")
+
+def test_order_export_joins_items_by_index(seeded_db):
+    async def first_batch(session_factory):
+        async for _ in OrderExportService.stream_orders(session_factory, date_from=datetime.datetime(2024, 1, 2)):
+            break
+    plan = explain(seeded_db, first_batch)
+    assert_uses_index(plan, "order_items", "ix_order_items_order_id")
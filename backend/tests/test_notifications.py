@@ -0,0 +1,224 @@
+import asyncio
+import datetime
+import email
+import email.policy
+import smtplib
+import socket
+import uuid
+import pytest
+from sqlalchemy import event, select
+
+from app.models.models import NotificationOutbox, NotificationStatus, NotificationChannel
+from app.services.notification_service import (
+    NotificationWorker, SmtpEmailSender, enqueue_order_confirmation
+)
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.content.decode("utf8", errors="replace")))
+        return "250 Message accepted for delivery"
+
+class FakeSmsSender:
+    def __init__(self, failures: int = 0):
+        self.sent = []
+        self.failures = failures
+
+    def send(self, to_number, body):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("SMS gateway unavailable")
+        self.sent.append((to_number, body))
+
+    def close(self):
+        pass
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+async def enqueue_orders(session_factory, count: int):
+    async with session_factory() as db:
+        for _ in range(count):
+            enqueue_order_confirmation(db, "customer@example.com", "+1234567890", uuid.uuid4())
+        await db.commit()
+
+async def outbox_rows(session_factory):
+    async with session_factory() as db:
+        result = await db.execute(select(NotificationOutbox))
+        return result.scalars().all()
+
+def make_worker(session_factory, port, sms_sender, **kwargs):
+    email_sender = SmtpEmailSender("127.0.0.1", port, sender="shop@example.com", use_tls=False)
+    return NotificationWorker(session_factory, email_sender, sms_sender, retry_base_seconds=60, **kwargs), email_sender
+
+def test_worker_delivers_outbox_over_one_smtp_connection(smtp_server, session_factory):
+    handler, port = smtp_server
+    sms_sender = FakeSmsSender()
+    worker, email_sender = make_worker(session_factory, port, sms_sender, concurrency=1)
+
+    async def scenario():
+        await enqueue_orders(session_factory, 3)
+        processed = await worker.run_once()
+        await asyncio.to_thread(email_sender.close)
+        return processed
+
+    assert asyncio.run(scenario()) == 6
+    assert len(handler.messages) == 3
+    assert handler.connections == 1
+    message = email.message_from_string(handler.messages[0][1], policy=email.policy.default)
+    assert "Order Confirmation" in message["Subject"]
+    assert handler.messages[0][0] == ["customer@example.com"]
+    assert len(sms_sender.sent) == 3
+    assert all(row.status == NotificationStatus.SENT for row in asyncio.run(outbox_rows(session_factory)))
+
+def test_worker_retries_with_backoff_then_gives_up(smtp_server, session_factory):
+    _, port = smtp_server
+    sms_sender = FakeSmsSender(failures=10)
+    worker, email_sender = make_worker(session_factory, port, sms_sender, max_attempts=2)
+
+    asyncio.run(enqueue_orders(session_factory, 1))
+    asyncio.run(worker.run_once())
+    sms = [row for row in asyncio.run(outbox_rows(session_factory)) if row.channel == NotificationChannel.SMS][0]
+    assert sms.status == NotificationStatus.PENDING
+    assert sms.attempts == 1
+    assert sms.next_attempt_at > datetime.datetime.utcnow() + datetime.timedelta(seconds=30)
+    assert "unavailable" in sms.last_error
+
+    # Not due yet, so a second pass has nothing to do
+    assert asyncio.run(worker.run_once()) == 0
+
+    async def make_due():
+        async with session_factory() as db:
+            row = await db.get(NotificationOutbox, sms.notification_id)
+            row.next_attempt_at = datetime.datetime.utcnow()
+            await db.commit()
+    asyncio.run(make_due())
+    assert asyncio.run(worker.run_once()) == 1
+
+    sms = [row for row in asyncio.run(outbox_rows(session_factory)) if row.channel == NotificationChannel.SMS][0]
+    assert sms.status == NotificationStatus.FAILED
+    assert sms.attempts == 2
+    email_sender.close()
+
+class FakeEmailSender:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, recipient, subject, body):
+        self.sent.append(recipient)
+
+    def close(self):
+        pass
+
+def test_no_connection_is_held_while_sending(session_factory):
+    pool = session_factory.kw["bind"].sync_engine.pool
+    in_use = []
+    in_use_during_send = []
+
+    def on_checkout(*args):
+        in_use.append(1)
+
+    def on_checkin(*args):
+        in_use.pop()
+
+    class RecordingSmsSender(FakeSmsSender):
+        def send(self, to_number, body):
+            in_use_during_send.append(len(in_use))
+            super().send(to_number, body)
+
+    worker = NotificationWorker(session_factory, FakeEmailSender(), RecordingSmsSender())
+
+    async def scenario():
+        await enqueue_orders(session_factory, 2)
+        return await worker.run_once()
+
+    event.listen(pool, "checkout", on_checkout)
+    event.listen(pool, "checkin", on_checkin)
+    try:
+        assert asyncio.run(scenario()) == 4
+    finally:
+        event.remove(pool, "checkout", on_checkout)
+        event.remove(pool, "checkin", on_checkin)
+    assert in_use_during_send == [0, 0]
+    assert all(row.status == NotificationStatus.SENT for row in asyncio.run(outbox_rows(session_factory)))
+
+def test_a_result_is_not_recorded_once_another_worker_reclaimed_the_row(session_factory):
+    class ReclaimingSmsSender(FakeSmsSender):
+        def send(self, to_number, body):
+            # Simulate the lease running out and another worker claiming the row mid-send
+            asyncio.run(reclaim())
+            raise RuntimeError("SMS gateway unavailable")
+
+    async def reclaim():
+        async with session_factory() as db:
+            rows = await db.execute(select(NotificationOutbox).filter(NotificationOutbox.channel == NotificationChannel.SMS))
+            for row in rows.scalars().all():
+                row.next_attempt_at = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+            await db.commit()
+
+    worker = NotificationWorker(session_factory, FakeEmailSender(), ReclaimingSmsSender())
+    asyncio.run(enqueue_orders(session_factory, 1))
+    assert asyncio.run(worker.run_once()) == 2
+
+    rows = {row.channel: row for row in asyncio.run(outbox_rows(session_factory))}
+    assert rows[NotificationChannel.EMAIL].status == NotificationStatus.SENT
+    assert rows[NotificationChannel.SMS].status == NotificationStatus.PENDING
+    assert rows[NotificationChannel.SMS].attempts == 0
+    assert rows[NotificationChannel.SMS].last_error is None
+
+class FakeSmtpConnection:
+    def __init__(self, error=None):
+        self.error = error
+        self.closed = False
+
+    def sendmail(self, *args):
+        if self.error:
+            raise self.error
+
+    def quit(self):
+        raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+    def close(self):
+        self.closed = True
+
+def test_a_dropped_connection_is_closed_before_reconnecting(monkeypatch):
+    sender = SmtpEmailSender("127.0.0.1", 25, sender="shop@example.com", use_tls=False)
+    dropped = FakeSmtpConnection(smtplib.SMTPServerDisconnected("Connection unexpectedly closed"))
+    sender._idle.append(dropped)
+
+    def refuse():
+        raise ConnectionRefusedError("Connection refused")
+    monkeypatch.setattr(sender, "_connect", refuse)
+
+    with pytest.raises(ConnectionRefusedError):
+        sender.send("customer@example.com", "Hi", "Hello")
+    assert dropped.closed
+    assert sender._idle == []
+
+    fresh = FakeSmtpConnection()
+    monkeypatch.setattr(sender, "_connect", lambda: fresh)
+    dropped = FakeSmtpConnection(smtplib.SMTPServerDisconnected("Connection unexpectedly closed"))
+    sender._idle.append(dropped)
+    sender.send("customer@example.com", "Hi", "Hello")
+    assert dropped.closed
+    assert sender._idle == [fresh]
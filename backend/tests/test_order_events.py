@@ -0,0 +1,168 @@
+import asyncio
+import datetime
+import json
+import uuid
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from starlette.websockets import WebSocketDisconnect
+
+from app.apis import orders
+from app.core.security import create_access_token, decode_token
+from app.models.models import Order, OrderStatus
+from app.services.order_events import InMemoryBackend, OrderEvent, OrderEventBus, PostgresBackend
+from app.services.order_status_service import OrderStatusService
+
+OWNER = uuid.uuid4()
+ORDER_ID = uuid.uuid4()
+
+async def seed_order(session_factory):
+    async with session_factory() as db:
+        db.add(Order(
+            order_id=ORDER_ID,
+            user_id=OWNER,
+            total_amount=299.5,
+            status=OrderStatus.RECEIVED,
+            delivery_address="123 Test St",
+            contact_number="+1234567890",
+            updated_at=datetime.datetime.utcnow(),
+        ))
+        await db.commit()
+
+@pytest.fixture(autouse=True)
+def reset_state(session_factory):
+    asyncio.run(seed_order(session_factory))
+    OrderEventBus.use_backend(InMemoryBackend())
+    OrderEventBus.clear()
+    OrderStatusService.forget_all()
+    yield
+    OrderEventBus.clear()
+    OrderStatusService.forget_all()
+
+@pytest.fixture
+def client(db_overrides):
+    app = FastAPI()
+    app.include_router(orders.router)
+    app.dependency_overrides.update(db_overrides)
+    return TestClient(app)
+
+def token_for(user_id, role="user"):
+    return create_access_token({"sub": str(user_id), "role": role})
+
+def push(status, order_id=ORDER_ID):
+    # What a backend does with an event that reached this worker
+    return OrderEventBus.dispatch(OrderEvent(str(order_id), status, datetime.datetime.utcnow()))
+
+def test_one_transition_reaches_every_watcher_with_one_write(session_factory, sql_statements):
+    async def scenario():
+        watchers = [OrderEventBus.subscribe(ORDER_ID) for _ in range(1000)]
+        bystander = OrderEventBus.subscribe(uuid.uuid4())
+        OrderStatusService.start_status_updates(ORDER_ID, OrderStatus.RECEIVED, delay=0)
+
+        sql_statements.clear()
+        async with session_factory() as db:
+            await OrderStatusService.advance_due_orders(db)
+
+        received = [await watcher.get(timeout=1) for watcher in watchers]
+        return received, await bystander.get(timeout=0.01)
+
+    received, bystander_event = asyncio.run(scenario())
+    assert [s.split()[0].upper() for s in sql_statements] == ["UPDATE"]
+    assert {(e.order_id, e.status) for e in received} == {(str(ORDER_ID), OrderStatus.PREPARING)}
+    assert bystander_event is None
+
+def test_slow_watcher_keeps_only_the_newest_events():
+    async def scenario():
+        watcher = OrderEventBus.subscribe(ORDER_ID, max_queue=2)
+        for status in (OrderStatus.PREPARING, OrderStatus.BAKING, OrderStatus.READY, OrderStatus.DELIVERED):
+            push(status)
+        updates = [e.status async for e in watcher.updates(OrderStatus.RECEIVED)]
+        return updates, watcher.dropped
+
+    updates, dropped = asyncio.run(scenario())
+    assert updates == [OrderStatus.READY, OrderStatus.DELIVERED]
+    assert dropped == 2
+
+def test_websocket_pushes_transitions_until_delivered(client):
+    url = f"/orders/{ORDER_ID}/ws?token={token_for(OWNER)}"
+    with client.websocket_connect(url) as websocket:
+        assert websocket.receive_json()["status"] == "RECEIVED"
+        assert OrderEventBus.watcher_count(ORDER_ID) == 1
+
+        push(OrderStatus.PREPARING)
+        push(OrderStatus.PREPARING)  # duplicates are not re-sent
+        push(OrderStatus.DELIVERED)
+        assert websocket.receive_json()["status"] == "PREPARING"
+        assert websocket.receive_json()["status"] == "DELIVERED"
+        with pytest.raises(WebSocketDisconnect):
+            websocket.receive_json()
+    assert OrderEventBus.watcher_count() == 0
+
+def test_websocket_requires_a_token_for_the_order(client):
+    for token in (None, "not-a-token", token_for(uuid.uuid4())):
+        url = f"/orders/{ORDER_ID}/ws" + (f"?token={token}" if token else "")
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(url) as websocket:
+                websocket.receive_json()
+    assert OrderEventBus.watcher_count() == 0
+
+    # Admins may watch any order
+    with client.websocket_connect(f"/orders/{ORDER_ID}/ws?token={token_for(uuid.uuid4(), 'admin')}") as websocket:
+        assert websocket.receive_json()["order_id"] == str(ORDER_ID)
+
+def test_server_sent_events_stream_transitions(session_factory):
+    async def scenario():
+        user = decode_token(token_for(OWNER))
+        response = await orders.watch_order_sse(ORDER_ID, session_factory, user)
+        assert response.media_type == "text/event-stream"
+        chunks = response.body_iterator
+        first = await chunks.__anext__()
+
+        push(OrderStatus.BAKING)
+        push(OrderStatus.DELIVERED)
+        return [first] + [chunk async for chunk in chunks]
+
+    # The test client buffers whole responses, so the stream is read straight from the endpoint
+    chunks = asyncio.run(scenario())
+    assert all(chunk.startswith("event: status\ndata: ") and chunk.endswith("\n\n") for chunk in chunks)
+    assert [json.loads(chunk.split("data: ")[1])["status"] for chunk in chunks] == ["RECEIVED", "BAKING", "DELIVERED"]
+    assert OrderEventBus.watcher_count() == 0
+
+def test_server_sent_events_hide_other_users_orders(client):
+    headers = {"Authorization": f"Bearer {token_for(uuid.uuid4())}"}
+    assert client.get(f"/orders/{ORDER_ID}/events", headers=headers).status_code == 404
+    assert OrderEventBus.watcher_count() == 0
+
+def test_events_are_sent_only_when_the_transaction_commits(session_factory):
+    async def scenario():
+        watcher = OrderEventBus.subscribe(ORDER_ID)
+        async with session_factory() as db:
+            await db.execute(update(Order).values(status=OrderStatus.BAKING))
+            await OrderEventBus.publish(db, [OrderEvent(str(ORDER_ID), OrderStatus.BAKING, datetime.datetime.utcnow())])
+            await db.rollback()
+            await db.commit()
+            rolled_back = await watcher.get(timeout=0.01)
+
+            await db.execute(update(Order).values(status=OrderStatus.READY))
+            await OrderEventBus.publish(db, [OrderEvent(str(ORDER_ID), OrderStatus.READY, datetime.datetime.utcnow())])
+            before_commit = await watcher.get(timeout=0.01)
+            await db.commit()
+        return rolled_back, before_commit, await watcher.get(timeout=1)
+
+    rolled_back, before_commit, committed = asyncio.run(scenario())
+    assert rolled_back is None and before_commit is None
+    assert committed.status == OrderStatus.READY
+
+def test_postgres_backend_dispatches_notifications_locally():
+    backend = PostgresBackend.from_url("postgresql+asyncpg://pizza:secret@db:5432/pizza", "order_events")
+    assert backend.dsn == "postgresql://pizza:secret@db:5432/pizza"
+    sent = OrderEvent(str(ORDER_ID), OrderStatus.READY, datetime.datetime(2024, 1, 1, 12, 0))
+
+    async def scenario():
+        watcher = OrderEventBus.subscribe(ORDER_ID)
+        backend._on_notify(None, 4242, "order_events", "not json")
+        backend._on_notify(None, 4242, "order_events", json.dumps(sent.to_dict()))
+        return await watcher.get(timeout=1), await watcher.get(timeout=0.01)
+
+    assert asyncio.run(scenario()) == (sent, None)
@@ -0,0 +1,166 @@
+import asyncio
+import datetime
+import time
+import uuid
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.models.models import Order, OrderStatus
+from app.services.order_events import InMemoryBackend, OrderEventBus
+from app.services.order_status_service import OrderStatusService, SchedulerLock
+
+@pytest.fixture(autouse=True)
+def reset_state(session_factory):
+    OrderEventBus.use_backend(InMemoryBackend())
+    OrderEventBus.clear()
+    OrderStatusService.forget_all()
+    yield
+    OrderEventBus.clear()
+    OrderStatusService.forget_all()
+
+async def add_order(session_factory, status: OrderStatus, seconds_ago: float = 0) -> uuid.UUID:
+    order_id = uuid.uuid4()
+    async with session_factory() as db:
+        db.add(Order(
+            order_id=order_id,
+            user_id=uuid.uuid4(),
+            total_amount=299.5,
+            status=status,
+            delivery_address="123 Test St",
+            contact_number="+1234567890",
+            updated_at=datetime.datetime.utcnow() - datetime.timedelta(seconds=seconds_ago),
+        ))
+        await db.commit()
+    return order_id
+
+async def status_of(session_factory, order_id: uuid.UUID) -> OrderStatus:
+    async with session_factory() as db:
+        return (await db.execute(select(Order.status).filter(Order.order_id == order_id))).scalar()
+
+async def advance(session_factory, now=None):
+    async with session_factory() as db:
+        return await OrderStatusService.advance_due_orders(db, now)
+
+def test_resume_schedules_in_flight_orders_from_their_last_update(session_factory):
+    async def scenario():
+        overdue = await add_order(session_factory, OrderStatus.PREPARING, seconds_ago=settings.ORDER_STATUS_INTERVAL_SECONDS * 2)
+        fresh = await add_order(session_factory, OrderStatus.RECEIVED)
+        await add_order(session_factory, OrderStatus.DELIVERED)
+        async with session_factory() as db:
+            resumed = await OrderStatusService.resume_in_flight_orders(db)
+        return overdue, fresh, resumed
+
+    before = time.monotonic()
+    overdue, fresh, resumed = asyncio.run(scenario())
+    assert resumed == 2
+    schedule = OrderStatusService._active_orders
+    assert set(schedule) == {str(overdue), str(fresh)}
+    assert schedule[str(overdue)][0] == OrderStatus.PREPARING
+    assert schedule[str(overdue)][1] <= time.monotonic()
+    assert schedule[str(fresh)][1] >= before + settings.ORDER_STATUS_INTERVAL_SECONDS - 1
+
+def test_advance_moves_due_orders_one_step_and_publishes_them(session_factory):
+    async def scenario():
+        due = await add_order(session_factory, OrderStatus.RECEIVED)
+        later = await add_order(session_factory, OrderStatus.RECEIVED)
+        OrderStatusService.start_status_updates(due, OrderStatus.RECEIVED, delay=0)
+        OrderStatusService.start_status_updates(later, OrderStatus.RECEIVED, delay=60)
+        watcher = OrderEventBus.subscribe(due)
+        transitions = await advance(session_factory)
+        return due, later, transitions, await watcher.get(timeout=1), await status_of(session_factory, due), await status_of(session_factory, later)
+
+    due, later, transitions, published, due_status, later_status = asyncio.run(scenario())
+    assert transitions == [(str(due), OrderStatus.PREPARING)]
+    assert (published.order_id, published.status) == (str(due), OrderStatus.PREPARING)
+    assert (due_status, later_status) == (OrderStatus.PREPARING, OrderStatus.RECEIVED)
+    # Scheduled again for its next step
+    assert OrderStatusService._active_orders[str(due)][0] == OrderStatus.PREPARING
+
+def test_delivered_orders_leave_the_schedule(session_factory):
+    async def scenario():
+        order_id = await add_order(session_factory, OrderStatus.READY)
+        OrderStatusService.start_status_updates(order_id, OrderStatus.READY, delay=0)
+        first = await advance(session_factory)
+        second = await advance(session_factory, time.monotonic() + settings.ORDER_STATUS_INTERVAL_SECONDS * 10)
+        return order_id, first, second, await status_of(session_factory, order_id)
+
+    order_id, first, second, status = asyncio.run(scenario())
+    assert first == [(str(order_id), OrderStatus.DELIVERED)]
+    assert second == []
+    assert status == OrderStatus.DELIVERED
+    assert OrderStatusService._active_orders == {}
+
+def test_rows_changed_elsewhere_are_not_moved_or_published(session_factory):
+    async def scenario():
+        order_id = await add_order(session_factory, OrderStatus.RECEIVED)
+        moved = await add_order(session_factory, OrderStatus.RECEIVED)
+        OrderStatusService.start_status_updates(order_id, OrderStatus.RECEIVED, delay=0)
+        OrderStatusService.start_status_updates(moved, OrderStatus.RECEIVED, delay=0)
+        # Another scheduler got there first
+        async with session_factory() as db:
+            await db.execute(update(Order).where(Order.order_id == order_id).values(status=OrderStatus.PREPARING))
+            await db.commit()
+        watcher = OrderEventBus.subscribe(order_id)
+        transitions = await advance(session_factory)
+        return order_id, moved, transitions, await watcher.get(timeout=0.01), await status_of(session_factory, order_id)
+
+    order_id, moved, transitions, published, status = asyncio.run(scenario())
+    assert transitions == [(str(moved), OrderStatus.PREPARING)]
+    assert published is None
+    assert status == OrderStatus.PREPARING
+    # Left for the next resync to schedule from its real status
+    assert str(order_id) not in OrderStatusService._active_orders
+
+def test_rescheduling_replaces_the_earlier_schedule(session_factory):
+    async def scenario():
+        order_id = await add_order(session_factory, OrderStatus.RECEIVED)
+        OrderStatusService.start_status_updates(order_id, OrderStatus.RECEIVED, delay=0)
+        OrderStatusService.start_status_updates(order_id, OrderStatus.RECEIVED, delay=0)
+        return order_id, await advance(session_factory), await status_of(session_factory, order_id)
+
+    order_id, transitions, status = asyncio.run(scenario())
+    # Two heap entries, one transition
+    assert transitions == [(str(order_id), OrderStatus.PREPARING)]
+    assert status == OrderStatus.PREPARING
+
+def test_resync_keeps_existing_schedules(session_factory):
+    async def scenario():
+        tracked = await add_order(session_factory, OrderStatus.RECEIVED)
+        moved = await add_order(session_factory, OrderStatus.RECEIVED)
+        OrderStatusService.start_status_updates(tracked, OrderStatus.RECEIVED, delay=60)
+        OrderStatusService.start_status_updates(moved, OrderStatus.RECEIVED, delay=60)
+        # Moved on by a previous scheduler; the schedule here is out of date
+        async with session_factory() as db:
+            await db.execute(update(Order).where(Order.order_id == moved).values(status=OrderStatus.PREPARING))
+            await db.commit()
+        resumed = []
+        for _ in range(3):
+            async with session_factory() as db:
+                resumed.append(await OrderStatusService.resume_in_flight_orders(db))
+        return tracked, moved, resumed
+
+    tracked, moved, resumed = asyncio.run(scenario())
+    assert resumed == [1, 0, 0]
+    assert len(OrderStatusService._queue) == 3
+    assert OrderStatusService._active_orders[str(tracked)][0] == OrderStatus.RECEIVED
+    assert OrderStatusService._active_orders[str(moved)][0] == OrderStatus.PREPARING
+
+class HeldElsewhere:
+    async def hold(self):
+        return False
+
+def test_only_the_lock_holder_schedules(session_factory):
+    async def scenario():
+        order_id = await add_order(session_factory, OrderStatus.RECEIVED, seconds_ago=settings.ORDER_STATUS_INTERVAL_SECONDS * 2)
+        OrderStatusService.start_status_updates(order_id, OrderStatus.RECEIVED, delay=0)
+        follower = await OrderStatusService.tick(session_factory, HeldElsewhere(), resync_due=True)
+        after_follower = await status_of(session_factory, order_id)
+        leader = await OrderStatusService.tick(session_factory, SchedulerLock(session_factory.kw["bind"]), resync_due=True)
+        return order_id, follower, after_follower, leader
+
+    order_id, follower, after_follower, leader = asyncio.run(scenario())
+    assert follower is None
+    assert after_follower == OrderStatus.RECEIVED
+    # The leader found the order in the database on its resync
+    assert leader == [(str(order_id), OrderStatus.PREPARING)]
@@ -0,0 +1,311 @@
+import asyncio
+import csv
+import datetime
+import io
+import json
+import uuid
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.core.security import create_access_token
+from app.models.models import (
+    Coupon, DiscountType, Order, OrderItem, OrderStatus, Pizza, PizzaCategory, PizzaSize, PizzaSizeEnum, Topping
+)
+from app.apis import orders
+from app.services.coupon_cache import CouponCache
+from app.services.idempotency import IdempotencyStore
+
+def create_test_app():
+    app = FastAPI()
+    app.include_router(orders.router)
+    return app
+
+USER_A = uuid.uuid4()
+USER_B = uuid.uuid4()
+START = datetime.datetime(2024, 1, 1, 12, 0, 0)
+
+async def seed_orders(session_factory, count: int):
+    async with session_factory() as db:
+        for i in range(count):
+            db.add(Order(
+                user_id=USER_A if i % 2 == 0 else USER_B,
+                total_amount=100 + i,
+                delivery_address="123 Test St",
+                contact_number="+1234567890",
+                status=OrderStatus.DELIVERED if i % 3 == 0 else OrderStatus.RECEIVED,
+                # Every pair of orders shares a timestamp to exercise the order_id tie-break
+                created_at=START + datetime.timedelta(minutes=i // 2),
+                items=[
+                    OrderItem(pizza_id=uuid.uuid4(), quantity=q + 1, size=PizzaSizeEnum.LARGE, custom_toppings=["Olives"])
+                    for q in range(i % 3)
+                ],
+            ))
+        await db.commit()
+
+@pytest.fixture(scope="function")
+def test_app(session_factory, db_overrides):
+    CouponCache.clear()
+    IdempotencyStore.clear()
+    asyncio.run(seed_orders(session_factory, 25))
+    app = create_test_app()
+    app.dependency_overrides.update(db_overrides)
+    return TestClient(app)
+
+@pytest.fixture
+def admin_headers():
+    token = create_access_token({"sub": str(uuid.uuid4()), "role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+def fetch_all_pages(test_app, headers, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = test_app.get("/orders/history", params=query, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        pages.append(body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return pages
+
+def test_history_walks_every_order_once_newest_first(test_app, admin_headers):
+    pages = fetch_all_pages(test_app, admin_headers, limit=10)
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    orders = [order for page in pages for order in page]
+    assert len({order["order_id"] for order in orders}) == 25
+    keys = [(order["created_at"], order["order_id"]) for order in orders]
+    assert keys == sorted(keys, reverse=True)
+
+def test_history_filters(test_app, admin_headers):
+    orders = [o for page in fetch_all_pages(test_app, admin_headers, limit=4, status="DELIVERED") for o in page]
+    assert len(orders) == 9
+    assert all(order["status"] == "DELIVERED" for order in orders)
+
+    orders = [o for page in fetch_all_pages(test_app, admin_headers, limit=4, user_id=str(USER_B)) for o in page]
+    assert len(orders) == 12
+    assert all(order["user_id"] == str(USER_B) for order in orders)
+
+    date_from = (START + datetime.timedelta(minutes=5)).isoformat()
+    date_to = (START + datetime.timedelta(minutes=8)).isoformat()
+    orders = fetch_all_pages(test_app, admin_headers, date_from=date_from, date_to=date_to)[0]
+    assert len(orders) == 6
+
+def test_history_rejects_bad_cursor_and_non_admins(test_app, admin_headers):
+    response = test_app.get("/orders/history", params={"cursor": "not-a-cursor"}, headers=admin_headers)
+    assert response.status_code == 400
+
+    user_token = create_access_token({"sub": str(uuid.uuid4()), "role": "user"})
+    response = test_app.get("/orders/history", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+def test_export_streams_ndjson_with_items(test_app, admin_headers):
+    response = test_app.get("/orders/export", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    orders = [json.loads(line) for line in response.text.splitlines()]
+    assert len(orders) == 25
+    assert sorted(len(order["items"]) for order in orders) == sorted(i % 3 for i in range(25))
+    items = [item for order in orders for item in order["items"]]
+    assert all(item["size"] == "large" and item["custom_toppings"] == ["Olives"] for item in items)
+    assert [order["created_at"] for order in orders] == sorted(order["created_at"] for order in orders)
+
+def test_export_csv_filters_by_date(test_app, admin_headers):
+    params = {
+        "format": "csv",
+        "date_from": (START + datetime.timedelta(minutes=10)).isoformat(),
+    }
+    response = test_app.get("/orders/export", params=params, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    # Orders 20-24 have 2, 0, 1, 2, 0 items; item-less orders still get a row
+    assert len(rows) == 7
+    assert len({row["order_id"] for row in rows}) == 5
+    assert all(row["created_at"] >= params["date_from"] for row in rows)
+
+@pytest.mark.parametrize("address, exported", [
+    ("=HYPERLINK(\"http://evil.example\")", "'=HYPERLINK(\"http://evil.example\")"),
+    ("@SUM(1+1)", "'@SUM(1+1)"),
+    ("-2+3", "'-2+3"),
+    ("12 = Main St", "12 = Main St"),
+])
+def test_export_csv_escapes_formula_cells(test_app, admin_headers, session_factory, address, exported):
+    async def seed():
+        async with session_factory() as db:
+            db.add(Order(
+                user_id=USER_A,
+                total_amount=100,
+                delivery_address=address,
+                contact_number="+1234567890",
+                status=OrderStatus.RECEIVED,
+                created_at=START + datetime.timedelta(days=1),
+            ))
+            await db.commit()
+    asyncio.run(seed())
+
+    params = {"format": "csv", "date_from": (START + datetime.timedelta(days=1)).isoformat()}
+    response = test_app.get("/orders/export", params=params, headers=admin_headers)
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["delivery_address"], row["contact_number"]) for row in rows] == [(exported, "'+1234567890")]
+
+    # NDJSON is data, not a spreadsheet, and keeps the values as entered
+    params["format"] = "ndjson"
+    orders = [json.loads(line) for line in test_app.get("/orders/export", params=params, headers=admin_headers).text.splitlines()]
+    assert [(order["delivery_address"], order["contact_number"]) for order in orders] == [(address, "+1234567890")]
+
+MARGHERITA = uuid.uuid4()
+FARMHOUSE = uuid.uuid4()
+
+async def seed_menu(session_factory):
+    async with session_factory() as db:
+        olives = Topping(name="Olives", price=30.0, is_vegetarian=True)
+        cheese = Topping(name="Extra Cheese", price=50.0, is_vegetarian=True)
+        db.add_all([olives, cheese])
+        for pizza_id, name, prices in (
+            (MARGHERITA, "Margherita", {PizzaSizeEnum.SMALL: 199.0, PizzaSizeEnum.LARGE: 399.0}),
+            (FARMHOUSE, "Farmhouse", {PizzaSizeEnum.MEDIUM: 349.0}),
+        ):
+            db.add(Pizza(
+                pizza_id=pizza_id,
+                name=name,
+                base_price=0,
+                category=PizzaCategory.VEG_PIZZA,
+                sizes=[PizzaSize(size=size, price=price) for size, price in prices.items()],
+            ))
+        await db.commit()
+        return str(cheese.topping_id)
+
+def order_payload(items):
+    return {
+        "order_items": items,
+        "payment_method": "CASH",
+        "payment_status": "PENDING",
+        "contact_number": "+1234567890",
+        "delivery_address": "123 Test St",
+        "total_amount": 1.0,
+    }
+
+@pytest.fixture
+def user_headers():
+    token = create_access_token({"sub": str(USER_A), "role": "user"})
+    return {"Authorization": f"Bearer {token}"}
+
+def test_create_order_prices_items_from_the_menu(test_app, session_factory, user_headers):
+    cheese_id = asyncio.run(seed_menu(session_factory))
+    items = [
+        {"pizza_id": str(MARGHERITA), "quantity": 2, "size": "LARGE", "custom_toppings": ["Olives", cheese_id]},
+        {"pizza_id": str(FARMHOUSE), "quantity": 1, "size": "medium", "custom_toppings": [None]},
+    ]
+    response = test_app.post("/orders", json=order_payload(items), headers=user_headers)
+    assert response.status_code == 200
+    # (399 + 30 + 50) * 2 + 349, whatever the client claimed
+    assert response.json()["total_amount"] == 1307.0
+
+    async def load_items():
+        async with session_factory() as db:
+            result = await db.execute(select(OrderItem).filter(OrderItem.order_id == uuid.UUID(response.json()["order_id"])))
+            return result.scalars().all()
+
+    stored = sorted(asyncio.run(load_items()), key=lambda item: item.quantity)
+    assert [(item.size, item.quantity, item.custom_toppings) for item in stored] == [
+        (PizzaSizeEnum.MEDIUM, 1, []),
+        (PizzaSizeEnum.LARGE, 2, ["Olives", "Extra Cheese"]),
+    ]
+
+def test_create_order_statement_count_does_not_grow_with_items(test_app, session_factory, sql_statements, user_headers):
+    asyncio.run(seed_menu(session_factory))
+    line = {"pizza_id": str(MARGHERITA), "quantity": 1, "size": "SMALL", "custom_toppings": ["Olives"]}
+
+    sql_statements.clear()
+    response = test_app.post("/orders", json=order_payload([line]), headers=user_headers)
+    assert response.status_code == 200
+    small_order = len(sql_statements)
+
+    sql_statements.clear()
+    response = test_app.post("/orders", json=order_payload([line] * 60), headers=user_headers)
+    assert response.status_code == 200
+    assert response.json()["total_amount"] == 60 * 229.0
+    assert len(sql_statements) == small_order
+
+def test_create_order_rejects_unknown_sizes_and_toppings(test_app, session_factory, user_headers):
+    asyncio.run(seed_menu(session_factory))
+    line = {"pizza_id": str(FARMHOUSE), "quantity": 1, "size": "LARGE", "custom_toppings": []}
+    response = test_app.post("/orders", json=order_payload([line]), headers=user_headers)
+    assert response.status_code == 422
+
+    line = {"pizza_id": str(FARMHOUSE), "quantity": 1, "size": "MEDIUM", "custom_toppings": ["Pineapple"]}
+    response = test_app.post("/orders", json=order_payload([line]), headers=user_headers)
+    assert response.status_code == 422
+    assert "Pineapple" in response.json()["detail"]
+
+def test_create_order_redeems_coupon_once_per_user(test_app, session_factory, user_headers):
+    async def seed():
+        await seed_menu(session_factory)
+        async with session_factory() as db:
+            db.add(Coupon(
+                code="PIZZA10",
+                discount_type=DiscountType.PERCENTAGE,
+                discount_value=10,
+                valid_from=datetime.datetime.utcnow() - datetime.timedelta(days=1),
+                valid_until=datetime.datetime.utcnow() + datetime.timedelta(days=1),
+                usage_limit=100,
+                current_usage=0,
+            ))
+            await db.commit()
+
+    asyncio.run(seed())
+    line = {"pizza_id": str(FARMHOUSE), "quantity": 2, "size": "MEDIUM", "custom_toppings": []}
+    payload = dict(order_payload([line]), coupon_code="PIZZA10")
+
+    response = test_app.post("/orders", json=payload, headers=user_headers)
+    assert response.status_code == 200
+    assert response.json()["total_amount"] == 628.2  # 698 less 10%
+
+    response = test_app.post("/orders", json=payload, headers=user_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Coupon already used"
+
+async def count_orders(session_factory):
+    async with session_factory() as db:
+        result = await db.execute(select(Order))
+        return len(result.scalars().all())
+
+def test_create_order_replays_idempotency_key(test_app, session_factory, user_headers):
+    asyncio.run(seed_menu(session_factory))
+    line = {"pizza_id": str(MARGHERITA), "quantity": 1, "size": "SMALL", "custom_toppings": []}
+    headers = dict(user_headers, **{"Idempotency-Key": "checkout-1"})
+    orders_before = asyncio.run(count_orders(session_factory))
+
+    first = test_app.post("/orders", json=order_payload([line]), headers=headers)
+    replay = test_app.post("/orders", json=order_payload([line]), headers=headers)
+    assert first.status_code == replay.status_code == 200
+    assert replay.json() == first.json()
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert asyncio.run(count_orders(session_factory)) == orders_before + 1
+
+    response = test_app.post("/orders", json=order_payload([dict(line, quantity=2)]), headers=headers)
+    assert response.status_code == 422
+
+def test_concurrent_duplicates_are_coalesced(test_app, session_factory, user_headers):
+    asyncio.run(seed_menu(session_factory))
+    line = {"pizza_id": str(MARGHERITA), "quantity": 1, "size": "SMALL", "custom_toppings": []}
+    headers = dict(user_headers, **{"Idempotency-Key": "checkout-2"})
+    orders_before = asyncio.run(count_orders(session_factory))
+
+    async def post_concurrently():
+        transport = httpx.ASGITransport(app=test_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/orders", json=order_payload([line]), headers=headers) for _ in range(5)
+            ))
+
+    responses = asyncio.run(post_concurrently())
+    assert [r.status_code for r in responses] == [200] * 5
+    assert len({r.json()["order_id"] for r in responses}) == 1
+    assert asyncio.run(count_orders(session_factory)) == orders_before + 1
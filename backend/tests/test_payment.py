@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from urllib.parse import parse_qs
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from app.apis import payment
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.models import Order, PaymentStatus, Pizza, PizzaCategory, PizzaSize, PizzaSizeEnum, ProcessedStripeEvent
+from app.services.idempotency import IdempotencyStore
+from app.services.payment_events import PaymentEventWorker
+from app.services.payment_gateway import FakeGateway, PaymentGateway, PaymentGatewayError, StripeGateway, get_payment_gateway
+
+PIZZA_ID = uuid.uuid4()
+
+async def seed_menu(session_factory):
+    async with session_factory() as db:
+        db.add(Pizza(
+            pizza_id=PIZZA_ID,
+            name="Margherita",
+            base_price=0,
+            category=PizzaCategory.VEG_PIZZA,
+            sizes=[PizzaSize(size=PizzaSizeEnum.MEDIUM, price=299.5)],
+        ))
+        await db.commit()
+
+@pytest.fixture
+def gateway():
+    return FakeGateway()
+
+@pytest.fixture
+def client(gateway, session_factory, db_overrides):
+    asyncio.run(seed_menu(session_factory))
+    IdempotencyStore.clear()
+    app = FastAPI()
+    app.include_router(payment.router)
+    app.dependency_overrides.update(db_overrides)
+    app.dependency_overrides[get_payment_gateway] = lambda: gateway
+    return TestClient(app)
+
+@pytest.fixture
+def user_headers():
+    token = create_access_token({"sub": str(uuid.uuid4()), "role": "user"})
+    return {"Authorization": f"Bearer {token}"}
+
+def payment_request(quantity=2):
+    return {
+        "amount": 1.0,
+        "payment_type": "card",
+        "order_items": [{"pizza_id": str(PIZZA_ID), "quantity": quantity, "size": "MEDIUM", "custom_toppings": []}],
+        "delivery_address": "123 Test St",
+        "contact_number": "+1234567890",
+    }
+
+def test_payment_link_opens_one_checkout_session(client, gateway, user_headers):
+    response = client.post("/create-payment-link", json=payment_request(), headers=user_headers)
+    assert response.status_code == 200
+
+    assert len(gateway.sessions) == 1
+    session = gateway.sessions[0]
+    assert response.json() == {"url": f"https://checkout.test/{session['session_id']}"}
+    assert session["amount"] == 59900  # server-side total in paise, not the client's amount
+    assert session["currency"] == "inr"
+    assert session["success_url"].endswith(f"/order-success?order_id={session['order_id']}")
+
+def test_replayed_idempotency_key_does_not_open_another_session(client, gateway, user_headers):
+    headers = dict(user_headers, **{"Idempotency-Key": "pay-1"})
+    first = client.post("/create-payment-link", json=payment_request(), headers=headers)
+    second = client.post("/create-payment-link", json=payment_request(), headers=headers)
+    assert first.json() == second.json()
+    assert len(gateway.sessions) == 1
+
+class FlakyGateway(FakeGateway):
+    """Fails the first checkout call the way an unreachable provider does."""
+
+    def __init__(self):
+        super().__init__()
+        self.attempts = []
+
+    async def create_checkout_session(self, order_id, *args, **kwargs):
+        self.attempts.append(order_id)
+        if len(self.attempts) == 1:
+            raise PaymentGatewayError("Payment provider unreachable")
+        return await super().create_checkout_session(order_id, *args, **kwargs)
+
+async def order_ids(session_factory):
+    async with session_factory() as db:
+        return [str(order_id) for order_id in (await db.execute(select(Order.order_id))).scalars().all()]
+
+@pytest.mark.parametrize("gateway", [FlakyGateway()])
+def test_retry_after_a_gateway_failure_reuses_the_order(client, gateway, session_factory, user_headers):
+    headers = dict(user_headers, **{"Idempotency-Key": "pay-2"})
+    failed = client.post("/create-payment-link", json=payment_request(), headers=headers)
+    assert failed.status_code == 502
+    retried = client.post("/create-payment-link", json=payment_request(), headers=headers)
+    assert retried.status_code == 200
+
+    # One order, and the retry paid for the one the failed attempt created
+    orders = asyncio.run(order_ids(session_factory))
+    assert len(orders) == 1
+    assert gateway.attempts == orders * 2
+    assert [session["order_id"] for session in gateway.sessions] == orders
+
+    # A different key is a different checkout
+    client.post("/create-payment-link", json=payment_request(), headers=dict(user_headers, **{"Idempotency-Key": "pay-3"}))
+    assert len(asyncio.run(order_ids(session_factory))) == 2
+
+def test_gateways_must_implement_checkout():
+    class Incomplete(PaymentGateway):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_stripe_gateway_makes_a_single_checkout_request():
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json={"id": "cs_123", "url": "https://checkout.stripe.com/c/cs_123"})
+
+    async def scenario():
+        client = httpx.AsyncClient(
+            base_url="https://api.stripe.test", auth=("sk_test", ""), transport=httpx.MockTransport(handler)
+        )
+        gateway = StripeGateway("sk_test", client=client)
+        session = await gateway.create_checkout_session(
+            order_id="order-1",
+            amount=59900,
+            currency="inr",
+            description="Pizza Bliss Order #order-1",
+            success_url="http://localhost:3000/order-success?order_id=order-1",
+            cancel_url="http://localhost:3000/cart"
+        )
+        await gateway.close()
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.session_id == "cs_123" and session.url.endswith("cs_123")
+
+    assert len(requests) == 1
+    request = requests[0]
+    assert request.method == "POST" and request.url.path == "/v1/checkout/sessions"
+    assert request.headers["Idempotency-Key"] == "checkout-order-1"
+    form = {key: values[0] for key, values in parse_qs(request.content.decode()).items()}
+    assert form["line_items[0][price_data][unit_amount]"] == "59900"
+    assert form["line_items[0][price_data][currency]"] == "inr"
+    assert form["metadata[order_id]"] == "order-1"
+
+def test_stripe_gateway_surfaces_provider_errors():
+    def handler(request: httpx.Request):
+        return httpx.Response(400, json={"error": {"message": "Invalid currency: xyz"}})
+
+    async def scenario():
+        client = httpx.AsyncClient(base_url="https://api.stripe.test", transport=httpx.MockTransport(handler))
+        gateway = StripeGateway("sk_test", client=client)
+        try:
+            await gateway.create_checkout_session("order-1", 100, "xyz", "Order", "http://s", "http://c")
+        finally:
+            await gateway.close()
+
+    with pytest.raises(PaymentGatewayError) as exc:
+        asyncio.run(scenario())
+    assert exc.value.status_code == 400
+    assert exc.value.message == "Invalid currency: xyz"
+
+def stripe_event(event_type, order_id, payment_status="paid", event_id=None):
+    return {
+        "id": event_id or f"evt_{uuid.uuid4().hex}",
+        "object": "event",
+        "type": event_type,
+        "data": {"object": {
+            "object": "checkout.session",
+            "payment_status": payment_status,
+            "payment_intent": f"pi_{order_id}",
+            "metadata": {"order_id": str(order_id)},
+        }},
+    }
+
+def post_webhook(client, event, secret=None):
+    payload = json.dumps(event)
+    timestamp = int(time.time())
+    signature = hmac.new(
+        (secret or settings.STRIPE_WEBHOOK_SECRET).encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return client.post(
+        "/webhook",
+        content=payload,
+        headers={"Content-Type": "application/json", "Stripe-Signature": f"t={timestamp},v1={signature}"}
+    )
+
+def place_order(client, gateway, user_headers):
+    assert client.post("/create-payment-link", json=payment_request(), headers=user_headers).status_code == 200
+    return uuid.UUID(gateway.sessions[-1]["order_id"])
+
+async def payment_state(session_factory, order_id):
+    async with session_factory() as db:
+        order = (await db.execute(select(Order).filter(Order.order_id == order_id))).scalar_one()
+        return order.payment_status, order.payment_intent_id
+
+def test_webhook_is_recorded_and_applied_by_the_worker(client, gateway, session_factory, user_headers):
+    order_id = place_order(client, gateway, user_headers)
+    response = post_webhook(client, stripe_event("checkout.session.completed", order_id))
+    assert response.status_code == 200
+
+    # The request only recorded the event
+    assert asyncio.run(payment_state(session_factory, order_id)) == (PaymentStatus.PENDING, None)
+
+    worker = PaymentEventWorker(session_factory)
+    assert asyncio.run(worker.run_once()) == 1
+    assert asyncio.run(payment_state(session_factory, order_id)) == (PaymentStatus.COMPLETED, f"pi_{order_id}")
+    assert asyncio.run(worker.run_once()) == 0
+
+def test_redelivered_webhook_is_a_noop(client, gateway, session_factory, user_headers):
+    order_id = place_order(client, gateway, user_headers)
+    event = stripe_event("checkout.session.completed", order_id)
+    assert post_webhook(client, event).status_code == 200
+    assert post_webhook(client, event).status_code == 200
+
+    async def recorded():
+        async with session_factory() as db:
+            return (await db.execute(select(ProcessedStripeEvent))).scalars().all()
+
+    assert [e.event_id for e in asyncio.run(recorded())] == [event["id"]]
+    assert asyncio.run(PaymentEventWorker(session_factory).run_once()) == 1
+
+def test_worker_applies_a_batch_and_keeps_completed_payments(client, gateway, session_factory, user_headers):
+    paid, expired, failed = (place_order(client, gateway, user_headers) for _ in range(3))
+    for event in (
+        stripe_event("checkout.session.completed", paid),
+        stripe_event("checkout.session.expired", paid, payment_status="unpaid"),
+        stripe_event("checkout.session.expired", expired, payment_status="unpaid"),
+        stripe_event("checkout.session.completed", failed, payment_status="unpaid"),  # delayed method, no change
+        stripe_event("checkout.session.async_payment_failed", failed, payment_status="unpaid"),
+        stripe_event("customer.created", paid),  # not a payment event
+    ):
+        assert post_webhook(client, event).status_code == 200
+
+    assert asyncio.run(PaymentEventWorker(session_factory).run_once()) == 4
+    assert asyncio.run(payment_state(session_factory, paid))[0] == PaymentStatus.COMPLETED
+
+    # The expired event for the already paid order arrives in a later batch and changes nothing
+    assert post_webhook(client, stripe_event("checkout.session.expired", paid, payment_status="unpaid")).status_code == 200
+    assert asyncio.run(PaymentEventWorker(session_factory).run_once()) == 1
+    assert asyncio.run(payment_state(session_factory, paid))[0] == PaymentStatus.COMPLETED
+    assert asyncio.run(payment_state(session_factory, expired))[0] == PaymentStatus.FAILED
+    assert asyncio.run(payment_state(session_factory, failed))[0] == PaymentStatus.FAILED
+
+def test_webhook_rejects_a_bad_signature(client, gateway, session_factory, user_headers):
+    order_id = place_order(client, gateway, user_headers)
+    response = post_webhook(client, stripe_event("checkout.session.completed", order_id), secret="not_the_secret")
+    assert response.status_code == 400
+    assert asyncio.run(payment_state(session_factory, order_id)) == (PaymentStatus.PENDING, None)
+
+def test_orders_written_without_a_payment_status_default_to_pending(client, session_factory):
+    order_id = uuid.uuid4()
+
+    async def insert_without_payment_status():
+        # As a writer that predates the column would, bypassing the model's Python default
+        async with session_factory() as db:
+            await db.execute(
+                text(
+                    "INSERT INTO orders (order_id, total_amount, delivery_address, contact_number) "
+                    "VALUES (:order_id, 299.5, '123 Test St', '+1234567890')"
+                ),
+                {"order_id": str(order_id)}
+            )
+            await db.commit()
+
+    asyncio.run(insert_without_payment_status())
+    assert asyncio.run(payment_state(session_factory, order_id)) == (PaymentStatus.PENDING, None)
+
+    assert post_webhook(client, stripe_event("checkout.session.completed", order_id)).status_code == 200
+    assert asyncio.run(PaymentEventWorker(session_factory).run_once()) == 1
+    assert asyncio.run(payment_state(session_factory, order_id)) == (PaymentStatus.COMPLETED, f"pi_{order_id}")
@@ -0,0 +1,92 @@
+import asyncio
+import uuid
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.apis import auth, orders
+from app.core.config import settings
+from app.core.database import Base
+from app.core.rate_limit import DatabaseBackend, InMemoryBackend, Limit
+from app.core.security import create_access_token
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_limit_parsing():
+    assert Limit.parse("10/minute") == Limit(burst=10, interval=6.0)
+    assert Limit.parse("2/seconds") == Limit(burst=2, interval=0.5)
+    for spec in ("10", "0/minute", "ten/minute", "10/fortnight"):
+        with pytest.raises(ValueError):
+            Limit.parse(spec)
+
+async def exercise(backend, clock):
+    limit = Limit.parse("3/minute")  # a token every 20 seconds
+    burst = [await backend.hit("login:1.2.3.4", limit) for _ in range(3)]
+    refused = await backend.hit("login:1.2.3.4", limit)
+    other = await backend.hit("login:5.6.7.8", limit)
+    clock.now += 20
+    refilled = [await backend.hit("login:1.2.3.4", limit) for _ in range(2)]
+    return burst, refused, other, refilled
+
+def test_in_memory_bucket():
+    clock = Clock()
+    backend = InMemoryBackend(shards=1, sweep_seconds=30, clock=clock)
+    burst, refused, other, refilled = asyncio.run(exercise(backend, clock))
+    assert burst == [0, 0, 0] and other == 0
+    assert refused == pytest.approx(20)
+    assert refilled[0] == 0 and refilled[1] == pytest.approx(20)
+
+    # Buckets that have refilled hold no state and go on the next sweep of their shard
+    clock.now += 120
+    asyncio.run(backend.hit("login:9.9.9.9", Limit.parse("3/minute")))
+    assert len(backend) == 1
+
+def test_database_bucket(session_factory):
+    clock = Clock()
+    backend = DatabaseBackend(session_factory, sweep_seconds=30, clock=clock)
+
+    async def scenario():
+        result = await exercise(backend, clock)
+        clock.now += 120
+        await backend.hit("login:9.9.9.9", Limit.parse("3/minute"))
+        async with session_factory() as db:
+            remaining = (await db.execute(Base.metadata.tables["rate_limit_buckets"].select())).all()
+        return result, [row.key for row in remaining]
+
+    (burst, refused, other, refilled), remaining = asyncio.run(scenario())
+    assert burst == [0, 0, 0] and other == 0
+    assert refused == pytest.approx(20)
+    assert refilled[0] == 0 and refilled[1] == pytest.approx(20)
+    assert remaining == ["login:9.9.9.9"]
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(auth.router)
+    app.include_router(orders.router)
+    return TestClient(app)
+
+def test_login_is_limited_per_ip_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOGIN", "2/minute")
+    # Empty bodies fail validation, but only once the limiter has let the request through
+    assert [client.post("/login", json={}).status_code for _ in range(2)] == [422, 422]
+    response = client.post("/login", json={})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    assert client.post("/login", json={}).status_code == 422
+
+def test_checkout_is_limited_per_user(client, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_CHECKOUT", "1/minute")
+    alice, bob = ({"Authorization": f"Bearer {create_access_token({'sub': str(uuid.uuid4()), 'role': 'user'})}"} for _ in range(2))
+    assert client.post("/orders", json={}, headers=alice).status_code == 422
+    assert client.post("/orders", json={}, headers=alice).status_code == 429
+    assert client.post("/orders", json={}, headers=bob).status_code == 422
+    # Unauthenticated requests are turned away before they reach a bucket
+    assert client.post("/orders", json={}).status_code in (401, 403)
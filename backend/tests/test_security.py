@@ -0,0 +1,106 @@
+import time
+import uuid
+from unittest import mock
+import jwt
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import security
+from app.core.config import settings
+from app.core.security import (
+    CurrentUser, TokenCache, create_access_token, create_refresh_token, decode_token, get_current_user, require_role
+)
+from app.models.models import UserRole
+
+def create_test_app():
+    app = FastAPI()
+
+    @app.get("/me")
+    def me(user: CurrentUser = Depends(get_current_user)):
+        return {"user_id": str(user.user_id), "role": user.role}
+
+    @app.get("/admin-only")
+    def admin_only(user: CurrentUser = Depends(require_role(UserRole.ADMIN, detail="Only admins"))):
+        return {"ok": True}
+
+    return app
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    security.token_cache.clear()
+    yield
+    security.token_cache.clear()
+
+@pytest.fixture
+def client():
+    return TestClient(create_test_app())
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_decode_token_returns_principal_and_hits_cache():
+    user_id = uuid.uuid4()
+    token = create_access_token({"sub": str(user_id), "role": "admin"})
+
+    with mock.patch.object(security.jwt, "decode", wraps=jwt.decode) as decode:
+        first = decode_token(token)
+        second = decode_token(token)
+
+    assert first == second
+    assert first.user_id == user_id and first.role == UserRole.ADMIN and first.is_admin
+    assert decode.call_count == 1
+
+def test_invalid_and_expired_tokens_are_rejected(client):
+    token = create_access_token({"sub": str(uuid.uuid4()), "role": "user"})
+    assert client.get("/me", headers=bearer(token + "x")).status_code == 403
+
+    expired = jwt.encode(
+        {"sub": str(uuid.uuid4()), "role": "user", "expires": time.time() - 1},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM
+    )
+    assert client.get("/me", headers=bearer(expired)).status_code == 403
+
+def test_require_role(client):
+    user_token = create_access_token({"sub": str(uuid.uuid4()), "role": "user"})
+    admin_token = create_access_token({"sub": str(uuid.uuid4()), "role": "admin"})
+
+    response = client.get("/admin-only", headers=bearer(user_token))
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Only admins"
+    assert client.get("/admin-only", headers=bearer(admin_token)).status_code == 200
+    assert client.get("/me", headers=bearer(user_token)).json()["role"] == "user"
+
+def test_token_cache_is_bounded_and_respects_expiry():
+    cache = TokenCache(maxsize=2, ttl=60)
+    now = time.time()
+    users = [CurrentUser(uuid.uuid4(), UserRole.USER, now + 60) for _ in range(3)]
+    for i, user in enumerate(users):
+        cache.put(f"token-{i}", user)
+    assert cache.get("token-0") is None
+    assert cache.get("token-2") == users[2]
+
+    # An entry never outlives the token it was verified from
+    cache.put("about-to-expire", CurrentUser(uuid.uuid4(), UserRole.USER, now - 1))
+    assert cache.get("about-to-expire") is None
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    # Somewhere well away from UTC, where naive UTC read as local time is hours off
+    monkeypatch.setenv("TZ", "Asia/Kolkata")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+def test_tokens_expire_on_the_unix_clock(local_timezone):
+    def expires(token):
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])["expires"]
+
+    now = time.time()
+    access = create_access_token({"sub": str(uuid.uuid4()), "role": "user"})
+    refresh = create_refresh_token({"sub": str(uuid.uuid4()), "role": "user"})
+    assert expires(access) == pytest.approx(now + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, abs=5)
+    assert expires(refresh) == pytest.approx(now + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400, abs=5)
+    assert decode_token(access).expires == expires(access)
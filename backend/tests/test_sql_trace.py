@@ -0,0 +1,91 @@
+import uuid
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.apis import admin
+from app.core.config import settings
+from app.core.database import QueryStats, log_slow_query
+from app.core.request_metrics import MetricsMiddleware
+from app.core.security import create_access_token
+from app.core.sql_trace import SqlTraceMiddleware, SqlTraceStore, summarize
+
+def bearer(role: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(uuid.uuid4()), 'role': role})}"}
+
+@pytest.fixture
+def client(session_factory):
+    SqlTraceStore.clear()
+    app = FastAPI()
+    app.add_middleware(SqlTraceMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(admin.router, prefix="/api")
+
+    @app.get("/orders")
+    async def list_orders():
+        # One query for the list, then one per row: the N+1 shape the trace should expose
+        async with session_factory() as db:
+            await db.execute(text("SELECT 1"))
+            for order_id in range(4):
+                await db.execute(text("SELECT :order_id"), {"order_id": order_id})
+        return []
+
+    return TestClient(app)
+
+def test_admin_trace_header_and_sidecar(client):
+    response = client.get("/orders", headers={**bearer("admin"), "X-SQL-Trace": "1"})
+    assert response.status_code == 200
+    assert response.headers["X-SQL-Trace"].startswith("count=5, duration_ms=")
+    assert response.headers["X-SQL-Trace"].endswith("duplicates=3")
+
+    trace_id = response.headers["X-SQL-Trace-Id"]
+    trace = client.get(f"/api/admin/sql-traces/{trace_id}", headers=bearer("admin")).json()
+    assert trace["request"] == "GET /orders"
+    assert trace["count"] == 5
+    assert trace["statements"][0]["sql"] == "SELECT ?"
+    assert trace["statements"][0]["count"] == 4
+
+def test_query_parameter_toggle(client):
+    response = client.get("/orders?sql_trace=1", headers=bearer("admin"))
+    assert "count=5" in response.headers["X-SQL-Trace"]
+
+def test_no_trace_for_anyone_else(client):
+    for headers in ({}, bearer("user"), {"Authorization": "Bearer not-a-token"}):
+        response = client.get("/orders", headers={**headers, "X-SQL-Trace": "1"})
+        assert response.status_code == 200
+        assert "X-SQL-Trace" not in response.headers
+    assert client.get("/orders", headers=bearer("admin")).headers.get("X-SQL-Trace") is None
+
+def test_sidecar_is_admin_only(client):
+    trace_id = client.get("/orders", headers={**bearer("admin"), "X-SQL-Trace": "1"}).headers["X-SQL-Trace-Id"]
+    assert client.get(f"/api/admin/sql-traces/{trace_id}", headers=bearer("user")).status_code == 403
+    assert client.get(f"/api/admin/sql-traces/{uuid.uuid4().hex}", headers=bearer("admin")).status_code == 404
+
+def test_summarize_orders_repeated_statements_first():
+    summary = summarize([("SELECT a", 0.001), ("SELECT  b\n", 0.002), ("SELECT b", 0.003)])
+    assert summary["count"] == 3
+    assert summary["duplicates"] == 1
+    assert [s["sql"] for s in summary["statements"]] == ["SELECT b", "SELECT a"]
+    assert summary["statements"][0]["duration_ms"] == 5.0
+
+def test_slow_queries_are_logged(client, monkeypatch, capsys):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.000001)
+    client.get("/orders")
+    out = capsys.readouterr().out
+    assert "Slow query (" in out
+    assert "from GET /orders: SELECT ? params=(3,)" in out
+
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    client.get("/orders")
+    assert "Slow query" not in capsys.readouterr().out
+
+def test_slow_query_log_truncates_parameters(capsys):
+    log_slow_query("SELECT *\n  FROM orders WHERE note = ?", ("x" * 1000,), 0.75, None)
+    out = capsys.readouterr().out.strip()
+    assert out.startswith("Slow query (750.0 ms) from background: SELECT * FROM orders WHERE note = ? params=")
+    assert out.endswith("...")
+    assert len(out) < 400
+
+def test_query_stats_default_to_no_statement_list():
+    assert QueryStats().statements is None
@@ -0,0 +1,72 @@
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.static_files import CachedStaticFiles
+
+HASHED = "0123456789abcdef0123456789abcdef"
+
+@pytest.fixture
+def static_dir(tmp_path):
+    images = tmp_path / "pizza_images"
+    images.mkdir()
+    (images / f"{HASHED}.png").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4)
+    (images / f"{HASHED}-320.webp").write_bytes(b"RIFF\x00\x00\x00\x00WEBP")
+    (images / "9d35fdf8-64fc-47bf-9e6e-68983dd70519.png").write_bytes(b"\x89PNG\r\n\x1a\nold")
+    (images / "Home.png").write_bytes(b"\x89PNG\r\n\x1a\nhome")
+    (tmp_path / "menu.json").write_text('{"pizzas": []}')
+    (tmp_path / "menu.json.gz").write_bytes(gzip.compress(b'{"pizzas": []}'))
+    (tmp_path / "menu.json.br").write_bytes(b"not really brotli")
+    return tmp_path
+
+@pytest.fixture
+def client(static_dir):
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=static_dir, max_age=60), name="static")
+    return TestClient(app)
+
+def test_fingerprinted_files_are_cached_forever(client):
+    for name in (f"{HASHED}.png", f"{HASHED}-320.webp", "9d35fdf8-64fc-47bf-9e6e-68983dd70519.png"):
+        response = client.head(f"/static/pizza_images/{name}")
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert client.get("/static/pizza_images/Home.png").headers["cache-control"] == "public, max-age=60"
+
+def test_revalidation_keeps_cache_headers(client):
+    first = client.get(f"/static/pizza_images/{HASHED}.png")
+    again = client.get(f"/static/pizza_images/{HASHED}.png", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["cache-control"] == first.headers["cache-control"]
+
+def test_precompressed_siblings_are_negotiated(client):
+    response = client.head("/static/menu.json", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    response = client.get("/static/menu.json", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == {"pizzas": []}  # decoded by the client
+
+    response = client.get("/static/menu.json", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == {"pizzas": []}
+
+    # Images are never looked up with a compressed suffix
+    response = client.get(f"/static/pizza_images/{HASHED}.png", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers and "vary" not in response.headers
+
+def test_range_requests(client):
+    full = client.get(f"/static/pizza_images/{HASHED}.png").content
+    response = client.get(f"/static/pizza_images/{HASHED}.png", headers={"Range": "bytes=8-15"})
+    assert response.status_code == 206
+    assert response.content == full[8:16]
+    assert response.headers["content-range"] == f"bytes 8-15/{len(full)}"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+def test_missing_files_and_other_methods(client):
+    assert client.get("/static/nope.json", headers={"Accept-Encoding": "gzip"}).status_code == 404
+    assert client.get("/static/../tests/conftest.py").status_code == 404
+    assert client.post("/static/menu.json").status_code == 405
@@ -2,7 +2,7 @@ import { useTranslation } from 'react-i18next';
 import React, { useState, useEffect } from 'react';
 
 interface Order {
-  id: string;
+  order_id: string;
   user_id: string;
   total_amount: number;
   status: string;
@@ -13,22 +13,26 @@ export const OrderHistory: React.FC = () => {
   const { t } = useTranslation();
   const [orders, setOrders] = useState<Order[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchOrders();
   }, []);
 
-  const fetchOrders = async () => {
+  const fetchOrders = async (cursor?: string) => {
     const token = localStorage.getItem('access_token');
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
     try {
-      const response = await fetch('http://localhost:8000/api/orders/history', {
+      const response = await fetch(`http://localhost:8000/api/orders/history${query}`, {
         headers: {
           'Authorization': `Bearer ${token}`,
         },
       });
       if (response.ok) {
         const data = await response.json();
-        setOrders(data);
+        setOrders((previous) => (cursor ? [...previous, ...data.items] : data.items));
+        setNextCursor(data.next_cursor);
       }
     } catch (error) {
       console.error('Error fetching orders:', error);
@@ -37,6 +41,13 @@ export const OrderHistory: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    await fetchOrders(nextCursor);
+    setLoadingMore(false);
+  };
+
   if (loading) return <div>{t('Loading...')}</div>;
 
   return (
@@ -55,8 +66,8 @@ export const OrderHistory: React.FC = () => {
           </thead>
           <tbody className="bg-white divide-y divide-gray-200">
             {orders.map((order) => (
-              <tr key={order.id}>
-                <td className="px-6 py-4 whitespace-nowrap">{order.id}</td>
+              <tr key={order.order_id}>
+                <td className="px-6 py-4 whitespace-nowrap">{order.order_id}</td>
                 <td className="px-6 py-4 whitespace-nowrap">{order.user_id}</td>
                 <td className="px-6 py-4 whitespace-nowrap">₹{order.total_amount}</td>
                 <td className="px-6 py-4 whitespace-nowrap capitalize">{order.status}</td>
@@ -68,6 +79,17 @@ export const OrderHistory: React.FC = () => {
           </tbody>
         </table>
       </div>
+      {nextCursor && (
+        <div className="mt-4 text-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="bg-green-500 text-white px-4 py-2 rounded-lg hover:bg-green-600 transition-colors disabled:bg-green-300"
+          >
+            {loadingMore ? t('Loading...') : t('Load more')}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
\ No newline at end of file
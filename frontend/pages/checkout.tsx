@@ -20,6 +20,8 @@ const Checkout = () => {
   const router = useRouter();
   const { items, clearCart } = useCart();
   const [isLoading, setIsLoading] = useState(false);
+  // One key per checkout, so a retried or double-submitted order is only placed once
+  const [idempotencyKey] = useState(() => crypto.randomUUID());
 
   const getUserDetailsFromToken = () => {
     const token = localStorage.getItem('access_token');
@@ -80,6 +82,7 @@ const Checkout = () => {
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`,
+          'Idempotency-Key': idempotencyKey,
         },
         body: JSON.stringify(orderData),
       });
@@ -59,7 +59,7 @@ const OrderSuccessPage = () => {
 
   const { total_amount, delivery_address, contact_number } = router.query;
 
-  // Status polling function
+  // Initial order fetch
   const fetchOrderStatus = useCallback(async (orderId: string) => {
     if (!orderId) return false;
   
@@ -95,53 +95,57 @@ const OrderSuccessPage = () => {
     }
   }, [currentStatus]);
 
-  // Update the polling effect
+  // Load the order once, then follow status changes pushed over a WebSocket
   useEffect(() => {
-    let intervalId: NodeJS.Timeout | undefined;
-    let failedAttempts = 0;
-    const MAX_FAILED_ATTEMPTS = 3;
+    if (!router.isReady || !router.query.order_id) return;
+    const orderId = router.query.order_id as string;
+    let socket: WebSocket | undefined;
+    let reconnectTimer: NodeJS.Timeout | undefined;
+    let reconnectAttempts = 0;
+    let closed = false;
+    const MAX_RECONNECT_ATTEMPTS = 3;
 
-    const startPolling = async () => {
-      if (!router.isReady || !router.query.order_id) return;
-
-      try {
-        const shouldStop = await fetchOrderStatus(router.query.order_id as string);
-        setLoading(false);
+    const connect = () => {
+      const accessToken = localStorage.getItem('access_token');
+      socket = new WebSocket(
+        `ws://localhost:8000/api/orders/${orderId}/ws?token=${encodeURIComponent(accessToken ?? '')}`
+      );
 
-        if (!shouldStop) {
-          intervalId = setInterval(async () => {
-            try {
-              const shouldStop = await fetchOrderStatus(router.query.order_id as string);
-              if (shouldStop) {
-                console.log("Stopping polling - order delivered");
-                if (intervalId) clearInterval(intervalId);
-              }
-            } catch (error) {
-              failedAttempts++;
-              console.error(`Polling attempt failed (${failedAttempts}/${MAX_FAILED_ATTEMPTS}):`, error);
+      socket.onmessage = (message) => {
+        reconnectAttempts = 0;
+        const data = JSON.parse(message.data);
+        setCurrentStatus(data.status as OrderStatus);
+        setOrderDetails((details) => (details ? { ...details, status: data.status } : details));
+      };
 
-              if (failedAttempts >= MAX_FAILED_ATTEMPTS) {
-                console.error("Max failed attempts reached, stopping polling");
-                if (intervalId) clearInterval(intervalId);
-                setError(new Error("Failed to get order updates. Please refresh the page."));
-              }
-            }
-          }, 15000);
+      socket.onclose = (event) => {
+        // The server closes the socket itself once the order is delivered
+        if (closed || event.code === 1000) return;
+        reconnectAttempts++;
+        if (reconnectAttempts > MAX_RECONNECT_ATTEMPTS) {
+          setError(new Error("Failed to get order updates. Please refresh the page."));
+          return;
         }
-      } catch (error) {
-        console.error("Error in initial fetch:", error);
-        setLoading(false);
-      }
+        reconnectTimer = setTimeout(connect, 1000 * 2 ** reconnectAttempts);
+      };
     };
 
-    startPolling();
+    const start = async () => {
+      const delivered = await fetchOrderStatus(orderId);
+      setLoading(false);
+      if (!delivered && !closed) connect();
+    };
+
+    start();
 
     return () => {
-      if (intervalId) {
-        clearInterval(intervalId);
-      }
+      closed = true;
+      if (reconnectTimer) clearTimeout(reconnectTimer);
+      socket?.close();
     };
-  }, [router.isReady, router.query.order_id, fetchOrderStatus]);
+    // Connect once per order; status updates arrive over the socket
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [router.isReady, router.query.order_id]);
 
   // Effect to show status transitions
   useEffect(() => {
@@ -18,6 +18,8 @@ const Payment = () => {
   const router = useRouter();
   const { items, clearCart } = useCart();
   const [loading, setLoading] = useState(false);
+  // One key per checkout and payment type, so retries reuse the first payment link
+  const [idempotencyKey] = useState(() => crypto.randomUUID());
   const amount = router.query.amount || '662.00';
 
   const getUserDetailsFromToken = () => {
@@ -64,6 +66,7 @@ const Payment = () => {
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${localStorage.getItem('access_token')}`,
+          'Idempotency-Key': `${idempotencyKey}-${paymentType}`,
         },
         body: JSON.stringify({
           amount: calculateTotal(),